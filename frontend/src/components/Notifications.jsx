@@ -5,12 +5,12 @@ export default function Notifications(){
   const [notifications, setNotifications] = useState([])
 
   useEffect(()=>{
-    api.get('/notifications/').then(r => setNotifications(r.data)).catch(()=>{})
+    api.get('/notifications/').then(r => setNotifications(r.data.results)).catch(()=>{})
   }, [])
 
   const markAsRead = async (id) => {
     try {
-      await api.post(`/notifications/${id}/mark_read/`)
+      await api.post(`/notifications/${id}/read/`)
       setNotifications(prev => prev.map(n => n.id === id ? { ...n, is_read: true } : n))
     } catch (err) {
       console.error('Failed to mark as read', err)
@@ -0,0 +1,16 @@
+from apps.core.cache import invalidate
+from .models import ActivityLog
+
+
+def save_activities(activities):
+    """Insert unsaved activity rows in one statement"""
+    # Redelivered rows carry the same id and are skipped
+    ActivityLog.objects.bulk_create(activities, ignore_conflicts=True)
+    # bulk_create() sends no post_save, so invalidate the dashboards here
+    invalidate(user_ids={activity.user_id for activity in activities
+                         if activity.user_id})
+
+
+def write_activity(payloads):
+    """Outbox handler: insert activity rows in one statement"""
+    save_activities([ActivityLog.from_payload(payload) for payload in payloads])
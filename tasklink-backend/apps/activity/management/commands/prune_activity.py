@@ -0,0 +1,106 @@
+import gzip
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.activity.models import ActivityLog
+from apps.activity.partitions import (
+    add_months, drop_partition, ensure_partitions, is_partitioned,
+    monthly_partitions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove activity older than --older-than days: whole monthly '
+        'partitions are dropped on PostgreSQL, other rows deleted in chunks'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, required=True, metavar='DAYS',
+            help='Remove activity created more than DAYS days ago')
+        parser.add_argument(
+            '--archive', metavar='PATH',
+            help='First append the removed rows to this gzipped NDJSON file')
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Rows deleted (and archived) per transaction')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be removed without removing it')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(days=options['older_than'])
+        self.chunk_size = options['chunk_size']
+        self.dry_run = options['dry_run']
+        self.archive = None
+        if options['archive'] and not self.dry_run:
+            self.archive = gzip.open(options['archive'], 'at', encoding='utf-8')
+
+        try:
+            if self.dry_run:
+                removed = ActivityLog.objects.filter(created_at__lt=cutoff).count()
+            else:
+                removed = 0
+                if is_partitioned(connection):
+                    for name in ensure_partitions(connection, now):
+                        self.stdout.write(f'Created partition {name}')
+                    removed += self.drop_partitions(cutoff)
+                removed += self.delete_rows(cutoff)
+        finally:
+            if self.archive:
+                self.archive.close()
+
+        verb = 'Would remove' if self.dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} activity rows older than {cutoff:%Y-%m-%d %H:%M}'))
+
+    def drop_partitions(self, cutoff):
+        """Drop the months that end before the cutoff"""
+        removed = 0
+        for month, name in monthly_partitions(connection):
+            if add_months(month, 1) > cutoff:
+                break
+            rows = ActivityLog.objects.filter(
+                created_at__gte=month, created_at__lt=add_months(month, 1))
+            with transaction.atomic():
+                if self.archive:
+                    removed += self.write_archive(
+                        rows.order_by('created_at', 'id').iterator(
+                            chunk_size=self.chunk_size))
+                else:
+                    removed += rows.count()
+                drop_partition(connection, name)
+            self.stdout.write(f'Dropped partition {name}')
+        return removed
+
+    def delete_rows(self, cutoff):
+        """Delete what is left before the cutoff, oldest first, in chunks"""
+        old = ActivityLog.objects.filter(created_at__lt=cutoff)
+        ordered = old.order_by('created_at', 'id')
+        removed = 0
+        while True:
+            with transaction.atomic():
+                if self.archive:
+                    chunk = list(ordered[:self.chunk_size])
+                    self.write_archive(chunk)
+                    ids = [activity.id for activity in chunk]
+                else:
+                    ids = list(ordered.values_list('id', flat=True)[:self.chunk_size])
+                if not ids:
+                    return removed
+                # The created_at bound keeps the delete to the old partitions
+                old.filter(id__in=ids).delete()
+            removed += len(ids)
+
+    def write_archive(self, activities):
+        count = 0
+        for activity in activities:
+            self.archive.write(json.dumps(activity.to_payload()) + '\n')
+            count += 1
+        return count
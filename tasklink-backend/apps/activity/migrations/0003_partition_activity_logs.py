@@ -0,0 +1,103 @@
+from django.db import migrations
+from django.utils import timezone
+
+from apps.activity.partitions import (
+    MONTHS_AHEAD, TABLE, add_months, create_default_partition,
+    create_partition, month_start,
+)
+
+
+def rebuild_table(apps, schema_editor, partitioned):
+    """
+    Recreate activity_logs (partitioned by month of created_at, or plain)
+    and copy the rows over. PostgreSQL only; other databases keep the plain
+    table. Indexes and constraints keep their names, so later migrations
+    still find them: ``Meta.indexes`` go through the schema editor (field
+    order, opclasses, conditions), other indexes are rebuilt from the
+    introspected columns and orders. Unique constraints gain created_at when
+    partitioned, as PostgreSQL requires the partition key in every one.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    model = apps.get_model('activity', 'ActivityLog')
+    model_indexes = {index.name: index for index in model._meta.indexes}
+    quote = connection.ops.quote_name
+    old = f'{TABLE}_rebuild'
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, TABLE)
+
+    schema_editor.execute(f'ALTER TABLE {quote(TABLE)} RENAME TO {quote(old)}')
+    # Check constraints are copied; their names are per table
+    like = f'LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS'
+    if partitioned:
+        schema_editor.execute(
+            f'CREATE TABLE {quote(TABLE)} ({like}) PARTITION BY RANGE (created_at)')
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT MIN(created_at) FROM {quote(old)}')
+            oldest = cursor.fetchone()[0]
+        now = timezone.now()
+        month, last = month_start(oldest or now), add_months(month_start(now), MONTHS_AHEAD)
+        while month <= last:
+            create_partition(connection, month)
+            month = add_months(month, 1)
+        create_default_partition(connection)
+    else:
+        schema_editor.execute(f'CREATE TABLE {quote(TABLE)} ({like})')
+
+    schema_editor.execute(f'INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old)}')
+    schema_editor.execute(f'DROP TABLE {quote(old)}')
+
+    for name, constraint in constraints.items():
+        if constraint['check']:
+            continue
+        columns = constraint['columns']
+        if constraint['primary_key'] or (constraint['unique'] and not constraint['index']):
+            if partitioned and 'created_at' not in columns:
+                # The partition key must be part of every unique constraint
+                columns = [*columns, 'created_at']
+            elif not partitioned and constraint['primary_key']:
+                columns = ['id']
+            kind = 'PRIMARY KEY' if constraint['primary_key'] else 'UNIQUE'
+            schema_editor.execute(
+                f'ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} '
+                f'{kind} ({", ".join(quote(column) for column in columns)})')
+        elif constraint['foreign_key']:
+            to_table, to_column = constraint['foreign_key']
+            schema_editor.execute(
+                f'ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} '
+                f'FOREIGN KEY ({", ".join(quote(column) for column in columns)}) '
+                f'REFERENCES {quote(to_table)} ({quote(to_column)}) '
+                'DEFERRABLE INITIALLY DEFERRED')
+        elif name in model_indexes:
+            schema_editor.add_index(model, model_indexes[name])
+        elif constraint['index']:
+            orders = constraint.get('orders') or [''] * len(columns)
+            unique = 'UNIQUE ' if constraint['unique'] else ''
+            if unique and partitioned and 'created_at' not in columns:
+                columns, orders = [*columns, 'created_at'], [*orders, '']
+            fields = ', '.join(
+                f'{quote(column)} {order}'.strip()
+                for column, order in zip(columns, orders))
+            schema_editor.execute(
+                f'CREATE {unique}INDEX {quote(name)} ON {quote(TABLE)} ({fields})')
+
+
+def partition(apps, schema_editor):
+    rebuild_table(apps, schema_editor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    rebuild_table(apps, schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0002_activitylog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import uuid
 
+from apps.outbox.models import OutboxEvent
+
+ACTIVITY_LOG_MODE = getattr(settings, 'ACTIVITY_LOG_MODE', 'sync')
+
 
 class ActivityLog(models.Model):
 
@@ -55,7 +61,8 @@ class ActivityLog(models.Model):
         related_name='activities'
     )
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: deferred writes keep the time of the action
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         db_table = 'activity_logs'
@@ -72,13 +79,64 @@ class ActivityLog(models.Model):
 
     @classmethod
     def log_activity(cls, user, action, entity_type, entity_id, description, workspace=None, project=None, metadata=None):
-        return cls.objects.create(
+        """
+        Record an activity. workspace and project may be instances or ids,
+        so callers need not load them. With ACTIVITY_LOG_MODE = 'outbox'
+        the row is written later by the outbox worker, with 'buffered' by
+        this process's write buffer once the transaction commits.
+        """
+        activity = cls(
             user=user,
             action=action,
             entity_type=entity_type,
             entity_id=str(entity_id),
             description=description,
-            workspace=workspace,
-            project=project,
+            workspace_id=getattr(workspace, 'pk', workspace),
+            project_id=getattr(project, 'pk', project),
             metadata=metadata or {}
         )
+        if ACTIVITY_LOG_MODE in ('outbox', 'buffered'):
+            cls.log_many([activity])
+        else:
+            activity.save(force_insert=True)
+        return activity
+
+    @classmethod
+    def log_many(cls, activities):
+        """
+        Record unsaved activities in one statement. Like bulk_create() this
+        sends no post_save; callers invalidate cached reads themselves.
+        """
+        if ACTIVITY_LOG_MODE == 'outbox':
+            OutboxEvent.enqueue_many(
+                'activity', [activity.to_payload() for activity in activities])
+        elif ACTIVITY_LOG_MODE == 'buffered':
+            # Imported here: the buffer module imports this one
+            from .writebehind import get_activity_buffer
+            buffer = get_activity_buffer()
+
+            def queue():
+                for activity in activities:
+                    buffer.add(activity)
+            transaction.on_commit(queue, robust=True)
+        else:
+            cls.objects.bulk_create(activities)
+        return activities
+
+    def to_payload(self):
+        return {
+            'id': str(self.id),
+            'user_id': self.user_id,
+            'action': self.action,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'description': self.description,
+            'workspace_id': str(self.workspace_id) if self.workspace_id else None,
+            'project_id': str(self.project_id) if self.project_id else None,
+            'metadata': self.metadata,
+            'created_at': self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(**{**payload, 'created_at': parse_datetime(payload['created_at'])})
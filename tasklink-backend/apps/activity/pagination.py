@@ -0,0 +1,8 @@
+from apps.core.pagination import KeysetPagination
+
+
+class ActivityFeedPagination(KeysetPagination):
+    """Newest first; each page is one range scan of a (…, created_at) index"""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    max_page_size = 200
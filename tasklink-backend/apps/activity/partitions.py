@@ -0,0 +1,122 @@
+"""
+Monthly partitions of ``activity_logs`` on PostgreSQL.
+
+Migration 0003 turns the table into one partitioned by range of
+``created_at``, with a partition per month (``activity_logs_p202601``
+holds January 2026) and a default partition that catches rows no month
+covers yet. The primary key becomes ``(id, created_at)``, as PostgreSQL
+requires the partition key in every unique constraint. Queries bounded
+on ``created_at`` (the feed, the dashboard) only touch the partitions
+they need, and old months are removed by detaching and dropping a whole
+partition instead of deleting rows.
+
+Other databases keep a plain table; ``prune_activity`` deletes from it in
+chunks. Run ``manage.py prune_activity`` daily: it also creates the
+coming months' partitions.
+"""
+
+import re
+from datetime import datetime, timezone
+
+from .models import ActivityLog
+
+TABLE = ActivityLog._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+MONTHS_AHEAD = 3
+
+_partition_re = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(value):
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p '
+            'JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            [TABLE])
+        return cursor.fetchone() is not None
+
+
+def create_partition(connection, month):
+    """Create the partition holding the month starting at `month`"""
+    quote = connection.ops.quote_name
+    # DDL takes no parameters; the bounds are timestamps we built
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {quote(partition_name(month))} '
+            f'PARTITION OF {quote(TABLE)} FOR VALUES '
+            f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+
+
+def create_default_partition(connection):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {quote(DEFAULT_PARTITION)} '
+            f'PARTITION OF {quote(TABLE)} DEFAULT')
+
+
+def monthly_partitions(connection):
+    """(month, name) of each monthly partition, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s',
+            [TABLE])
+        names = [name for name, in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = _partition_re.match(name)
+        if match:
+            month = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+            partitions.append((month, name))
+    return sorted(partitions)
+
+
+def ensure_partitions(connection, now, months_ahead=MONTHS_AHEAD):
+    """
+    Create the partitions for this month and the next `months_ahead`;
+    returns the names created. A month whose rows already landed in the
+    default partition is skipped (PostgreSQL refuses to create it).
+    """
+    existing = {name for _, name in monthly_partitions(connection)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(month_start(now), offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT 1 FROM {connection.ops.quote_name(DEFAULT_PARTITION)} '
+                'WHERE created_at >= %s AND created_at < %s LIMIT 1',
+                [month, add_months(month, 1)])
+            if cursor.fetchone() is not None:
+                continue
+        create_partition(connection, month)
+        created.append(name)
+    return created
+
+
+def drop_partition(connection, name):
+    """Detach a partition and drop it with its rows"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}')
+        cursor.execute(f'DROP TABLE {quote(name)}')
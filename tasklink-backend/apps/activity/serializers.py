@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+from apps.authentication.serializers import user_summary
+from .models import ActivityLog
+
+
+class ActivityFeedSerializer(serializers.ModelSerializer):
+    """
+    Feed entry. Users come from context['users'] (id -> user), loaded
+    with one query per page instead of one per row.
+    """
+    user = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ActivityLog
+        fields = [
+            'id', 'user', 'action', 'entity_type', 'entity_id',
+            'description', 'metadata', 'workspace', 'project', 'created_at'
+        ]
+
+    def get_user(self, obj):
+        return user_summary(self.context.get('users', {}).get(obj.user_id))
+
+
+class ActivityFeedQuerySerializer(serializers.Serializer):
+    workspace = serializers.UUIDField(required=False)
+    project = serializers.UUIDField(required=False)
+    # Comma-separated, e.g. ?entity_type=task,comment
+    entity_type = serializers.CharField(required=False)
+    before = serializers.DateTimeField(required=False)
+    group = serializers.BooleanField(default=False)
+
+    def validate_entity_type(self, value):
+        types = [entity_type for entity_type in value.split(',') if entity_type]
+        known = dict(ActivityLog.ENTITY_TYPES)
+        unknown = [entity_type for entity_type in types if entity_type not in known]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown entity type: {', '.join(unknown)}")
+        return types
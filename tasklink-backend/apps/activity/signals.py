@@ -0,0 +1,20 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import ActivityLog
+from .writebehind import flush_activity_buffer
+from apps.core.cache import invalidate
+
+
+@receiver(post_save, sender=ActivityLog)
+def invalidate_user_reads(sender, instance, created, raw=False, **kwargs):
+    # The dashboard lists the user's own recent activity
+    if created and not raw:
+        invalidate(user_ids=[instance.user_id])
+
+
+@receiver(request_finished)
+def flush_buffered_activity(sender, **kwargs):
+    # Bounds the loss window of buffered logging to the requests in flight
+    flush_activity_buffer()
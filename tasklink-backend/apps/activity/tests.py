@@ -1,3 +1,259 @@
+"""
+Tests for Activity app
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from apps.core import metrics
+from apps.projects.models import Project
+from apps.workspaces.models import Membership, Workspace
+from .models import ActivityLog
+from .partitions import (
+    MONTHS_AHEAD, TABLE, add_months, is_partitioned, month_start,
+    monthly_partitions, partition_name,
+)
+from .writebehind import ActivityWriteBuffer
+
+User = get_user_model()
+
+
+@mock.patch('apps.activity.models.ACTIVITY_LOG_MODE', 'buffered')
+class BufferedActivityTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(
+            email='test@example.com', username='testuser', password='TestPass123!')
+        self.workspace = Workspace.objects.create(name='Activity', owner=self.user)
+        self.buffer = ActivityWriteBuffer(max_batch=100, autostart=False)
+        # Leave nothing for the buffer's exit-time flush
+        self.addCleanup(self.buffer.flush)
+        patcher = mock.patch('apps.activity.writebehind._buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log(self, index):
+        return ActivityLog.log_activity(
+            user=self.user,
+            action='move',
+            entity_type='column',
+            entity_id=index,
+            description=f'Moved column {index}',
+            workspace=self.workspace.id
+        )
+
+    def test_rows_are_queued_after_commit_and_written_together(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            activities = [self.log(index) for index in range(50)]
+        # A rolled back transaction would leave nothing queued
+        self.assertEqual(self.buffer.pending(), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.buffer.pending(), 50)
+        self.assertFalse(ActivityLog.objects.exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buffer.flush(), 50)
+        self.assertEqual(
+            len([q for q in queries if q['sql'].startswith('INSERT')]), 1)
+        self.assertEqual(
+            set(ActivityLog.objects.values_list('id', flat=True)),
+            {activity.id for activity in activities})
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['activity.write_behind.saved'], 50)
+        self.assertEqual(snapshot['gauges']['activity.write_behind.queue_depth'], 0)
+        self.assertIn('activity.write_behind.flush_ms', snapshot['gauges'])
+
+    def test_request_finished_flushes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log(1)
+
+        request_finished.send(sender=self.__class__)
+
+        self.assertEqual(ActivityLog.objects.count(), 1)
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_full_queue_is_written_by_the_caller(self):
+        self.buffer.max_pending = 10
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(25):
+                self.log(index)
+
+        self.assertEqual(ActivityLog.objects.count(), 20)
+        self.assertEqual(self.buffer.pending(), 5)
+        self.assertEqual(
+            metrics.snapshot()['counters']['activity.write_behind.inline_flushes'], 2)
+
+
+class PruneActivityTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com', username='testuser', password='TestPass123!')
+        now = timezone.now()
+        self.old = [self.log(now - timedelta(days=400 + index)) for index in range(5)]
+        self.recent = self.log(now - timedelta(days=10))
+
+    def log(self, created_at):
+        return ActivityLog.objects.create(
+            user=self.user, action='create', entity_type='task',
+            entity_id='1', description='Created task', created_at=created_at)
+
+    def test_prune_archives_then_deletes_in_chunks(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'activity.ndjson.gz')
+        out = StringIO()
+
+        call_command('prune_activity', '--older-than', '365', '--archive', path,
+                     '--chunk-size', '2', stdout=out)
+
+        self.assertEqual(list(ActivityLog.objects.all()), [self.recent])
+        with gzip.open(path, 'rt') as archive:
+            archived = [json.loads(line) for line in archive]
+        # Oldest first
+        self.assertEqual([row['id'] for row in archived],
+                         [str(activity.id) for activity in reversed(self.old)])
+        self.assertIn('Removed 5 activity rows', out.getvalue())
+
+    def test_dry_run_keeps_rows(self):
+        out = StringIO()
+        call_command('prune_activity', '--older-than', '365', '--dry-run', stdout=out)
+
+        self.assertEqual(ActivityLog.objects.count(), 6)
+        self.assertIn('Would remove 5 activity rows', out.getvalue())
+
+    def test_month_arithmetic(self):
+        december = datetime(2025, 12, 1, tzinfo=dt_timezone.utc)
+        self.assertEqual(add_months(december, 1), datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(add_months(december, -12), datetime(2024, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partition_name(december), 'activity_logs_p202512')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning is PostgreSQL only')
+class PartitionLayoutTests(TestCase):
+
+    def test_monthly_partitions_cover_the_coming_months(self):
+        self.assertTrue(is_partitioned(connection))
+        months = [month for month, _ in monthly_partitions(connection)]
+        current = month_start(timezone.now())
+        for offset in range(MONTHS_AHEAD + 1):
+            self.assertIn(add_months(current, offset), months)
+
+    def test_rebuilt_table_keeps_model_indexes_and_keys(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, TABLE)
+
+        for index in ActivityLog._meta.indexes:
+            fields = [name.lstrip('-') for name in index.fields]
+            self.assertEqual(
+                constraints[index.name]['columns'],
+                [ActivityLog._meta.get_field(name).column for name in fields])
+            self.assertEqual(
+                constraints[index.name]['orders'],
+                ['DESC' if name.startswith('-') else 'ASC' for name in index.fields])
+
+        primary_key, = [c for c in constraints.values() if c['primary_key']]
+        self.assertEqual(primary_key['columns'], ['id', 'created_at'])
+        foreign_keys = {c['foreign_key'][0] for c in constraints.values()
+                        if c['foreign_key']}
+        self.assertEqual(foreign_keys, {'users', 'workspaces', 'projects'})
+
+
+class ActivityFeedTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', username='testuser', password='TestPass123!')
+        self.other = User.objects.create_user(
+            email='other@example.com', username='other', password='TestPass123!')
+        self.workspace = Workspace.objects.create(name='Feed', owner=self.user)
+        Membership.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        Membership.objects.create(workspace=self.workspace, user=self.other, role='member')
+        self.project = Project.objects.create(
+            workspace=self.workspace, name='Feed project', created_by=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def log(self, minutes, user=None, entity_type='task', entity_id='1',
+            action='update', workspace=None):
+        return ActivityLog.objects.create(
+            user=user or self.user, action=action, entity_type=entity_type,
+            entity_id=entity_id, description=f'{action} {entity_type}',
+            workspace=workspace or self.workspace, project=self.project,
+            created_at=self.start + timedelta(minutes=minutes))
+
+    def test_feed_pages_newest_first_in_two_queries(self):
+        activities = [self.log(index, user=[self.user, self.other][index % 2],
+                               entity_id=str(index)) for index in range(30)]
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/activity/', {'page_size': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(activity.id) for activity in activities[:-21:-1]])
+        self.assertEqual(response.data['results'][0]['user']['username'], 'other')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(activity.id) for activity in activities[9::-1]])
+        self.assertIsNone(response.data['next'])
+
+    def test_filters(self):
+        task = self.log(1)
+        comment = self.log(2, entity_type='comment')
+        self.log(3, entity_type='file')
+        foreign = Workspace.objects.create(name='Foreign', owner=self.other)
+        self.log(4, workspace=foreign)
+
+        response = self.client.get('/api/activity/', {'entity_type': 'task,comment'})
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(comment.id), str(task.id)])
+
+        response = self.client.get('/api/activity/', {
+            'project': str(self.project.id),
+            'before': (self.start + timedelta(minutes=2)).isoformat(),
+        })
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(task.id)])
+
+        # Not a member: nothing leaks
+        response = self.client.get('/api/activity/', {'workspace': str(foreign.id)})
+        self.assertEqual(response.data['results'], [])
+
+        response = self.client.get('/api/activity/', {'entity_type': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_grouping_collapses_consecutive_actions(self):
+        first = self.log(1)
+        self.log(2)
+        last = self.log(3)
+        comment = self.log(4, action='comment')
+
+        response = self.client.get('/api/activity/', {'group': 'true'})
 
-# Create your tests here.
+        results = response.data['results']
+        self.assertEqual([(entry['id'], entry['count']) for entry in results],
+                         [(str(comment.id), 1), (str(last.id), 3)])
+        self.assertEqual(results[1]['first_created_at'],
+                         first.created_at.isoformat().replace('+00:00', 'Z'))
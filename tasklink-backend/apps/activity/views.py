@@ -1,3 +1,83 @@
-from django.shortcuts import render
+from django.contrib.auth import get_user_model
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from apps.workspaces.models import Membership
+from .models import ActivityLog
+from .pagination import ActivityFeedPagination
+from .serializers import ActivityFeedQuerySerializer, ActivityFeedSerializer
+
+User = get_user_model()
+
+
+def group_consecutive(activities, entries):
+    """
+    Collapse runs of the same user doing the same thing to the same object
+    into their newest entry, with `count` and the run's `first_created_at`.
+    Runs are only merged within a page.
+    """
+    groups, previous = [], None
+    for activity, entry in zip(activities, entries):
+        key = (activity.user_id, activity.action, activity.entity_type,
+               activity.entity_id, activity.project_id)
+        if groups and key == previous:
+            groups[-1]['count'] += 1
+            groups[-1]['first_created_at'] = entry['created_at']
+        else:
+            groups.append({**entry, 'count': 1, 'first_created_at': entry['created_at']})
+        previous = key
+    return groups
+
+
+class ActivityFeedView(generics.ListAPIView):
+    """
+    Activity in the user's workspaces, newest first.
+
+    Filters: ?workspace=, ?project=, ?entity_type=task,comment and
+    ?before=<datetime>. Pages follow the ``next`` cursor; ?group=true
+    collapses consecutive identical actions. A page costs two queries: the
+    activity rows and their users.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ActivityFeedSerializer
+    pagination_class = ActivityFeedPagination
+
+    def get_queryset(self):
+        self.params = ActivityFeedQuerySerializer(data=self.request.query_params)
+        self.params.is_valid(raise_exception=True)
+        params = self.params.validated_data
+
+        # A membership subquery instead of MembershipMap keeps the page to
+        # a single query
+        queryset = ActivityLog.objects.filter(
+            workspace_id__in=Membership.objects.filter(
+                user=self.request.user, is_active=True
+            ).values('workspace_id')
+        )
+        if 'workspace' in params:
+            queryset = queryset.filter(workspace_id=params['workspace'])
+        if 'project' in params:
+            queryset = queryset.filter(project_id=params['project'])
+        if params.get('entity_type'):
+            queryset = queryset.filter(entity_type__in=params['entity_type'])
+        if 'before' in params:
+            queryset = queryset.filter(created_at__lt=params['before'])
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['users'] = getattr(self, 'users', {})
+        return context
+
+    def list(self, request, *args, **kwargs):
+        activities = self.paginate_queryset(self.get_queryset())
+
+        user_ids = {activity.user_id for activity in activities if activity.user_id}
+        self.users = User.objects.only(
+            'id', 'username', 'full_name', 'avatar'
+        ).in_bulk(user_ids) if user_ids else {}
+        data = self.get_serializer(activities, many=True).data
+
+        if self.params.validated_data['group']:
+            data = group_consecutive(activities, data)
+        return self.get_paginated_response(data)
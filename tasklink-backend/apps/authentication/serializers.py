@@ -6,6 +6,18 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 User = get_user_model()
 
 
+def user_summary(user):
+    """The few user fields feeds and inboxes show next to an entry"""
+    if user is None:
+        return None
+    return {
+        'id': str(user.id),
+        'username': user.username,
+        'full_name': user.full_name or user.username,
+        'avatar': user.avatar.url if user.avatar else None,
+    }
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User serializer for basic user info"""
 
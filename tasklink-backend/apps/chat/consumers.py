@@ -1,19 +1,154 @@
+import asyncio
 import json
+import uuid
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from .models import ChatMessage
+from .encoding import encode_frame, wrap_frame
+from .presence import HEARTBEAT_INTERVAL, get_presence
+from .replay import REPLAY_LIMIT, get_replay, missed_frames
+from .throttling import TYPING_TTL, TokenBucket, TypingState
+from apps.core import metrics
+from .writebehind import WRITE_BEHIND, get_write_buffer
 from apps.projects.models import Project
+from apps.workspaces.memberships import MembershipMap
 
 User = get_user_model()
 
+# Close code sent when the user lost access to the project
+ACCESS_REVOKED = 4403
+
+
+def user_group_name(user_id):
+    """Group every socket of a user joins, for per-user control events"""
+    return f'user_{user_id}'
+
+
+def project_group_name(project_id):
+    return f'project_{project_id}'
+
+
+def project_topic(project_id):
+    """Stream topic of a project's chat; also tags the project's group events"""
+    return f'project:{project_id}'
+
+
+def sender_data(user):
+    return {
+        'id': str(user.id),
+        'username': user.username,
+        'email': user.email,
+        'full_name': user.full_name or user.username,
+        'avatar': user.avatar.url if user.avatar else None
+    }
+
+
+def message_frame(message, sender):
+    """The encoded frame broadcast (and replayed) for a chat message"""
+    return encode_frame({
+        'type': 'message',
+        'message': {
+            'id': str(message.id),
+            'content': message.content,
+            'sender': sender_data(sender),
+            'created_at': message.created_at.isoformat(),
+            'is_edited': message.is_edited
+        }
+    })
+
+
+def queue_message(project_id, user, content):
+    # id and created_at are assigned here, so clients see the final values
+    message = ChatMessage(project_id=project_id, sender=user, content=content)
+    get_write_buffer().add(message)
+    return message
+
+
+@database_sync_to_async
+def save_message(project_id, user, content):
+    # Access was checked by the caller; no need to load the project again
+    return ChatMessage.objects.create(
+        project_id=project_id, sender=user, content=content)
+
+
+@sync_to_async
+def record_replay(project_id, message, frame):
+    get_replay().record(project_id, message.id, message.created_at, frame)
+
+
+async def post_message(channel_layer, project_id, user, content):
+    """Save (or queue) a chat message and broadcast it to the project"""
+    if WRITE_BEHIND:
+        message = queue_message(project_id, user, content)
+    else:
+        message = await save_message(project_id, user, content)
+
+    # Encode once here; every receiving socket forwards the text
+    frame = message_frame(message, user)
+    await record_replay(project_id, message, frame)
+    await channel_layer.group_send(
+        project_group_name(project_id),
+        {'type': 'chat_message',
+         'topic': project_topic(project_id),
+         'message_id': str(message.id),
+         'frame': frame}
+    )
+
+
+async def broadcast_typing(channel_layer, project_id, user, is_typing):
+    await channel_layer.group_send(
+        project_group_name(project_id),
+        {
+            'type': 'typing_indicator',
+            'topic': project_topic(project_id),
+            'user_id': str(user.id),
+            'frame': encode_frame({
+                'type': 'typing',
+                'user_id': str(user.id),
+                'username': user.username,
+                'is_typing': is_typing,
+                'expires_in': TYPING_TTL
+            })
+        }
+    )
+
+
+async def broadcast_status(channel_layer, project_id, user, status):
+    await channel_layer.group_send(
+        project_group_name(project_id),
+        {
+            'type': 'user_status',
+            'topic': project_topic(project_id),
+            'frame': encode_frame({
+                'type': 'user_status',
+                'user_id': str(user.id),
+                'username': user.username,
+                'status': status
+            })
+        }
+    )
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
 
     async def connect(self):
         self.project_id = self.scope['url_route']['kwargs']['project_id']
-        self.project_group_name = f'project_{self.project_id}'
+        self.project_group_name = project_group_name(self.project_id)
         self.user = self.scope['user']
+        # Roles are loaded once and reused for every check on this connection
+        self.memberships = MembershipMap(self.user)
+        self.access_revoked = False
+        # Ids sent by the last resume, so live copies are not sent twice
+        self.replayed_ids = set()
+        # Ids sent live before the client resumed, so the replay skips them
+        self.live_ids = set()
+        self.frame_bucket = TokenBucket()
+        self.typing = TypingState()
 
         if not self.user.is_authenticated:
             await self.close()
@@ -24,149 +159,450 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        # Join project group
+        # Join project group, and the user's group for revocation events
         await self.channel_layer.group_add(
             self.project_group_name,
             self.channel_name
         )
+        await self.channel_layer.group_add(
+            user_group_name(self.user.id),
+            self.channel_name
+        )
 
         await self.accept()
 
-        # Mark user as online
-        await self.set_user_online(True)
+        # Register this connection; other tabs of the same user keep theirs
+        first_connection = await self.update_presence(connected=True)
+        self.heartbeat_task = asyncio.ensure_future(self.send_heartbeats())
 
         # Broadcast user joined
-        await self.channel_layer.group_send(
-            self.project_group_name,
-            {
-                'type': 'user_status',
-                'user_id': str(self.user.id),
-                'username': self.user.username,
-                'status': 'online'
-            }
-        )
+        if first_connection:
+            await self.broadcast_status('online')
 
     async def disconnect(self, close_code):
-        # Mark user as offline
-        await self.set_user_online(False)
+        heartbeat_task = getattr(self, 'heartbeat_task', None)
+        if heartbeat_task is None:
+            # Rejected before joining the group
+            return
+        heartbeat_task.cancel()
+
+        # Only the last open connection takes the user offline
+        last_connection = await self.update_presence(connected=False)
 
         # Broadcast user left
-        await self.channel_layer.group_send(
-            self.project_group_name,
-            {
-                'type': 'user_status',
-                'user_id': str(self.user.id),
-                'username': self.user.username,
-                'status': 'offline'
-            }
-        )
+        if last_connection:
+            await self.broadcast_status('offline')
 
         # Leave project group
         await self.channel_layer.group_discard(
             self.project_group_name,
             self.channel_name
         )
+        await self.channel_layer.group_discard(
+            user_group_name(self.user.id),
+            self.channel_name
+        )
 
     async def receive(self, text_data):
+        if self.access_revoked:
+            await self.close(code=ACCESS_REVOKED)
+            return
+
         try:
             data = json.loads(text_data)
             message_type = data.get('type', 'message')
 
+            if not self.frame_bucket.allow():
+                metrics.incr('chat.frames.dropped')
+                if message_type == 'message':
+                    # Tell the sender, so the client can retry the message
+                    await self.send(text_data=encode_frame({
+                        'type': 'error', 'error': 'rate_limited'}))
+                return
+
             if message_type == 'message':
                 content = data.get('content', '').strip()
 
                 if not content:
                     return
 
-                # Save message to database
-                message = await self.save_message(content)
-
-                # Broadcast message to project group
-                await self.channel_layer.group_send(
-                    self.project_group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': {
-                            'id': str(message.id),
-                            'content': message.content,
-                            'sender': {
-                                'id': str(self.user.id),
-                                'username': self.user.username,
-                                'email': self.user.email,
-                                'full_name': self.user.full_name or self.user.username,
-                                'avatar': self.user.avatar.url if self.user.avatar else None
-                            },
-                            'created_at': message.created_at.isoformat(),
-                            'is_edited': message.is_edited
-                        }
-                    }
-                )
+                self.typing.clear()
+
+                # Save message to database, or queue it and broadcast now
+                await post_message(
+                    self.channel_layer, self.project_id, self.user, content)
+
+            elif message_type == 'resume':
+                await self.resume(
+                    data.get('last_message_id'), data.get('since'))
 
             elif message_type == 'typing':
-                # Broadcast typing indicator
-                is_typing = data.get('is_typing', False)
-                await self.channel_layer.group_send(
-                    self.project_group_name,
-                    {
-                        'type': 'typing_indicator',
-                        'user_id': str(self.user.id),
-                        'username': self.user.username,
-                        'is_typing': is_typing
-                    }
-                )
+                # Broadcast typing indicator on changes and periodic refreshes only
+                is_typing = bool(data.get('is_typing', False))
+                if not self.typing.update(is_typing):
+                    metrics.incr('chat.typing.coalesced')
+                    return
+                metrics.incr('chat.typing.broadcast')
+                await broadcast_typing(
+                    self.channel_layer, self.project_id, self.user, is_typing)
 
         except json.JSONDecodeError:
             pass
 
+    async def membership_revoked(self, event):
+        """The user left or was removed from a workspace"""
+        if event['workspace_id'] != str(self.workspace_id):
+            return
+        self.memberships.invalidate()
+        self.access_revoked = True
+        # Stop receiving project traffic now; the socket closes on its next message
+        await self.channel_layer.group_discard(
+            self.project_group_name,
+            self.channel_name
+        )
+
+    # Group events carry a frame already encoded by the sender
+
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'message',
-            'message': event['message']
-        }))
+        if self.replayed_ids and event.get('message_id') in self.replayed_ids:
+            # Sent during the replay that preceded this event
+            self.replayed_ids.discard(event['message_id'])
+            return
+        if self.live_ids is not None and 'message_id' in event:
+            self.live_ids.add(event['message_id'])
+        await self.send(text_data=event['frame'])
 
     async def user_status(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'user_status',
-            'user_id': event['user_id'],
-            'username': event['username'],
-            'status': event['status']
-        }))
+        await self.send(text_data=event['frame'])
 
     async def typing_indicator(self, event):
         # Don't send typing indicator to the user who is typing
         if event['user_id'] != str(self.user.id):
-            await self.send(text_data=json.dumps({
-                'type': 'typing',
-                'user_id': event['user_id'],
-                'username': event['username'],
-                'is_typing': event['is_typing']
-            }))
+            await self.send(text_data=event['frame'])
+
+    async def resume(self, last_message_id, since):
+        """Send the messages a reconnecting client missed, then go live"""
+        since = parse_datetime(since) if isinstance(since, str) else None
+        if last_message_id is None and since is None:
+            return
+        # Group events queue up while this runs and are delivered after it
+        frames = await self.ring_frames(last_message_id, since)
+        truncated = False
+        if frames is None:
+            frames, truncated = await self.stored_frames(last_message_id, since)
+
+        # Joined the group at connect: skip what already went out live
+        live_ids, self.live_ids = self.live_ids or set(), None
+        frames = [(message_id, frame) for message_id, frame in frames
+                  if message_id not in live_ids]
+        for _, frame in frames:
+            await self.send(text_data=frame)
+        self.replayed_ids = {message_id for message_id, _ in frames}
+        await self.send(text_data=encode_frame({
+            'type': 'resumed',
+            'replayed': len(frames),
+            # Too far behind: reload history over REST instead
+            'truncated': truncated
+        }))
+
+    @sync_to_async
+    def ring_frames(self, last_message_id, since):
+        return missed_frames(
+            get_replay().entries(self.project_id), last_message_id, since)
+
+    @database_sync_to_async
+    def stored_frames(self, last_message_id, since):
+        position = None
+        if last_message_id is not None:
+            try:
+                anchor_at = ChatMessage.objects.filter(
+                    pk=last_message_id).values_list('created_at', flat=True).first()
+            except ValidationError:
+                anchor_at = None
+            if anchor_at is not None:
+                position = Q(created_at__gt=anchor_at) | Q(
+                    created_at=anchor_at, id__gt=last_message_id)
+        if position is None and since is not None:
+            position = Q(created_at__gt=since)
+        if position is None:
+            # Unknown message and no time to go by
+            return [], True
+
+        messages = list(ChatMessage.objects.filter(
+            position, project_id=self.project_id
+        ).select_related('sender').order_by('created_at', 'id')[:REPLAY_LIMIT + 1])
+        frames = [(str(message.id), message_frame(message, message.sender))
+                  for message in messages[:REPLAY_LIMIT]]
+        return frames, len(messages) > REPLAY_LIMIT
+
+    async def broadcast_status(self, status):
+        await broadcast_status(
+            self.channel_layer, self.project_id, self.user, status)
 
     @database_sync_to_async
     def check_project_access(self):
         try:
-            project = Project.objects.get(id=self.project_id)
-            # Check if user is a member of the workspace
-            return project.workspace.memberships.filter(
-                user=self.user,
-                is_active=True
-            ).exists()
+            self.workspace_id = Project.objects.values_list(
+                'workspace_id', flat=True).get(id=self.project_id)
         except Project.DoesNotExist:
             return False
+        # Check if user is a member of the workspace
+        return self.memberships.is_member(self.workspace_id)
 
-    @database_sync_to_async
-    def save_message(self, content):
-        project = Project.objects.get(id=self.project_id)
-        message = ChatMessage.objects.create(
-            project=project,
-            sender=self.user,
-            content=content
-        )
-        return message
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await self.update_presence(connected=True)
+
+    @sync_to_async
+    def update_presence(self, connected):
+        presence = get_presence()
+        if connected:
+            return presence.connect(
+                self.user.id, self.project_id, self.channel_name)
+        return presence.disconnect(
+            self.user.id, self.project_id, self.channel_name)
+
+
+def board_group_name(project_id):
+    return f'board_{project_id}'
+
+
+def notification_group_name(user_id):
+    return f'notifications_{user_id}'
+
+
+class StreamConsumer(AsyncWebsocketConsumer):
+    """
+    One socket per user for every project it follows.
+
+    Clients send ``{"type": "subscribe", "topics": [...]}`` and
+    ``{"type": "unsubscribe", "topics": [...]}`` with topics
+    ``project:<id>`` (chat, presence and typing), ``board:<id>`` (task
+    board events) and ``notifications``. Access is checked at subscribe
+    time against the connection's membership map, with one query for all
+    requested projects. Chat ``message`` and ``typing`` frames name the
+    project topic they are for. Outgoing frames are ``{"topic": ...,
+    "data": <frame>}``.
+    """
+
+    MAX_TOPICS = 200
+
+    async def connect(self):
+        self.user = self.scope['user']
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+
+        self.memberships = MembershipMap(self.user)
+        self.topics = {}        # topic -> (group name, workspace id)
+        self.typing = {}        # project id -> TypingState
+        self.frame_bucket = TokenBucket()
+
+        await self.channel_layer.group_add(
+            user_group_name(self.user.id), self.channel_name)
+        await self.accept()
+        self.heartbeat_task = asyncio.ensure_future(self.send_heartbeats())
+
+    async def disconnect(self, close_code):
+        heartbeat_task = getattr(self, 'heartbeat_task', None)
+        if heartbeat_task is None:
+            return
+        heartbeat_task.cancel()
+
+        for topic in list(self.topics):
+            await self.leave(topic)
+        await self.channel_layer.group_discard(
+            user_group_name(self.user.id), self.channel_name)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(data, dict):
+            return
+        message_type = data.get('type')
+
+        if not self.frame_bucket.allow():
+            metrics.incr('chat.frames.dropped')
+            if message_type == 'message':
+                await self.send_control(
+                    {'type': 'error', 'error': 'rate_limited'})
+            return
+
+        if message_type == 'subscribe':
+            await self.subscribe(data.get('topics'))
+
+        elif message_type == 'unsubscribe':
+            left = [topic for topic in self.topic_list(data.get('topics'))
+                    if topic in self.topics]
+            for topic in left:
+                await self.leave(topic)
+            await self.send_control({'type': 'unsubscribed', 'topics': left})
+
+        elif message_type in ('message', 'typing'):
+            kind, project_id = parse_topic(data.get('topic'))
+            if kind != 'project' or project_topic(project_id) not in self.topics:
+                await self.send_control({
+                    'type': 'error',
+                    'error': 'not_subscribed',
+                    'topic': data.get('topic')
+                })
+                return
+
+            if message_type == 'message':
+                content = str(data.get('content', '')).strip()
+                if not content:
+                    return
+                self.typing_state(project_id).clear()
+                await post_message(
+                    self.channel_layer, project_id, self.user, content)
+            else:
+                is_typing = bool(data.get('is_typing', False))
+                if not self.typing_state(project_id).update(is_typing):
+                    metrics.incr('chat.typing.coalesced')
+                    return
+                metrics.incr('chat.typing.broadcast')
+                await broadcast_typing(
+                    self.channel_layer, project_id, self.user, is_typing)
+
+    async def subscribe(self, topics):
+        requested = [topic for topic in self.topic_list(topics)
+                     if topic not in self.topics]
+        room = self.MAX_TOPICS - len(self.topics)
+        requested, overflow = requested[:room], requested[room:]
+
+        parsed = {topic: parse_topic(topic) for topic in requested}
+        workspaces = await self.project_workspaces(
+            [target for kind, target in parsed.values() if kind in ('project', 'board')])
+
+        granted, denied = [], overflow
+        for topic, (kind, target) in parsed.items():
+            if kind == 'notifications':
+                group, workspace_id = notification_group_name(self.user.id), None
+            elif kind in ('project', 'board') and target in workspaces:
+                workspace_id = workspaces[target]
+                group = (project_group_name(target) if kind == 'project'
+                         else board_group_name(target))
+            else:
+                denied.append(topic)
+                continue
+
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.topics[topic] = (group, workspace_id)
+            granted.append(topic)
+            if kind == 'project':
+                if await self.update_presence(target, connected=True):
+                    await broadcast_status(
+                        self.channel_layer, target, self.user, 'online')
+
+        await self.send_control(
+            {'type': 'subscribed', 'topics': granted, 'denied': denied})
+
+    async def leave(self, topic):
+        group, _ = self.topics.pop(topic)
+        await self.channel_layer.group_discard(group, self.channel_name)
+        if topic.startswith('project:'):
+            project_id = topic.split(':', 1)[1]
+            self.typing.pop(project_id, None)
+            if await self.update_presence(project_id, connected=False):
+                await broadcast_status(
+                    self.channel_layer, project_id, self.user, 'offline')
+
+    async def membership_revoked(self, event):
+        """Drop every topic of the workspace the user lost access to"""
+        self.memberships.invalidate()
+        revoked = [topic for topic, (_, workspace_id) in self.topics.items()
+                   if str(workspace_id) == event['workspace_id']]
+        for topic in revoked:
+            await self.leave(topic)
+        if revoked:
+            await self.send_control({
+                'type': 'unsubscribed',
+                'topics': revoked,
+                'reason': 'access_revoked'
+            })
+
+    # Group events carry a frame already encoded by the sender and the
+    # topic it belongs to; it is wrapped without being decoded again
+
+    async def chat_message(self, event):
+        await self.send(text_data=wrap_frame(event['topic'], event['frame']))
+
+    async def user_status(self, event):
+        await self.send(text_data=wrap_frame(event['topic'], event['frame']))
+
+    async def typing_indicator(self, event):
+        if event['user_id'] != str(self.user.id):
+            await self.send(text_data=wrap_frame(event['topic'], event['frame']))
+
+    async def board_event(self, event):
+        await self.send(text_data=wrap_frame(event['topic'], event['frame']))
+
+    async def notification(self, event):
+        await self.send(text_data=wrap_frame(event['topic'], event['frame']))
+
+    async def send_control(self, payload):
+        await self.send(text_data=encode_frame(payload))
+
+    def topic_list(self, topics):
+        """Requested topics in canonical form, invalid ones kept for denial"""
+        if not isinstance(topics, list):
+            return []
+        canonical = []
+        for topic in topics:
+            kind, target = parse_topic(topic)
+            if kind == 'notifications':
+                canonical.append(topic)
+            elif kind is not None:
+                canonical.append(f'{kind}:{target}')
+            elif isinstance(topic, str):
+                canonical.append(topic)
+        return list(dict.fromkeys(canonical))
+
+    def typing_state(self, project_id):
+        state = self.typing.get(project_id)
+        if state is None:
+            state = self.typing[project_id] = TypingState()
+        return state
 
     @database_sync_to_async
-    def set_user_online(self, is_online):
-        if is_online:
-            self.user.set_online()
-        else:
-            self.user.set_offline()
+    def project_workspaces(self, project_ids):
+        """Workspace of each requested project the user may see"""
+        if not project_ids:
+            return {}
+        rows = Project.objects.filter(id__in=set(project_ids)).values_list(
+            'id', 'workspace_id')
+        return {str(project_id): workspace_id for project_id, workspace_id in rows
+                if self.memberships.is_member(workspace_id)}
+
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            for topic in list(self.topics):
+                if topic.startswith('project:'):
+                    await self.update_presence(
+                        topic.split(':', 1)[1], connected=True)
+
+    @sync_to_async
+    def update_presence(self, project_id, connected):
+        presence = get_presence()
+        if connected:
+            return presence.connect(self.user.id, project_id, self.channel_name)
+        return presence.disconnect(self.user.id, project_id, self.channel_name)
+
+
+def parse_topic(topic):
+    """('project' | 'board', project id) or ('notifications', None); None kind if invalid"""
+    if topic == 'notifications':
+        return 'notifications', None
+    if not isinstance(topic, str):
+        return None, None
+    kind, _, target = topic.partition(':')
+    if kind not in ('project', 'board'):
+        return None, None
+    try:
+        return kind, str(uuid.UUID(target))
+    except ValueError:
+        return None, None
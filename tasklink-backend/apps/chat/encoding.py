@@ -0,0 +1,36 @@
+"""
+JSON encoding for WebSocket frames.
+
+Broadcast frames are encoded once by the sender and carried through the
+channel layer as text, so fan-out to N sockets costs one encode instead
+of N. ujson is used when installed; set CHAT_JSON_ENCODER = 'json' to
+force the standard library.
+"""
+
+import json
+
+from django.conf import settings
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - ujson is in requirements.txt
+    ujson = None
+
+
+def _ujson_dumps(data):
+    return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False)
+
+
+def _json_dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+if ujson is not None and getattr(settings, 'CHAT_JSON_ENCODER', 'ujson') == 'ujson':
+    encode_frame = _ujson_dumps
+else:
+    encode_frame = _json_dumps
+
+
+def wrap_frame(topic, frame):
+    """Tag an encoded frame with its stream topic without decoding it"""
+    return '{"topic":' + encode_frame(topic) + ',"data":' + frame + '}'
@@ -0,0 +1,79 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.chat.models import ChatMessage
+from apps.chat.writebehind import ChatWriteBuffer
+from apps.projects.models import Project
+from apps.workspaces.models import Workspace
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare chat message throughput and per-message latency of the '
+        'synchronous INSERT path against write-behind batching. Creates a '
+        'temporary user, workspace and project and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages', type=int, default=2000,
+            help='Messages written by each path')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        user = User.objects.create(
+            email='chat-bench@example.com', username='chat-bench', password='!')
+        try:
+            workspace = Workspace.objects.create(name='Chat bench', owner=user)
+            project = Project.objects.create(workspace=workspace, name='Chat bench')
+
+            self.report('insert per message', count, *self.run_sync(
+                project, user, count))
+            self.report('write-behind', count, *self.run_write_behind(
+                project, user, count))
+        finally:
+            user.delete()
+
+    def report(self, label, count, latencies, total):
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        self.stdout.write(
+            f'{label:<20} {count / total:10.0f} msg/s   '
+            f'ready-to-broadcast p50 {p50:.3f} ms  p99 {p99:.3f} ms')
+
+    def run_sync(self, project, user, count):
+        latencies = []
+        started = time.perf_counter()
+        for index in range(count):
+            before = time.perf_counter()
+            ChatMessage.objects.create(
+                project_id=project.id, sender=user, content=f'sync {index}')
+            latencies.append(time.perf_counter() - before)
+        return latencies, time.perf_counter() - started
+
+    def run_write_behind(self, project, user, count):
+        buffer = ChatWriteBuffer()
+        latencies = []
+        started = time.perf_counter()
+        for index in range(count):
+            before = time.perf_counter()
+            buffer.add(ChatMessage(
+                project_id=project.id, sender=user, content=f'batched {index}'))
+            latencies.append(time.perf_counter() - before)
+        # Throughput counts until every row is in the database
+        saved = ChatMessage.objects.filter(
+            project_id=project.id, content__startswith='batched ')
+        deadline = time.perf_counter() + 30
+        while saved.count() < count and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        total = time.perf_counter() - started
+
+        if saved.count() != count:
+            self.stderr.write(
+                f'write-behind saved {saved.count()} of {count} messages')
+        return latencies, total
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.chat.consumers import ChatConsumer
+from apps.chat.encoding import encode_frame
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare chat fan-out CPU per message when every socket encodes the '
+        'frame versus forwarding a frame encoded once by the sender'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1,10,100,500,1000',
+            help='Comma separated group sizes')
+        parser.add_argument(
+            '--messages', type=int, default=200,
+            help='Messages broadcast per group size')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(
+            f'{"sockets":>8} {"per-socket":>14} {"pre-encoded":>14} '
+            f'{"encode only":>14}   (CPU microseconds per message)')
+        for size in sizes:
+            per_socket, pre_encoded, encode_only = asyncio.run(
+                self.measure(size, options['messages']))
+            self.stdout.write(
+                f'{size:>8} {per_socket:>14.1f} {pre_encoded:>14.1f} '
+                f'{encode_only:>14.1f}')
+
+    def consumers(self, size):
+        async def send(text_data=None, bytes_data=None, close=False):
+            pass
+
+        consumers = []
+        for _ in range(size):
+            consumer = ChatConsumer()
+            consumer.send = send
+            consumers.append(consumer)
+        return consumers
+
+    def payload(self):
+        return {
+            'id': str(uuid.uuid4()),
+            'content': 'Shipping the board changes after lunch, ping me '
+                       'if anything looks off.',
+            'sender': {
+                'id': '42',
+                'username': 'member',
+                'email': 'member@example.com',
+                'full_name': 'Team Member',
+                'avatar': '/media/avatars/member.png',
+            },
+            'created_at': timezone.now().isoformat(),
+            'is_edited': False,
+        }
+
+    async def measure(self, size, messages):
+        consumers = self.consumers(size)
+        payloads = [self.payload() for _ in range(messages)]
+
+        # Previous behaviour: each handler encodes the shared dict again
+        started = time.process_time()
+        for message in payloads:
+            for consumer in consumers:
+                await consumer.send(text_data=json.dumps(
+                    {'type': 'message', 'message': message}))
+        per_socket = time.process_time() - started
+
+        started = time.process_time()
+        encode_total = 0.0
+        for message in payloads:
+            encode_started = time.process_time()
+            event = {
+                'type': 'chat_message',
+                'frame': encode_frame({'type': 'message', 'message': message}),
+            }
+            encode_total += time.process_time() - encode_started
+            for consumer in consumers:
+                await consumer.chat_message(event)
+        pre_encoded = time.process_time() - started
+
+        scale = 1_000_000 / messages
+        return per_socket * scale, pre_encoded * scale, encode_total * scale
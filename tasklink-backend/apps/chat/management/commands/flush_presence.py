@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chat.presence import RedisPresence, get_presence, persist_presence
+
+
+class Command(BaseCommand):
+    help = 'Persist last_seen and is_online from the presence service in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=int, default=0, metavar='SECONDS',
+            help='Keep flushing every SECONDS instead of once')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Users written per UPDATE')
+
+    def handle(self, *args, **options):
+        presence = get_presence()
+        if not isinstance(presence, RedisPresence):
+            # This process would see no connections and mark everyone offline;
+            # the in-process backend persists itself from the server process
+            raise CommandError(
+                'flush_presence needs a shared presence backend; '
+                'set PRESENCE_REDIS_URL')
+
+        while True:
+            updated = persist_presence(presence, options['batch_size'])
+            if options['verbosity'] > 1 or not options['loop']:
+                self.stdout.write(f'Flushed presence for {updated} users')
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def populate_read_states(apps, schema_editor):
+    """One watermark per (user, project) at the newest message they had read"""
+    ChatMessageRead = apps.get_model('chat', 'ChatMessageRead')
+    ChatReadState = apps.get_model('chat', 'ChatReadState')
+
+    reads = ChatMessageRead.objects.order_by(
+        'user_id', 'message__project_id', '-message__created_at'
+    ).values_list(
+        'user_id', 'message__project_id', 'message_id', 'message__created_at'
+    )
+
+    rows, previous = [], None
+    for user_id, project_id, message_id, created_at in reads.iterator(chunk_size=2000):
+        if (user_id, project_id) == previous:
+            continue
+        previous = (user_id, project_id)
+        rows.append(ChatReadState(
+            user_id=user_id,
+            project_id=project_id,
+            last_read_at=created_at,
+            last_read_message_id=message_id
+        ))
+
+    ChatReadState.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chatreadstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_read_states, migrations.RunPython.noop),
+    ]
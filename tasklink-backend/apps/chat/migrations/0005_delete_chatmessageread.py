@@ -0,0 +1,14 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_populate_read_states'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='ChatMessageRead',
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import Subquery
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
 import uuid
 
 
@@ -18,7 +21,8 @@ class ChatMessage(models.Model):
     )
     content = models.TextField()
     is_edited = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: write-behind saves keep the time the message was sent
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -33,26 +37,95 @@ class ChatMessage(models.Model):
         return f"{self.sender.email}: {self.content[:50]}"
 
 
-class ChatMessageRead(models.Model):
+class ChatReadState(models.Model):
+    """How far a user has read a project's chat, as one watermark row"""
 
-    message = models.ForeignKey(
-        ChatMessage,
-        on_delete=models.CASCADE,
-        related_name='read_receipts'
-    )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name='read_messages'
+        related_name='chat_read_states'
+    )
+    project = models.ForeignKey(
+        'projects.Project',
+        on_delete=models.CASCADE,
+        related_name='chat_read_states'
+    )
+    # Messages created at or before this time are read
+    last_read_at = models.DateTimeField()
+    last_read_message = models.ForeignKey(
+        ChatMessage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
     )
-    read_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'chat_message_reads'
-        unique_together = ['message', 'user']
-        indexes = [
-            models.Index(fields=['user', 'message']),
-        ]
+        db_table = 'chat_read_states'
+        unique_together = ['user', 'project']
 
     def __str__(self):
-        return f"{self.user.email} read {self.message.id}"
+        return f"{self.user_id} read project {self.project_id} up to {self.last_read_at}"
+
+    @classmethod
+    def mark_read(cls, user, project_id, last_read_at, message_id=None):
+        """Move the watermark to last_read_at with one upsert; never moves it back"""
+        updated = cls.objects.filter(
+            user=user, project_id=project_id, last_read_at__lt=last_read_at
+        ).update(
+            last_read_at=last_read_at,
+            last_read_message_id=message_id,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            # No row yet, or it is already past this point
+            cls.objects.bulk_create([cls(
+                user=user,
+                project_id=project_id,
+                last_read_at=last_read_at,
+                last_read_message_id=message_id
+            )], ignore_conflicts=True)
+
+    @classmethod
+    def mark_all_read(cls, user, project_id):
+        """Move the watermark to the project's latest message in one upsert"""
+        latest = ChatMessage.objects.filter(
+            project_id=project_id).order_by('-created_at', '-id')
+        cls.objects.bulk_create(
+            [cls(
+                user=user,
+                project_id=project_id,
+                last_read_at=Coalesce(
+                    Subquery(latest.values('created_at')[:1]), Now()),
+                last_read_message_id=Subquery(latest.values('id')[:1])
+            )],
+            update_conflicts=True,
+            unique_fields=['user', 'project'],
+            update_fields=['last_read_at', 'last_read_message', 'updated_at']
+        )
+
+    @staticmethod
+    def unread_filter(user, watermark='read_state__last_read_at'):
+        """Messages of others newer than the user's watermark (or all, without one)"""
+        return (~models.Q(sender=user)
+                & (models.Q(**{f'{watermark}__isnull': True})
+                   | models.Q(created_at__gt=models.F(watermark))))
+
+    @staticmethod
+    def annotate_watermark(queryset, user):
+        """Join each message to the user's read state of its project"""
+        return queryset.annotate(
+            read_state=models.FilteredRelation(
+                'project__chat_read_states',
+                condition=models.Q(project__chat_read_states__user=user)
+            ),
+            read_watermark=models.F('read_state__last_read_at')
+        )
+
+    @staticmethod
+    def is_read(message, user, watermark):
+        """Own messages are always read; others once the watermark reaches them"""
+        if message.sender_id == user.id:
+            return True
+        return watermark is not None and message.created_at <= watermark
@@ -0,0 +1,107 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q, Subquery
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from apps.core.pagination import KeysetPagination
+
+
+class ChatHistoryPagination(KeysetPagination):
+    """
+    Chat history pages anchored on a message, for infinite scroll.
+
+    Opt-in: without an anchor or ``page_size`` the full list is returned
+    unpaginated, as before. ``page_size`` alone returns the newest page.
+    ``before=<id>`` and ``after=<id>`` page towards older and newer
+    messages, ``around=<id>``
+    centres a page on a message (e.g. a search hit). The anchor's
+    ``(created_at, id)`` key is read with a subquery, so each page is a
+    single range scan of the ``(project, created_at)`` index. Results are
+    always oldest first.
+    """
+
+    ordering = ('created_at', 'id')
+    page_size = 50
+    max_page_size = 200
+    anchor_params = ('before', 'after', 'around')
+    invalid_cursor_message = 'Invalid message anchor'
+    opt_in = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        params = request.query_params
+        if self.opt_in and not any(
+                name in params
+                for name in (*self.anchor_params, self.page_size_query_param)):
+            return None
+
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        if params.get('around'):
+            anchor = self.anchor_position(params['around'])
+            older_size = self.page_size // 2
+            older, self.has_older = self.older(queryset, anchor, older_size)
+            newer, self.has_newer = self.newer(
+                queryset, anchor, self.page_size - older_size, inclusive=True)
+            rows = older + newer
+        elif params.get('after'):
+            anchor = self.anchor_position(params['after'])
+            rows, self.has_newer = self.newer(queryset, anchor, self.page_size)
+            self.has_older = True
+        elif params.get('before'):
+            anchor = self.anchor_position(params['before'])
+            rows, self.has_older = self.older(queryset, anchor, self.page_size)
+            self.has_newer = True
+        else:
+            rows, self.has_older = self.older(queryset, None, self.page_size)
+            self.has_newer = False
+
+        self.rows = rows
+        return rows
+
+    def older(self, queryset, anchor, size):
+        """Up to `size` rows before the anchor, oldest first"""
+        descending = [f'-{field}' for field in self.ordering]
+        queryset = queryset.order_by(*descending)
+        if anchor is not None:
+            queryset = queryset.filter(self.after(anchor, descending))
+        rows = list(queryset[:size + 1])
+        return rows[:size][::-1], len(rows) > size
+
+    def newer(self, queryset, anchor, size, inclusive=False):
+        """Up to `size` rows after the anchor (or from it), oldest first"""
+        queryset = queryset.order_by(*self.ordering)
+        predicate = self.after(anchor)
+        if inclusive:
+            predicate |= self.at(anchor)
+        rows = list(queryset.filter(predicate)[:size + 1])
+        return rows[:size], len(rows) > size
+
+    def at(self, anchor):
+        return Q(**{field: value for field, value in zip(self.ordering, anchor)})
+
+    def anchor_position(self, message_id):
+        """The anchor's key as subquery expressions, resolved in the page query"""
+        try:
+            pk = self.model._meta.pk.to_python(message_id)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        anchor = self.model._base_manager.filter(pk=pk)
+        return [Subquery(anchor.values(field)[:1]) for field in self.ordering]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'previous': self.get_link('before', 0) if self.has_older else None,
+            'next': self.get_link('after', -1) if self.has_newer else None,
+            'results': data,
+        })
+
+    def get_link(self, param, index):
+        if not self.rows:
+            return None
+        url = self.request.build_absolute_uri()
+        for name in self.anchor_params:
+            url = remove_query_param(url, name)
+        return replace_query_param(url, param, str(self.rows[index].pk))
@@ -0,0 +1,268 @@
+"""
+Presence service.
+
+Every open WebSocket registers its channel name under the user and the
+project with an expiry ``PRESENCE_TTL`` seconds ahead; consumers refresh it
+with heartbeats. A user is online while any of their connections is
+unexpired, so closing one of several tabs does not take them offline and a
+crashed worker's sockets age out on their own.
+
+Nothing is written to the users table on connect or disconnect. Activity
+timestamps are collected here and persisted in batches by
+``manage.py flush_presence``.
+
+Set ``PRESENCE_REDIS_URL`` to share presence between processes; without it
+an in-process backend is used (development and tests). Only this process
+can see that backend, so the process holding the sockets persists it
+instead: the first connection starts a thread that writes the users it
+tracks every ``PRESENCE_FLUSH_INTERVAL`` seconds and at exit. Processes
+that only read presence (WSGI workers) never write it.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, close_old_connections
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL = getattr(settings, 'PRESENCE_TTL', 60)
+HEARTBEAT_INTERVAL = PRESENCE_TTL / 3
+FLUSH_INTERVAL = getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 30)
+
+
+class MemoryPresence:
+    """Presence kept in this process only"""
+
+    def __init__(self, ttl=PRESENCE_TTL, flush_interval=None):
+        self.ttl = ttl
+        # Persist from a thread started on the first connection, if set
+        self.flush_interval = flush_interval
+        self._flusher = None
+        self._lock = threading.Lock()
+        self._projects = {}    # project_id -> {(user_id, channel): expiry}
+        self._users = {}       # user_id -> {channel: expiry}
+        self._last_seen = {}   # user_id -> timestamp
+        self._known = set()    # every user connected through this process
+
+    def _prune(self, entries, now):
+        for key in [key for key, expiry in entries.items() if expiry <= now]:
+            del entries[key]
+        return entries
+
+    def connect(self, user_id, project_id, channel_name):
+        """Register or refresh a connection; True if it is the user's first in the project"""
+        now = time.time()
+        user_id, project_id = str(user_id), str(project_id)
+        with self._lock:
+            project = self._prune(self._projects.setdefault(project_id, {}), now)
+            first = not any(uid == user_id for uid, _ in project)
+            project[(user_id, channel_name)] = now + self.ttl
+            self._users.setdefault(user_id, {})[channel_name] = now + self.ttl
+            self._last_seen[user_id] = now
+            self._known.add(user_id)
+            if self.flush_interval and self._flusher is None:
+                self._flusher = start_flusher(self, self.flush_interval)
+        return first
+
+    heartbeat = connect
+
+    def disconnect(self, user_id, project_id, channel_name):
+        """Drop a connection; True if the user has no other one in the project"""
+        now = time.time()
+        user_id, project_id = str(user_id), str(project_id)
+        with self._lock:
+            project = self._prune(self._projects.get(project_id, {}), now)
+            project.pop((user_id, channel_name), None)
+            connections = self._prune(self._users.get(user_id, {}), now)
+            connections.pop(channel_name, None)
+            if not connections:
+                self._users.pop(user_id, None)
+            self._last_seen[user_id] = now
+            return not any(uid == user_id for uid, _ in project)
+
+    def online_users(self, project_id):
+        with self._lock:
+            project = self._prune(
+                self._projects.get(str(project_id), {}), time.time())
+            return {uid for uid, _ in project}
+
+    def online_user_ids(self):
+        now = time.time()
+        with self._lock:
+            return {uid for uid, connections in self._users.items()
+                    if self._prune(connections, now)}
+
+    def pop_last_seen(self):
+        """Activity timestamps recorded since the previous call"""
+        with self._lock:
+            seen, self._last_seen = self._last_seen, {}
+        return {uid: _to_datetime(ts) for uid, ts in seen.items()}
+
+    def known_user_ids(self):
+        """Users whose presence this process owns"""
+        with self._lock:
+            return set(self._known)
+
+
+class RedisPresence:
+    """Presence shared through Redis sorted sets scored by expiry time"""
+
+    USERS_KEY = 'presence:users'
+    SEEN_KEY = 'presence:seen'
+
+    def __init__(self, url, ttl=PRESENCE_TTL):
+        import redis
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+
+    def _project_key(self, project_id):
+        return f'presence:project:{project_id}'
+
+    def _user_key(self, user_id):
+        return f'presence:user:{user_id}'
+
+    def _project_users(self, project_id, now):
+        key = self._project_key(project_id)
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(key, '-inf', now)
+        pipe.zrange(key, 0, -1)
+        members = pipe.execute()[1]
+        return {member.split('|', 1)[0] for member in members}
+
+    def connect(self, user_id, project_id, channel_name):
+        """Register or refresh a connection; True if it is the user's first in the project"""
+        now = time.time()
+        expiry = now + self.ttl
+        user_id = str(user_id)
+        first = user_id not in self._project_users(project_id, now)
+
+        project_key, user_key = self._project_key(project_id), self._user_key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.zadd(project_key, {f'{user_id}|{channel_name}': expiry})
+        pipe.zadd(user_key, {channel_name: expiry})
+        pipe.zadd(self.USERS_KEY, {user_id: expiry}, gt=True)
+        pipe.hset(self.SEEN_KEY, user_id, now)
+        # Keys of idle projects and users disappear on their own
+        pipe.expire(project_key, self.ttl * 2)
+        pipe.expire(user_key, self.ttl * 2)
+        pipe.execute()
+        return first
+
+    heartbeat = connect
+
+    def disconnect(self, user_id, project_id, channel_name):
+        """Drop a connection; True if the user has no other one in the project"""
+        now = time.time()
+        user_id = str(user_id)
+        user_key = self._user_key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.zrem(self._project_key(project_id), f'{user_id}|{channel_name}')
+        pipe.zrem(user_key, channel_name)
+        pipe.zremrangebyscore(user_key, '-inf', now)
+        pipe.zcard(user_key)
+        pipe.hset(self.SEEN_KEY, user_id, now)
+        remaining = pipe.execute()[3]
+        if not remaining:
+            self.redis.zrem(self.USERS_KEY, user_id)
+        return user_id not in self._project_users(project_id, now)
+
+    def online_users(self, project_id):
+        return self._project_users(project_id, time.time())
+
+    def online_user_ids(self):
+        pipe = self.redis.pipeline()
+        pipe.zremrangebyscore(self.USERS_KEY, '-inf', time.time())
+        pipe.zrange(self.USERS_KEY, 0, -1)
+        return set(pipe.execute()[1])
+
+    def pop_last_seen(self):
+        """Activity timestamps recorded since the previous call"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hgetall(self.SEEN_KEY)
+        pipe.delete(self.SEEN_KEY)
+        seen = pipe.execute()[0]
+        return {uid: _to_datetime(float(ts)) for uid, ts in seen.items()}
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def persist_presence(presence, batch_size=500, user_ids=None):
+    """
+    Write collected last_seen timestamps and is_online flags to the users
+    table; returns the number of users updated. Users marked online that
+    `presence` no longer sees are marked offline: every such user for a
+    shared backend, or only those in `user_ids` for one that sees a single
+    process's connections.
+    """
+    User = get_user_model()
+    last_seen = presence.pop_last_seen()
+    online = presence.online_user_ids()
+
+    users = []
+    for user in User.objects.filter(id__in=list(last_seen)).only(
+            'id', 'is_online', 'last_seen'):
+        user.last_seen = last_seen[str(user.id)]
+        user.is_online = str(user.id) in online
+        users.append(user)
+    User.objects.bulk_update(
+        users, ['last_seen', 'is_online'], batch_size=batch_size)
+
+    # Connections that expired without a clean disconnect
+    stale = User.objects.filter(is_online=True)
+    if user_ids is not None:
+        stale = stale.filter(id__in=[int(pk) for pk in user_ids])
+    stale = stale.exclude(
+        id__in=[int(pk) for pk in online]
+    ).exclude(id__in=[user.id for user in users]).update(is_online=False)
+    return len(users) + stale
+
+
+def persist_memory_presence(presence):
+    """Persist the users an in-process backend tracks, and no one else"""
+    return persist_presence(presence, user_ids=presence.known_user_ids())
+
+
+def _flush_memory_presence(presence, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            persist_memory_presence(presence)
+        except DatabaseError:
+            logger.exception('Presence flush failed')
+        close_old_connections()
+
+
+def start_flusher(presence, interval=FLUSH_INTERVAL):
+    """Persist an in-process backend periodically and at exit"""
+    thread = threading.Thread(
+        target=_flush_memory_presence, args=(presence, interval),
+        name='presence-flush', daemon=True)
+    thread.start()
+    atexit.register(persist_memory_presence, presence)
+    return thread
+
+
+_presence = None
+_presence_lock = threading.Lock()
+
+
+def get_presence():
+    """The process-wide presence backend chosen by settings"""
+    global _presence
+    if _presence is None:
+        with _presence_lock:
+            if _presence is None:
+                url = getattr(settings, 'PRESENCE_REDIS_URL', '')
+                if url:
+                    _presence = RedisPresence(url)
+                else:
+                    _presence = MemoryPresence(flush_interval=FLUSH_INTERVAL)
+    return _presence
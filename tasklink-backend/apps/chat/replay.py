@@ -0,0 +1,105 @@
+"""
+Replay of recent chat frames for reconnecting sockets.
+
+Every broadcast message frame is also appended to a bounded per-project
+ring of the last ``CHAT_REPLAY_SIZE`` frames. A client that reconnects
+sends ``{"type": "resume", "last_message_id": ..., "since": ...}`` and
+receives only the frames it missed: from the ring when its position is
+still there, otherwise from the database (at most ``CHAT_REPLAY_LIMIT``
+messages; beyond that it is told to reload history over REST).
+
+Set ``CHAT_REPLAY_REDIS_URL`` to share the ring between processes;
+without it each process keeps its own.
+"""
+
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+REPLAY_SIZE = getattr(settings, 'CHAT_REPLAY_SIZE', 200)
+REPLAY_LIMIT = getattr(settings, 'CHAT_REPLAY_LIMIT', 500)
+
+
+class MemoryReplay:
+    """Rings kept in this process only"""
+
+    def __init__(self, size=REPLAY_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._rings = {}   # project_id -> deque of (message_id, created_at, frame)
+
+    def record(self, project_id, message_id, created_at, frame):
+        with self._lock:
+            ring = self._rings.get(str(project_id))
+            if ring is None:
+                ring = self._rings[str(project_id)] = deque(maxlen=self.size)
+            ring.append((str(message_id), created_at, frame))
+
+    def entries(self, project_id):
+        """Ring contents, oldest first"""
+        with self._lock:
+            return list(self._rings.get(str(project_id), ()))
+
+
+class RedisReplay:
+    """Rings shared through capped Redis lists"""
+
+    def __init__(self, url, size=REPLAY_SIZE):
+        import redis
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.size = size
+
+    def _key(self, project_id):
+        return f'chat:replay:{project_id}'
+
+    def record(self, project_id, message_id, created_at, frame):
+        key = self._key(project_id)
+        entry = json.dumps([str(message_id), created_at.isoformat(), frame])
+        pipe = self.redis.pipeline()
+        pipe.rpush(key, entry)
+        pipe.ltrim(key, -self.size, -1)
+        pipe.execute()
+
+    def entries(self, project_id):
+        """Ring contents, oldest first"""
+        entries = []
+        for raw in self.redis.lrange(self._key(project_id), 0, -1):
+            message_id, created_at, frame = json.loads(raw)
+            entries.append((message_id, parse_datetime(created_at), frame))
+        return entries
+
+
+def missed_frames(entries, last_message_id=None, since=None):
+    """
+    (message_id, frame) pairs after the client's position, or None when
+    the ring does not reach back that far.
+    """
+    if last_message_id is not None:
+        for index, (message_id, _, _) in enumerate(entries):
+            if message_id == str(last_message_id):
+                return [(message_id, frame)
+                        for message_id, _, frame in entries[index + 1:]]
+        if since is None:
+            return None
+    if since is not None and entries and entries[0][1] <= since:
+        return [(message_id, frame)
+                for message_id, created_at, frame in entries if created_at > since]
+    return None
+
+
+_replay = None
+_replay_lock = threading.Lock()
+
+
+def get_replay():
+    """The process-wide replay backend chosen by settings"""
+    global _replay
+    if _replay is None:
+        with _replay_lock:
+            if _replay is None:
+                url = getattr(settings, 'CHAT_REPLAY_REDIS_URL', '')
+                _replay = RedisReplay(url) if url else MemoryReplay()
+    return _replay
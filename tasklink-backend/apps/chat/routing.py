@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     path('ws/projects/<uuid:project_id>/', consumers.ChatConsumer.as_asgi()),
+    path('ws/stream/', consumers.StreamConsumer.as_asgi()),
 ]
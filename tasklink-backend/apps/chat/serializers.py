@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ChatMessage, ChatMessageRead
+from .models import ChatMessage, ChatReadState
 from apps.authentication.serializers import UserSerializer
 
 
@@ -23,12 +23,15 @@ class ChatMessageSerializer(serializers.ModelSerializer):
 
     def get_is_read_by_user(self, obj):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return ChatMessageRead.objects.filter(
-                message=obj,
-                user=request.user
-            ).exists()
-        return False
+        if not (request and request.user.is_authenticated):
+            return False
+        if hasattr(obj, 'read_watermark'):
+            watermark = obj.read_watermark
+        else:
+            watermark = ChatReadState.objects.filter(
+                user=request.user, project_id=obj.project_id
+            ).values_list('last_read_at', flat=True).first()
+        return ChatReadState.is_read(obj, request.user, watermark)
 
 
 class ChatMessageCreateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,35 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .consumers import user_group_name
+from apps.workspaces.models import Membership
+
+
+def _notify_revoked(user_id, workspace_id):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        user_group_name(user_id),
+        {'type': 'membership_revoked', 'workspace_id': str(workspace_id)}
+    )
+
+
+def revoke_sockets(user_id, workspace_id):
+    """Tell the user's open sockets they lost access to the workspace"""
+    transaction.on_commit(
+        lambda: _notify_revoked(user_id, workspace_id), robust=True)
+
+
+@receiver(post_save, sender=Membership)
+def revoke_inactive_membership(sender, instance, created, raw=False, **kwargs):
+    if not raw and not instance.is_active:
+        revoke_sockets(instance.user_id, instance.workspace_id)
+
+
+@receiver(post_delete, sender=Membership)
+def revoke_deleted_membership(sender, instance, **kwargs):
+    revoke_sockets(instance.user_id, instance.workspace_id)
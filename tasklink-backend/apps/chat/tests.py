@@ -1,3 +1,925 @@
-from django.test import TestCase
+"""
+Tests for Chat app
+"""
 
-# Create your tests here.
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from apps.workspaces.models import Workspace, Membership
+from apps.projects.models import Project
+from . import presence, replay
+from .consumers import ChatConsumer, StreamConsumer
+from .models import ChatMessage, ChatReadState
+from .writebehind import ChatWriteBuffer
+from .presence import MemoryPresence
+from .throttling import TokenBucket, TypingState
+from apps.core import metrics
+
+User = get_user_model()
+
+IN_MEMORY_LAYERS = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+}
+
+
+class ChatTestMixin:
+    """One workspace member with a project, and a fresh presence backend"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.project = Project.objects.create(
+            workspace=self.workspace,
+            name='Project',
+            created_by=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+        presence._presence = MemoryPresence()
+        self.addCleanup(setattr, presence, '_presence', None)
+        replay._replay = replay.MemoryReplay()
+        self.addCleanup(setattr, replay, '_replay', None)
+
+    def communicator(self, user=None):
+        communicator = WebsocketCommunicator(
+            ChatConsumer.as_asgi(), f'/ws/projects/{self.project.id}/')
+        communicator.scope['user'] = user or self.user
+        communicator.scope['url_route'] = {
+            'kwargs': {'project_id': self.project.id}}
+        return communicator
+
+
+class PresenceTests(TestCase):
+    """Test connection counting in the presence backend"""
+
+    def test_user_stays_online_until_last_tab_closes(self):
+        """Test closing one of two tabs keeps the user online"""
+        backend = MemoryPresence()
+        self.assertTrue(backend.connect(1, 'p', 'tab-1'))
+        self.assertFalse(backend.connect(1, 'p', 'tab-2'))
+
+        self.assertFalse(backend.disconnect(1, 'p', 'tab-1'))
+        self.assertEqual(backend.online_users('p'), {'1'})
+        self.assertEqual(backend.online_user_ids(), {'1'})
+
+        self.assertTrue(backend.disconnect(1, 'p', 'tab-2'))
+        self.assertEqual(backend.online_users('p'), set())
+        self.assertEqual(backend.online_user_ids(), set())
+
+    def test_connections_expire_without_heartbeats(self):
+        """Test a connection that stops heartbeating drops out"""
+        backend = MemoryPresence(ttl=-1)
+        backend.connect(1, 'p', 'tab-1')
+
+        self.assertEqual(backend.online_users('p'), set())
+        self.assertIn('1', backend.pop_last_seen())
+        self.assertEqual(backend.pop_last_seen(), {})
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class PresenceConsumerTests(ChatTestMixin, TestCase):
+    """Test consumers report presence without writing the users table"""
+
+    def test_connect_registers_presence(self):
+        """Test an open socket is registered and announced once"""
+        async def scenario():
+            communicator = self.communicator()
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            joined = await communicator.receive_json_from()
+            self.assertEqual(joined['status'], 'online')
+            online = presence.get_presence().online_users(self.project.id)
+            await communicator.disconnect()
+            return online
+
+        with self.assertNumQueries(2):
+            online = async_to_sync(scenario)()
+
+        self.assertEqual(online, {str(self.user.id)})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_online)
+
+    def test_message_frame_is_forwarded_unchanged(self):
+        """Test every socket receives the sender's encoded frame"""
+        async def scenario():
+            first, second = self.communicator(), self.communicator()
+            await first.connect()
+            await first.receive_json_from()
+            await second.connect()
+            await first.send_json_to({'type': 'message', 'content': 'Hello'})
+            frames = [await first.receive_from(), await second.receive_from()]
+            await first.disconnect()
+            await second.disconnect()
+            return frames
+
+        frames = async_to_sync(scenario)()
+
+        self.assertEqual(frames[0], frames[1])
+        frame = json.loads(frames[0])
+        self.assertEqual(frame['type'], 'message')
+        self.assertEqual(frame['message']['content'], 'Hello')
+        self.assertEqual(frame['message']['sender']['id'], str(self.user.id))
+
+    def test_message_insert_skips_project_lookup(self):
+        """Test a chat message costs a single INSERT"""
+        async def scenario():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to(
+                {'type': 'message', 'content': 'Hello'})
+            await communicator.receive_json_from()
+            await communicator.disconnect()
+
+        # Project workspace and memberships at connect, then the INSERT
+        with self.assertNumQueries(3):
+            async_to_sync(scenario)()
+
+        self.assertEqual(ChatMessage.objects.get().project_id, self.project.id)
+
+    def test_revoked_membership_closes_socket(self):
+        """Test removing the member drops access on the next message"""
+        membership = Membership.objects.get(user=self.user)
+
+        @sync_to_async
+        def revoke():
+            with self.captureOnCommitCallbacks(execute=True):
+                membership.is_active = False
+                membership.save()
+
+        async def scenario():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await revoke()
+            await communicator.send_json_to(
+                {'type': 'message', 'content': 'Still here?'})
+            closed = await communicator.receive_output()
+            await communicator.wait()
+            return closed
+
+        closed = async_to_sync(scenario)()
+
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4403})
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_presence_endpoint(self):
+        """Test the endpoint lists online members of the project"""
+        presence.get_presence().connect(
+            self.user.id, self.project.id, 'tab-1')
+
+        response = self.client.get(
+            f'/api/chat/presence/?project={self.project.id}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [user['id'] for user in response.data['online']],
+            [str(self.user.id)])
+
+    def test_presence_endpoint_requires_membership(self):
+        """Test outsiders cannot see presence"""
+        outsider = User.objects.create_user(
+            email='outsider@example.com',
+            username='outsider',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=outsider)
+
+        response = self.client.get(
+            f'/api/chat/presence/?project={self.project.id}')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_persist_writes_only_tracked_users(self):
+        """Test the in-process backend leaves users it never saw alone"""
+        elsewhere = User.objects.create_user(
+            email='elsewhere@example.com',
+            username='elsewhere',
+            password='TestPass123!',
+            is_online=True
+        )
+        backend = presence.get_presence()
+        backend.connect(self.user.id, self.project.id, 'tab-1')
+        presence.persist_memory_presence(backend)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_online)
+        self.assertIsNotNone(self.user.last_seen)
+
+        # Expired without a clean disconnect
+        backend._users.clear()
+        backend._last_seen.clear()
+        presence.persist_memory_presence(backend)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_online)
+        elsewhere.refresh_from_db()
+        self.assertTrue(elsewhere.is_online)
+
+    def test_flusher_starts_on_first_connection(self):
+        """Test only a process holding sockets persists presence"""
+        backend = MemoryPresence(flush_interval=30)
+        with mock.patch.object(presence, 'start_flusher') as start:
+            backend.online_users(self.project.id)
+            self.assertFalse(start.called)
+
+            backend.connect(self.user.id, self.project.id, 'tab-1')
+            backend.connect(self.user.id, self.project.id, 'tab-2')
+        start.assert_called_once_with(backend, 30)
+
+    def test_flush_command_requires_shared_backend(self):
+        """Test the command refuses a backend only the server process can see"""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        User.objects.filter(id=self.user.id).update(is_online=True)
+        with self.assertRaises(CommandError):
+            call_command('flush_presence', stdout=StringIO())
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_online)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class ResumeTests(ChatTestMixin, TestCase):
+    """Test reconnecting sockets receive only the messages they missed"""
+
+    async def send_messages(self, *contents):
+        communicator = self.communicator()
+        await communicator.connect()
+        await communicator.receive_json_from()
+        sent = []
+        for content in contents:
+            await communicator.send_json_to({'type': 'message', 'content': content})
+            sent.append((await communicator.receive_json_from())['message'])
+        await communicator.disconnect()
+        return sent
+
+    async def resume(self, **position):
+        communicator = self.communicator()
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'type': 'resume', **position})
+        frames = []
+        while True:
+            frame = await communicator.receive_json_from()
+            frames.append(frame)
+            if frame['type'] == 'resumed':
+                break
+        await communicator.disconnect()
+        return frames
+
+    def test_resume_replays_from_ring(self):
+        """Test missed frames come from the ring without touching the database"""
+        async def scenario():
+            sent = await self.send_messages('one', 'two', 'three')
+            with mock.patch.object(ChatConsumer, 'stored_frames') as stored:
+                frames = await self.resume(last_message_id=sent[0]['id'])
+            self.assertFalse(stored.called)
+            return sent, frames
+
+        sent, frames = async_to_sync(scenario)()
+
+        self.assertEqual(
+            [frame['message']['id'] for frame in frames[:-1]],
+            [sent[1]['id'], sent[2]['id']])
+        self.assertEqual(frames[-1], {
+            'type': 'resumed', 'replayed': 2, 'truncated': False})
+
+    def test_message_sent_before_resume_is_delivered_once(self):
+        """Test a message that went out live between connect and resume is not replayed"""
+        async def scenario():
+            sent = await self.send_messages('before')
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            # Another tab of the same user posts; no status frame for it
+            other = self.communicator()
+            await other.connect()
+            await other.send_json_to({'type': 'message', 'content': 'live'})
+            live = [(await other.receive_json_from())['message']]
+            await other.disconnect()
+
+            await communicator.send_json_to(
+                {'type': 'resume', 'last_message_id': sent[0]['id']})
+            frames = []
+            while True:
+                frame = await communicator.receive_json_from()
+                frames.append(frame)
+                if frame['type'] == 'resumed':
+                    break
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+            return live, frames
+
+        live, frames = async_to_sync(scenario)()
+
+        self.assertEqual(
+            [frame['message']['id'] for frame in frames[:-1]], [live[0]['id']])
+        self.assertEqual(frames[-1]['replayed'], 0)
+
+    def test_resume_falls_back_to_database(self):
+        """Test a position outside the ring is replayed from stored messages"""
+        since = timezone.now() - timedelta(minutes=5)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(project=self.project, sender=self.user, content=content,
+                        created_at=since + timedelta(seconds=index + 1))
+            for index, content in enumerate(['one', 'two'])
+        ])
+
+        frames = async_to_sync(self.resume)(since=since.isoformat())
+
+        self.assertEqual(
+            [frame['message']['content'] for frame in frames[:-1]],
+            ['one', 'two'])
+        self.assertEqual(frames[-1]['replayed'], 2)
+
+    def test_resume_too_far_behind_is_truncated(self):
+        """Test clients missing too much are told to reload history"""
+        since = timezone.now() - timedelta(minutes=5)
+        ChatMessage.objects.bulk_create([
+            ChatMessage(project=self.project, sender=self.user, content=str(index),
+                        created_at=since + timedelta(seconds=index + 1))
+            for index in range(3)
+        ])
+
+        with mock.patch('apps.chat.consumers.REPLAY_LIMIT', 2):
+            frames = async_to_sync(self.resume)(since=since.isoformat())
+
+        self.assertEqual(frames[-1], {
+            'type': 'resumed', 'replayed': 2, 'truncated': True})
+
+
+class ThrottlingTests(TestCase):
+    """Test the per-connection frame limits"""
+
+    def setUp(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def test_token_bucket_refills_at_rate(self):
+        bucket = TokenBucket(rate=2, burst=3, clock=self.clock)
+        self.assertEqual([bucket.allow() for _ in range(4)],
+                         [True, True, True, False])
+        self.now += 0.5
+        self.assertTrue(bucket.allow())
+        self.assertFalse(bucket.allow())
+
+    def test_typing_broadcasts_changes_and_refreshes(self):
+        state = TypingState(ttl=6, min_interval=3, clock=self.clock)
+        self.assertTrue(state.update(True))
+        self.now += 1
+        self.assertFalse(state.update(True))   # coalesced
+        self.now += 2
+        self.assertTrue(state.update(True))    # refresh before expiry
+        self.assertTrue(state.update(False))   # stopped
+        self.assertFalse(state.update(False))
+
+    def test_typing_restarts_after_expiry(self):
+        state = TypingState(ttl=6, min_interval=3, clock=self.clock)
+        state.update(True)
+        state.clear()
+        self.assertTrue(state.update(True))
+        self.now += 10
+        # Receivers expired it, so a stop is no longer news
+        self.assertFalse(state.update(False))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class TypingConsumerTests(ChatTestMixin, TestCase):
+    """Test typing frames are coalesced and inbound frames rate limited"""
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_keystrokes_become_one_broadcast(self):
+        """Test a burst of typing frames reaches other sockets once"""
+        other = User.objects.create_user(
+            email='other@example.com', username='other', password='TestPass123!')
+        Membership.objects.create(
+            workspace=self.workspace, user=other, role='member')
+
+        async def scenario():
+            reader, typist = self.communicator(other), self.communicator()
+            await reader.connect()
+            await reader.receive_json_from()
+            await typist.connect()
+            await typist.receive_json_from()
+            await reader.receive_json_from()
+            for _ in range(5):
+                await typist.send_json_to({'type': 'typing', 'is_typing': True})
+            await typist.send_json_to({'type': 'message', 'content': 'Done'})
+            frames = [await reader.receive_json_from(),
+                      await reader.receive_json_from()]
+            await typist.disconnect()
+            await reader.disconnect()
+            return frames
+
+        frames = async_to_sync(scenario)()
+
+        self.assertEqual(frames[0]['type'], 'typing')
+        self.assertTrue(frames[0]['is_typing'])
+        self.assertIn('expires_in', frames[0])
+        self.assertEqual(frames[1]['type'], 'message')
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['chat.typing.broadcast'], 1)
+        self.assertEqual(counters['chat.typing.coalesced'], 4)
+
+    def test_frames_over_limit_are_dropped(self):
+        """Test a socket exceeding its bucket gets a rate_limited error"""
+        async def scenario():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            for index in range(3):
+                await communicator.send_json_to(
+                    {'type': 'message', 'content': f'message {index}'})
+            frames = [await communicator.receive_json_from() for _ in range(3)]
+            await communicator.disconnect()
+            return frames
+
+        with mock.patch('apps.chat.consumers.TokenBucket',
+                        lambda: TokenBucket(rate=0, burst=2)):
+            frames = async_to_sync(scenario)()
+
+        self.assertEqual([frame['type'] for frame in frames],
+                         ['message', 'message', 'error'])
+        self.assertEqual(frames[2]['error'], 'rate_limited')
+        self.assertEqual(ChatMessage.objects.count(), 2)
+        self.assertEqual(metrics.snapshot()['counters']['chat.frames.dropped'], 1)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class StreamConsumerTests(ChatTestMixin, TestCase):
+    """Test the multiplexed stream socket"""
+
+    def setUp(self):
+        super().setUp()
+        self.second = Project.objects.create(
+            workspace=self.workspace, name='Second', created_by=self.user)
+        owner = User.objects.create_user(
+            email='owner@example.com', username='owner', password='TestPass123!')
+        self.foreign = Project.objects.create(
+            workspace=Workspace.objects.create(name='Foreign', owner=owner),
+            name='Foreign', created_by=owner)
+
+    def stream(self, user=None):
+        communicator = WebsocketCommunicator(StreamConsumer.as_asgi(), '/ws/stream/')
+        communicator.scope['user'] = user or self.user
+        return communicator
+
+    async def subscribed(self, communicator, *topics):
+        await communicator.send_json_to({'type': 'subscribe', 'topics': list(topics)})
+        reply = await communicator.receive_json_from()
+        # Joining a project announces the user there, this socket included
+        for topic in reply['topics']:
+            if topic.startswith('project:'):
+                status = await communicator.receive_json_from()
+                self.assertEqual(status['data']['status'], 'online')
+        return reply
+
+    def test_subscribe_checks_access_in_one_query(self):
+        """Test one socket joins many projects with a single project lookup"""
+        async def scenario():
+            communicator = self.stream()
+            await communicator.connect()
+            reply = await self.subscribed(
+                communicator,
+                f'project:{self.project.id}',
+                f'board:{self.second.id}',
+                f'project:{self.foreign.id}',
+                'notifications',
+                'bogus')
+            await communicator.disconnect()
+            return reply
+
+        # Memberships and the workspaces of all requested projects
+        with self.assertNumQueries(2):
+            reply = async_to_sync(scenario)()
+
+        self.assertEqual(reply['topics'], [
+            f'project:{self.project.id}', f'board:{self.second.id}', 'notifications'])
+        self.assertEqual(reply['denied'], [f'project:{self.foreign.id}', 'bogus'])
+
+    def test_frames_are_wrapped_with_their_topic(self):
+        """Test project traffic reaches the stream tagged with the topic"""
+        async def scenario():
+            stream = self.stream()
+            await stream.connect()
+            await self.subscribed(stream, f'project:{self.project.id}')
+            chat = self.communicator()
+            await chat.connect()
+            await chat.send_json_to({'type': 'message', 'content': 'Hello'})
+            frame = await stream.receive_json_from()
+            await chat.disconnect()
+            await stream.disconnect()
+            return frame
+
+        frame = async_to_sync(scenario)()
+
+        self.assertEqual(frame['topic'], f'project:{self.project.id}')
+        self.assertEqual(frame['data']['type'], 'message')
+        self.assertEqual(frame['data']['message']['content'], 'Hello')
+
+    def test_messages_posted_through_stream(self):
+        """Test a stream socket can post to a subscribed project only"""
+        async def scenario():
+            stream = self.stream()
+            await stream.connect()
+            await self.subscribed(stream, f'project:{self.project.id}')
+            await stream.send_json_to({
+                'type': 'message', 'topic': f'project:{self.project.id}',
+                'content': 'Via stream'})
+            echoed = await stream.receive_json_from()
+            await stream.send_json_to({
+                'type': 'message', 'topic': f'project:{self.second.id}',
+                'content': 'Not subscribed'})
+            refused = await stream.receive_json_from()
+            await stream.disconnect()
+            return echoed, refused
+
+        echoed, refused = async_to_sync(scenario)()
+
+        self.assertEqual(echoed['data']['message']['content'], 'Via stream')
+        self.assertEqual(refused['error'], 'not_subscribed')
+        self.assertEqual(
+            list(ChatMessage.objects.values_list('project_id', flat=True)),
+            [self.project.id])
+
+    def test_revocation_drops_workspace_topics(self):
+        """Test losing workspace access unsubscribes its topics"""
+        membership = Membership.objects.get(user=self.user)
+
+        @sync_to_async
+        def revoke():
+            with self.captureOnCommitCallbacks(execute=True):
+                membership.is_active = False
+                membership.save()
+
+        async def scenario():
+            stream = self.stream()
+            await stream.connect()
+            await self.subscribed(
+                stream, f'project:{self.project.id}', 'notifications')
+            await revoke()
+            frame = await stream.receive_json_from()
+            await stream.disconnect()
+            return frame
+
+        frame = async_to_sync(scenario)()
+
+        self.assertEqual(frame, {
+            'type': 'unsubscribed',
+            'topics': [f'project:{self.project.id}'],
+            'reason': 'access_revoked'
+        })
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class WriteBehindTests(ChatTestMixin, TestCase):
+    """Test batched chat persistence neither loses nor reorders messages"""
+
+    def message(self, content):
+        return ChatMessage(
+            project_id=self.project.id, sender=self.user, content=content)
+
+    def test_concurrent_producers_lose_nothing(self):
+        """Test every queued message is saved once, in per-sender order"""
+        buffer = ChatWriteBuffer(max_batch=25, autostart=False)
+
+        def produce(worker):
+            for index in range(100):
+                buffer.add(self.message(f'{worker}:{index}'))
+
+        threads = [threading.Thread(target=produce, args=(worker,))
+                   for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        queued = [message.content for message in buffer._pending]
+        self.assertEqual(buffer.flush(), 400)
+        self.assertEqual(buffer.flush(), 0)
+
+        saved = dict(ChatMessage.objects.values_list('content', 'created_at'))
+        self.assertEqual(sorted(saved), sorted(queued))
+        for worker in range(4):
+            contents = [c for c in queued if c.startswith(f'{worker}:')]
+            self.assertEqual(
+                contents, [f'{worker}:{index}' for index in range(100)])
+            times = [saved[content] for content in contents]
+            self.assertEqual(times, sorted(times))
+
+    def test_concurrent_flushes_commit_in_order(self):
+        """Test a batch taken later is never saved before an earlier one"""
+        buffer = ChatWriteBuffer(autostart=False)
+        saving, saved = threading.Event(), []
+
+        def save(rows):
+            if not saved and not saving.is_set():
+                saving.set()
+                time.sleep(0.05)
+            saved.append([row.content for row in rows])
+
+        buffer.add(self.message('first'))
+        with mock.patch.object(buffer, 'save', side_effect=save):
+            flusher = threading.Thread(target=buffer.flush)
+            flusher.start()
+            saving.wait(1)
+            buffer.add(self.message('second'))
+            buffer.flush()
+            flusher.join()
+
+        self.assertEqual(saved, [['first'], ['second']])
+
+    def test_lost_connection_keeps_the_batch(self):
+        """Test a failed write is retried by the next flush, in order"""
+        buffer = ChatWriteBuffer(autostart=False)
+        for content in ('one', 'two'):
+            buffer.add(self.message(content))
+
+        with mock.patch.object(ChatWriteBuffer, 'save',
+                               side_effect=OperationalError('connection lost')):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertFalse(ChatMessage.objects.exists())
+        self.assertEqual(buffer.pending(), 2)
+
+        buffer.add(self.message('three'))
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(
+            list(ChatMessage.objects.order_by('created_at').values_list(
+                'content', flat=True)),
+            ['one', 'two', 'three'])
+
+    def test_consumer_broadcasts_before_saving(self):
+        """Test the frame carries the id and time the row is saved with"""
+        buffer = ChatWriteBuffer(autostart=False)
+
+        async def scenario():
+            communicator = self.communicator()
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await communicator.send_json_to(
+                {'type': 'message', 'content': 'Hello'})
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return frame
+
+        with mock.patch('apps.chat.consumers.WRITE_BEHIND', True), \
+                mock.patch('apps.chat.consumers.get_write_buffer',
+                           return_value=buffer):
+            frame = async_to_sync(scenario)()
+
+        self.assertFalse(ChatMessage.objects.exists())
+        buffer.flush()
+        message = ChatMessage.objects.get()
+        self.assertEqual(frame['message']['id'], str(message.id))
+        self.assertEqual(
+            frame['message']['created_at'], message.created_at.isoformat())
+
+
+class WriteBehindFlusherTests(TransactionTestCase):
+    """Test the flusher thread honours the delay bound"""
+
+    def test_flusher_writes_within_delay(self):
+        """Test a partial batch is written shortly after the delay"""
+        user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        workspace = Workspace.objects.create(name='Workspace', owner=user)
+        project = Project.objects.create(workspace=workspace, name='Project')
+        buffer = ChatWriteBuffer(max_batch=100, max_delay=0.05)
+
+        for index in range(3):
+            buffer.add(ChatMessage(
+                project_id=project.id, sender=user, content=str(index)))
+
+        deadline = time.monotonic() + 2
+        while ChatMessage.objects.count() < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(ChatMessage.objects.count(), 3)
+
+
+# Run tests with: python manage.py test apps.chat
+
+
+class ReadStateTests(ChatTestMixin, TestCase):
+    """Test read tracking through the per-project watermark"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='TestPass123!'
+        )
+        Membership.objects.create(
+            workspace=self.workspace, user=self.other, role='member')
+        self.second_project = Project.objects.create(
+            workspace=self.workspace,
+            name='Second',
+            created_by=self.user
+        )
+
+    def post(self, project, content, sender=None):
+        return ChatMessage.objects.create(
+            project=project, sender=sender or self.other, content=content)
+
+    def test_unread_counts_use_one_grouped_query(self):
+        """Test unread counts for every project come from one query"""
+        for index in range(3):
+            self.post(self.project, f'first {index}')
+        self.post(self.second_project, 'second')
+        self.post(self.project, 'mine', sender=self.user)
+
+        # Membership map and the grouped count
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/chat/messages/unread_count/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {row['project_id']: row['unread_count'] for row in response.data}
+        # The user's own messages are never unread
+        self.assertEqual(counts, {
+            str(self.project.id): 3,
+            str(self.second_project.id): 1,
+        })
+
+    def test_mark_all_read_is_one_upsert(self):
+        """Test marking a project read writes a single watermark row"""
+        for index in range(5):
+            self.post(self.project, f'message {index}')
+
+        # Membership map, project lookup, unread count and the upsert
+        with self.assertNumQueries(4):
+            response = self.client.post(
+                '/api/chat/messages/mark_all_read/',
+                {'project_id': str(self.project.id)}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], 'Marked 5 messages as read')
+        state = ChatReadState.objects.get(user=self.user, project=self.project)
+        latest = ChatMessage.objects.filter(project=self.project).last()
+        self.assertEqual(state.last_read_message_id, latest.id)
+        self.assertEqual(state.last_read_at, latest.created_at)
+
+        self.post(self.project, 'after')
+        response = self.client.get(
+            f'/api/chat/messages/unread_count/?project={self.project.id}')
+        self.assertEqual(response.data['unread_count'], 1)
+
+    def test_mark_all_read_requires_membership(self):
+        """Test outsiders cannot create read state for a project"""
+        outsider = User.objects.create_user(
+            email='outsider@example.com',
+            username='outsider',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=outsider)
+
+        response = self.client.post(
+            '/api/chat/messages/mark_all_read/',
+            {'project_id': str(self.project.id)}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(ChatReadState.objects.exists())
+
+    def test_mark_read_never_moves_watermark_back(self):
+        """Test reading an older message keeps the newer watermark"""
+        older = self.post(self.project, 'older')
+        newer = self.post(self.project, 'newer')
+
+        self.client.post(f'/api/chat/messages/{newer.id}/mark_read/')
+        self.client.post(f'/api/chat/messages/{older.id}/mark_read/')
+
+        state = ChatReadState.objects.get(user=self.user, project=self.project)
+        self.assertEqual(state.last_read_message_id, newer.id)
+
+    def test_is_read_compares_against_watermark(self):
+        """Test the message list reports read state without a query per message"""
+        read = self.post(self.project, 'read')
+        ChatReadState.mark_read(
+            self.user, self.project.id, read.created_at, read.id)
+        unread = self.post(self.project, 'unread')
+        own = self.post(self.project, 'own', sender=self.user)
+
+        response = self.client.get(
+            f'/api/chat/messages/?project={self.project.id}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        is_read = {row['id']: row['is_read_by_user'] for row in response.data}
+        self.assertEqual(is_read, {
+            str(read.id): True,
+            str(unread.id): False,
+            str(own.id): True,
+        })
+
+
+class ChatHistoryTests(ChatTestMixin, TestCase):
+    """Test anchored keyset pagination of chat history"""
+
+    def setUp(self):
+        super().setUp()
+        start = timezone.now() - timedelta(hours=1)
+        self.messages = ChatMessage.objects.bulk_create([
+            ChatMessage(
+                project=self.project,
+                sender=self.user,
+                content=f'message {index}',
+                # Pairs share a timestamp so the id breaks ties
+                created_at=start + timedelta(seconds=index // 2)
+            )
+            for index in range(12)
+        ])
+        self.messages.sort(key=lambda message: (message.created_at, message.id))
+
+    def page(self, **params):
+        params = {'project': str(self.project.id), 'page_size': 4, **params}
+        response = self.client.get('/api/chat/messages/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['results']]
+
+    def expected(self, start, end):
+        return [str(message.id) for message in self.messages[start:end]]
+
+    def test_latest_page_is_constant_queries(self):
+        """Test the newest page costs the same queries for any history length"""
+        # Membership map, the page with read state, prefetched attachments
+        with self.assertNumQueries(3):
+            response = self.page()
+
+        self.assertEqual(self.ids(response), self.expected(8, 12))
+        self.assertIsNone(response.data['next'])
+        self.assertIn('before=', response.data['previous'])
+
+    def test_before_and_after_walk_the_history(self):
+        """Test before/after anchors page across equal timestamps"""
+        response = self.page(before=self.messages[8].id)
+        self.assertEqual(self.ids(response), self.expected(4, 8))
+
+        response = self.page(before=self.messages[4].id)
+        self.assertEqual(self.ids(response), self.expected(0, 4))
+        self.assertIsNone(response.data['previous'])
+
+        response = self.page(after=self.messages[3].id)
+        self.assertEqual(self.ids(response), self.expected(4, 8))
+        self.assertIn('after=', response.data['next'])
+
+    def test_around_centres_on_the_anchor(self):
+        """Test around returns the anchor with its neighbours"""
+        response = self.page(around=self.messages[6].id)
+
+        self.assertEqual(self.ids(response), self.expected(4, 8))
+        self.assertIsNotNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_plain_list_is_unpaginated(self):
+        """Test callers passing no paging parameter still get a bare list"""
+        response = self.client.get(
+            '/api/chat/messages/', {'project': str(self.project.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data],
+                         self.expected(0, 12))
+
+    def test_invalid_anchor(self):
+        """Test a malformed anchor is rejected"""
+        response = self.client.get(
+            '/api/chat/messages/', {'project': str(self.project.id), 'before': 'nope'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,71 @@
+"""
+Inbound frame limits for chat sockets.
+
+Each connection gets a token bucket (``CHAT_FRAME_RATE`` frames per second,
+bursts of ``CHAT_FRAME_BURST``) and a typing state that turns a stream of
+keystroke-driven ``typing`` frames into a few broadcasts: one when the user
+starts, a refresh at most every ``CHAT_TYPING_MIN_INTERVAL`` seconds while
+they keep typing, and one when they stop. Broadcast typing frames carry
+``expires_in`` (``CHAT_TYPING_TTL``) so receivers clear the indicator on
+their own when the stop frame never comes.
+"""
+
+import time
+
+from django.conf import settings
+
+FRAME_RATE = getattr(settings, 'CHAT_FRAME_RATE', 10)
+FRAME_BURST = getattr(settings, 'CHAT_FRAME_BURST', 20)
+TYPING_TTL = getattr(settings, 'CHAT_TYPING_TTL', 6)
+TYPING_MIN_INTERVAL = getattr(settings, 'CHAT_TYPING_MIN_INTERVAL', 3)
+
+
+class TokenBucket:
+    """Allows `rate` events per second with bursts of up to `burst`"""
+
+    def __init__(self, rate=FRAME_RATE, burst=FRAME_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def allow(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class TypingState:
+    """What receivers were last told about one connection's typing"""
+
+    def __init__(self, ttl=TYPING_TTL, min_interval=TYPING_MIN_INTERVAL,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self.clock = clock
+        self.is_typing = False
+        self.broadcast_at = None
+
+    def update(self, is_typing):
+        """Record a typing frame; True if it should be broadcast"""
+        now = self.clock()
+        if self.is_typing and now - self.broadcast_at >= self.ttl:
+            # Receivers have expired the indicator already
+            self.is_typing = False
+
+        if is_typing == self.is_typing:
+            if not is_typing or now - self.broadcast_at < self.min_interval:
+                return False
+
+        self.is_typing = is_typing
+        self.broadcast_at = now
+        return True
+
+    def clear(self):
+        """The user sent their message; receivers clear typing on it"""
+        self.is_typing = False
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ChatMessageViewSet
+from .views import ChatMessageViewSet, PresenceView
 
 router = DefaultRouter()
 router.register(r'messages', ChatMessageViewSet, basename='message')
 
 urlpatterns = [
+    path('presence/', PresenceView.as_view(), name='presence'),
     path('', include(router.urls)),
 ]
@@ -2,24 +2,34 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from rest_framework.views import APIView
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Prefetch
 
-from .models import ChatMessage, ChatMessageRead
+from .models import ChatMessage, ChatReadState
+from .pagination import ChatHistoryPagination
 from .serializers import ChatMessageSerializer, ChatMessageCreateSerializer
 from apps.activity.models import ActivityLog
+from apps.files.models import FileAttachment
+from .presence import get_presence
+from apps.projects.models import Project
+from apps.workspaces.mixins import WorkspaceScopedMixin
+from apps.workspaces.memberships import membership_map
 
+User = get_user_model()
 
-class ChatMessageViewSet(viewsets.ModelViewSet):
+
+class ChatMessageViewSet(WorkspaceScopedMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    workspace_field = 'project__workspace'
+    # Paginates only when ?before=, ?after=, ?around= or ?page_size= is passed
+    pagination_class = ChatHistoryPagination
 
     def get_queryset(self):
-        user = self.request.user
         project_id = self.request.query_params.get('project')
 
-        queryset = ChatMessage.objects.filter(
-            project__workspace__memberships__user=user,
-            project__workspace__memberships__is_active=True
-        )
+        queryset = self.scope_to_workspaces(ChatMessage.objects.all())
 
         if project_id:
             queryset = queryset.filter(project_id=project_id)
@@ -29,7 +39,13 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         if search:
             queryset = queryset.filter(content__icontains=search)
 
-        return queryset.distinct().select_related('project', 'sender').order_by('created_at')
+        # Read state comes from the user's watermark, joined in the same query
+        queryset = ChatReadState.annotate_watermark(queryset, self.request.user)
+
+        return queryset.select_related('project', 'sender').prefetch_related(
+            Prefetch('attachments',
+                     queryset=FileAttachment.objects.select_related('uploaded_by'))
+        ).order_by('created_at', 'id')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -46,8 +62,8 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             entity_type='chat_message',
             entity_id=message.id,
             description=f"Sent message in project '{message.project.name}'",
-            workspace=message.project.workspace,
-            project=message.project
+            workspace=message.project.workspace_id,
+            project=message.project_id
         )
 
     def perform_update(self, serializer):
@@ -59,8 +75,8 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             entity_type='chat_message',
             entity_id=message.id,
             description=f"Edited message in project '{message.project.name}'",
-            workspace=message.project.workspace,
-            project=message.project
+            workspace=message.project.workspace_id,
+            project=message.project_id
         )
 
     def perform_destroy(self, instance):
@@ -70,8 +86,8 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             entity_type='chat_message',
             entity_id=str(instance.id),
             description=f"Deleted message in project '{instance.project.name}'",
-            workspace=instance.project.workspace,
-            project=instance.project
+            workspace=instance.project.workspace_id,
+            project=instance.project_id
         )
 
         instance.delete()
@@ -80,10 +96,9 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
     def mark_read(self, request, pk=None):
         message = self.get_object()
 
-        ChatMessageRead.objects.get_or_create(
-            message=message,
-            user=request.user
-        )
+        # Reading a message reads everything before it
+        ChatReadState.mark_read(
+            request.user, message.project_id, message.created_at, message.id)
 
         return Response({'message': 'Message marked as read'})
 
@@ -96,59 +111,95 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                 'error': 'project_id is required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        messages = ChatMessage.objects.filter(project_id=project_id)
+        if not is_project_member(request, project_id):
+            return Response({
+                'error': 'Project not found'
+            }, status=status.HTTP_404_NOT_FOUND)
 
-        for message in messages:
-            ChatMessageRead.objects.get_or_create(
-                message=message,
-                user=request.user
-            )
+        unread = self.unread_messages().filter(
+            project_id=project_id).count()
+        ChatReadState.mark_all_read(request.user, project_id)
 
         return Response({
-            'message': f'Marked {messages.count()} messages as read'
+            'message': f'Marked {unread} messages as read'
         })
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        user = request.user
         project_id = request.query_params.get('project')
 
         if project_id:
             # Count for specific project
-            total_messages = ChatMessage.objects.filter(
+            unread = self.unread_messages().filter(
                 project_id=project_id).count()
-            read_messages = ChatMessageRead.objects.filter(
-                message__project_id=project_id,
-                user=user
-            ).count()
-            unread = total_messages - read_messages
 
             return Response({
                 'project_id': project_id,
                 'unread_count': unread
             })
         else:
-            # Count for all projects
-            from apps.projects.models import Project
-            projects = Project.objects.filter(
-                workspace__memberships__user=user,
-                workspace__memberships__is_active=True
-            )
-
-            result = []
-            for project in projects:
-                total = ChatMessage.objects.filter(project=project).count()
-                read = ChatMessageRead.objects.filter(
-                    message__project=project,
-                    user=user
-                ).count()
-                unread = total - read
-
-                if unread > 0:
-                    result.append({
-                        'project_id': str(project.id),
-                        'project_name': project.name,
-                        'unread_count': unread
-                    })
-
-            return Response(result)
+            # Count for all projects in one grouped query
+            counts = self.unread_messages().values(
+                'project_id', 'project__name'
+            ).annotate(unread=Count('id')).order_by('-project__created_at')
+
+            return Response([
+                {
+                    'project_id': str(row['project_id']),
+                    'project_name': row['project__name'],
+                    'unread_count': row['unread']
+                }
+                for row in counts
+            ])
+
+    def unread_messages(self):
+        """Messages in the user's projects past their read watermark"""
+        queryset = ChatReadState.annotate_watermark(
+            self.scope_to_workspaces(ChatMessage.objects.all()),
+            self.request.user
+        )
+        return queryset.filter(ChatReadState.unread_filter(self.request.user))
+
+
+def is_project_member(request, project_id):
+    """Whether the project exists in one of the user's workspaces"""
+    try:
+        workspace_id = Project.objects.filter(id=project_id).values_list(
+            'workspace_id', flat=True).first()
+    except ValidationError:
+        return False
+    return workspace_id is not None and membership_map(request).is_member(workspace_id)
+
+
+class PresenceView(APIView):
+    """Users with an open WebSocket in a project"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        project_id = request.query_params.get('project')
+        if not project_id:
+            return Response({
+                'error': 'project is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not is_project_member(request, project_id):
+            return Response({
+                'error': 'Project not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        online = get_presence().online_users(project_id)
+        users = User.objects.filter(id__in=[int(pk) for pk in online]).only(
+            'id', 'username', 'full_name', 'avatar')
+
+        return Response({
+            'project_id': project_id,
+            'online': [
+                {
+                    'id': str(user.id),
+                    'username': user.username,
+                    'full_name': user.full_name or user.username,
+                    'avatar': user.avatar.url if user.avatar else None,
+                }
+                for user in users
+            ]
+        })
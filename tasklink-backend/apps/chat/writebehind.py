@@ -0,0 +1,50 @@
+"""
+Write-behind persistence for WebSocket chat messages.
+
+With ``CHAT_WRITE_BEHIND`` enabled the consumer builds the message (UUID
+and timestamp assigned in the process), broadcasts it at once and hands it
+to this buffer. A per-process flusher thread writes pending messages with
+one ``bulk_create`` as soon as ``CHAT_WRITE_BEHIND_BATCH`` messages are
+waiting or the oldest has waited ``CHAT_WRITE_BEHIND_DELAY_MS``.
+
+Durability bound: a process that dies loses at most the messages of the
+current window (see apps.core.writebehind).
+"""
+
+import threading
+
+from django.conf import settings
+
+from apps.core.writebehind import WriteBehindBuffer
+from .models import ChatMessage
+
+WRITE_BEHIND = getattr(settings, 'CHAT_WRITE_BEHIND', False)
+MAX_BATCH = getattr(settings, 'CHAT_WRITE_BEHIND_BATCH', 100)
+MAX_DELAY = getattr(settings, 'CHAT_WRITE_BEHIND_DELAY_MS', 50) / 1000
+
+
+class ChatWriteBuffer(WriteBehindBuffer):
+    """Ordered in-memory queue of unsaved ChatMessage rows with a flusher thread"""
+
+    name = 'chat.write_behind'
+    thread_name = 'chat-write-behind'
+
+    def __init__(self, max_batch=MAX_BATCH, max_delay=MAX_DELAY, autostart=True):
+        super().__init__(max_batch, max_delay, autostart=autostart)
+
+    def save(self, rows):
+        ChatMessage.objects.bulk_create(rows)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer():
+    """The process-wide chat write buffer"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ChatWriteBuffer()
+    return _buffer
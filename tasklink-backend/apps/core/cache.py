@@ -0,0 +1,104 @@
+"""
+Versioned cache for hot read endpoints.
+
+Entries are keyed by the generation of the requesting user and of every
+workspace the data was read from. Writes replace generations instead of
+deleting entries, so one write invalidates every dependent entry in O(1)
+and works the same on the local-memory and Redis backends. A missing
+generation (never written or evicted) gets a fresh random value, so an
+evicted counter can never resurrect an old entry.
+
+Generations only invalidate entries in processes that see the bump, so
+caching is switched off unless the default cache is shared between
+processes (``REDIS_CACHE_URL``): with the per-process local-memory cache
+every read is computed.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from . import metrics
+
+CACHE_TIMEOUT = getattr(settings, 'READ_CACHE_TIMEOUT', 300)
+
+
+def is_shared():
+    """Whether every process reads and writes the same default cache"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _user_key(user_id):
+    return f'gen:user:{user_id}'
+
+
+def _workspace_key(workspace_id):
+    return f'gen:workspace:{workspace_id}'
+
+
+def _new_generation():
+    return uuid.uuid4().hex[:16]
+
+
+def _generations(keys):
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            generation = _new_generation()
+            if not cache.add(key, generation, timeout=None):
+                generation = cache.get(key) or generation
+            values[key] = generation
+    return [values[key] for key in keys]
+
+
+def _bump(user_ids, workspace_ids):
+    keys = ([_user_key(pk) for pk in user_ids] +
+            [_workspace_key(pk) for pk in workspace_ids])
+    if keys:
+        cache.set_many(
+            {key: _new_generation() for key in keys}, timeout=None)
+
+
+def invalidate(user_ids=(), workspace_ids=()):
+    """
+    Invalidate cached reads for these users and workspaces.
+
+    Bumps right away so the writing transaction reads its own changes, and
+    again on commit so a reader that cached pre-commit data in between is
+    discarded too.
+    """
+    user_ids = {pk for pk in user_ids if pk is not None}
+    workspace_ids = {pk for pk in workspace_ids if pk is not None}
+    if not (user_ids or workspace_ids) or not is_shared():
+        return
+    _bump(user_ids, workspace_ids)
+    transaction.on_commit(lambda: _bump(user_ids, workspace_ids))
+
+
+def cached(name, user_id, workspace_ids, compute, variant=''):
+    """Return compute() from the cache, keyed by the current generations"""
+    if not is_shared():
+        return compute()
+    workspace_ids = sorted(str(pk) for pk in workspace_ids)
+    keys = [_user_key(user_id)] + [_workspace_key(pk) for pk in workspace_ids]
+    digest = hashlib.sha1('|'.join(
+        _generations(keys) + workspace_ids + [variant]
+    ).encode()).hexdigest()
+    key = f'read:{name}:{user_id}:{digest}'
+
+    value = cache.get(key)
+    if value is not None:
+        metrics.incr('cache.hit')
+        metrics.incr(f'cache.hit.{name}')
+        return value
+
+    metrics.incr('cache.miss')
+    metrics.incr(f'cache.miss.{name}')
+    value = compute()
+    cache.set(key, value, CACHE_TIMEOUT)
+    return value
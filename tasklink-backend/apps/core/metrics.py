@@ -0,0 +1,35 @@
+"""
+In-process counters and gauges.
+
+Each worker process keeps its own values; the staff-only metrics endpoint
+reports the process that served the request, which is what a scraper
+polling every worker expects.
+"""
+
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_gauges = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    with _lock:
+        return {'counters': dict(_counters), 'gauges': dict(_gauges)}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
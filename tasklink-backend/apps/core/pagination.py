@@ -0,0 +1,122 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite, unique sort key.
+
+    The cursor stores the sort-key values of the last row on the page, and the
+    next page is fetched with a range predicate on those values, so every
+    page costs one index range scan instead of an OFFSET scan.
+    """
+
+    # Model field names, '-' prefix for descending. The last field must make
+    # the key unique (normally the primary key).
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # When set, requests without a cursor or page size stay unpaginated
+    opt_in = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        params = request.query_params
+        if self.opt_in and self.cursor_query_param not in params \
+                and self.page_size_query_param not in params:
+            return None
+
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.position_of(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def after(self, position, ordering=None):
+        """Rows strictly after the given key values in `ordering` order"""
+        ordering = ordering or self.ordering
+        clauses = []
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+
+        # Redundant bound on the leading column lets the planner start the
+        # index range scan there instead of evaluating the OR per row.
+        first = ordering[0]
+        leading = Q(**{
+            f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}":
+                position[0]
+        })
+        return leading & reduce(or_, clauses)
+
+    def position_of(self, obj):
+        return [self.get_field(field).value_to_string(obj)
+                for field in self.ordering]
+
+    def get_field(self, field):
+        return self.model._meta.get_field(field.lstrip('-'))
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [self.get_field(field).to_python(value)
+                    for field, value in zip(self.ordering, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
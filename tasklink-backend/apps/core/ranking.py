@@ -0,0 +1,115 @@
+"""
+Lexicographic rank strings for user-ordered rows (LexoRank style).
+
+A rank is a string over ``DIGITS`` compared byte-wise. A new rank can always
+be generated strictly between two existing ones, so moving an item only
+rewrites that item's row instead of renumbering its siblings. Ranks grow
+longer when items are repeatedly inserted into the same gap; ``rebalance``
+spreads a list back out over short, evenly spaced ranks.
+"""
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Ranks longer than this are spread out again when the next rank is computed
+REBALANCE_LENGTH = 64
+
+
+def rank_between(before=None, after=None):
+    """Return a rank sorting strictly after `before` and before `after`"""
+    before = before or ''
+    if after is not None and after <= before:
+        raise ValueError(f'Cannot rank between {before!r} and {after!r}')
+
+    result = []
+    index = 0
+    while True:
+        low = DIGITS.index(before[index]) if index < len(before) else 0
+        if after is not None and index < len(after):
+            high = DIGITS.index(after[index])
+        else:
+            high = BASE
+
+        if low == high:
+            result.append(DIGITS[low])
+            index += 1
+            continue
+
+        middle = (low + high) // 2
+        if middle > low:
+            result.append(DIGITS[middle])
+            return ''.join(result)
+
+        # No room at this digit: keep the lower digit. The prefix is now
+        # strictly below `after`, so deeper digits are only bounded below.
+        result.append(DIGITS[low])
+        after = None
+        index += 1
+
+
+def rank_sequence(count):
+    """Return `count` short, evenly spaced ranks in ascending order"""
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+
+    ranks = []
+    for position in range(1, count + 1):
+        value = position * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
+
+
+def rank_at(siblings, position):
+    """
+    Rank that places a row at index `position` among `siblings`.
+
+    `siblings` is an ordered queryset of the other rows in the list; a single
+    sliced query fetches the two neighbours around the target index. A
+    position past the end places the row after the last sibling.
+    """
+    position = max(position, 0)
+    start = max(position - 1, 0)
+    neighbours = list(
+        siblings.values_list('rank', flat=True)[start:position + 1])
+    if position == 0:
+        return rank_between(None, neighbours[0] if neighbours else None)
+    if not neighbours:
+        # Past the end of the list: place after the last sibling
+        return rank_between(siblings.values_list('rank', flat=True).last(), None)
+    before = neighbours[0] if neighbours else None
+    after = neighbours[1] if len(neighbours) > 1 else None
+    return rank_between(before, after)
+
+
+def rank_between_rows(siblings, before_id=None, after_id=None):
+    """
+    Rank between two sibling rows identified by primary key.
+
+    `before_id` is the row that should end up directly above and `after_id`
+    the row directly below; leave one out at either end of the list.
+    """
+    ids = [pk for pk in (before_id, after_id) if pk is not None]
+    ranks = dict(siblings.filter(pk__in=ids).values_list('pk', 'rank'))
+    if len(ranks) != len(ids):
+        raise LookupError('Neighbour not found in the target list')
+    before = ranks.get(before_id) if before_id is not None else None
+    after = ranks.get(after_id) if after_id is not None else None
+    if before is not None and after is not None and before >= after:
+        # Neighbours share a rank (concurrent inserts); spread them out.
+        return None
+    return rank_between(before, after)
+
+
+def rebalance(siblings):
+    """Rewrite the ranks of an ordered queryset as evenly spaced values"""
+    rows = list(siblings.only('pk', 'rank'))
+    for row, rank in zip(rows, rank_sequence(len(rows))):
+        row.rank = rank
+    siblings.model.objects.bulk_update(rows, ['rank'], batch_size=500)
+    return len(rows)
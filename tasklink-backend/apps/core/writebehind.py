@@ -0,0 +1,162 @@
+"""
+In-process write-behind buffers.
+
+Rows are built in full (primary key and timestamps assigned in the
+process) and queued; a per-process flusher thread saves them with one
+``bulk_create`` as soon as ``max_batch`` rows are waiting or the oldest
+has waited ``max_delay`` seconds. Pending rows are also flushed at
+interpreter exit, and whoever calls ``flush()`` (e.g. a request_finished
+receiver) saves them at once.
+
+Durability bound: a process that dies loses at most the rows of the
+current window. With ``max_pending`` set, a caller that finds that many
+rows queued (the flusher fell behind) writes the queue itself instead of
+letting it grow. Rows are written in the order they were added: flushes
+from different threads take turns, so a later batch never commits first.
+Rows the database rejects (integrity or data errors) are logged and
+dropped; on any other database error (lost connection, failover) the
+batch goes back to the front of the queue for the next flush.
+
+The flusher thread is started lazily on first use in each process, so
+buffers work unchanged in forked WSGI workers (gunicorn) and in ASGI
+servers (daphne), where rows may be added from the event loop thread and
+sync worker threads alike.
+"""
+
+import abc
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.db import (
+    DatabaseError, DataError, IntegrityError, close_old_connections,
+)
+
+from apps.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer(abc.ABC):
+    """Ordered in-memory queue of unsaved rows with a flusher thread"""
+
+    # Prefix of the buffer's metrics, and its flusher thread's name
+    name = 'write_behind'
+    thread_name = 'write-behind'
+
+    def __init__(self, max_batch, max_delay, max_pending=None, autostart=True):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.autostart = autostart
+        self._reset()
+        atexit.register(self.flush)
+
+    @abc.abstractmethod
+    def save(self, rows):
+        """Insert rows with a single statement"""
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        # Held from taking a batch until it is saved
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._oldest = None
+        self._thread = None
+        self._pid = os.getpid()
+
+    def add(self, row):
+        """Queue a row built with its final primary key and timestamps"""
+        if self._pid != os.getpid():
+            # Forked worker: the parent owns (and flushes) what it queued
+            self._reset()
+        with self._cond:
+            self._pending.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            depth = len(self._pending)
+            if depth >= self.max_batch:
+                self._cond.notify()
+        metrics.gauge(f'{self.name}.queue_depth', depth)
+        if self.max_pending and depth >= self.max_pending:
+            metrics.incr(f'{self.name}.inline_flushes')
+            self.flush()
+        elif self.autostart:
+            self._ensure_thread()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._oldest + self.max_delay
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+            close_old_connections()
+
+    def _requeue(self, rows):
+        """Put unsaved rows back ahead of those queued since, in order"""
+        with self._cond:
+            self._pending[:0] = rows
+            # Wait a full delay before retrying
+            self._oldest = time.monotonic()
+        metrics.incr(f'{self.name}.requeued', len(rows))
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows saved"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending, self._oldest = self._pending, [], None
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                self.save(batch)
+                saved = len(batch)
+            except (IntegrityError, DataError):
+                # Isolate the offending rows (e.g. a project deleted meanwhile)
+                logger.exception('%s batch failed, retrying rows', self.name)
+                saved = 0
+                for index, row in enumerate(batch):
+                    try:
+                        self.save([row])
+                        saved += 1
+                    except (IntegrityError, DataError):
+                        logger.exception('%s dropping row %s', self.name, row.pk)
+                        metrics.incr(f'{self.name}.dropped')
+                    except DatabaseError:
+                        logger.exception('%s flush interrupted', self.name)
+                        self._requeue(batch[index:])
+                        break
+            except DatabaseError:
+                # Lost connection, failover...: nothing is wrong with the rows
+                logger.exception('%s batch failed, keeping it for the next flush', self.name)
+                self._requeue(batch)
+                saved = 0
+
+        metrics.incr(f'{self.name}.saved', saved)
+        metrics.incr(f'{self.name}.batches')
+        metrics.gauge(f'{self.name}.flush_ms',
+                      (time.monotonic() - started) * 1000)
+        metrics.gauge(f'{self.name}.queue_depth', self.pending())
+        return saved
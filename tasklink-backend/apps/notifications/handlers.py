@@ -0,0 +1,10 @@
+from .models import Notification
+
+
+def write_notifications(payloads):
+    """Outbox handler: insert notification rows in one statement"""
+    # Redelivered events carry the same id and are skipped
+    Notification.objects.bulk_create(
+        [Notification.from_payload(payload) for payload in payloads],
+        ignore_conflicts=True
+    )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_created_at_default'),
+        ('projects', '0005_column_rank'),
+        ('tasks', '0003_task_rank'),
+        ('workspaces', '0003_populate_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notificatio_recipie_583549_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'created_at'], name='notificatio_recipie_2c3905_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', 'created_at'], name='notificatio_recipie_06c470_idx'),
+        ),
+    ]
@@ -1,6 +1,32 @@
 from django.db import models
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import uuid
+from collections import Counter
+
+from apps.outbox.handlers import send_to_groups
+from apps.outbox.models import OutboxEvent
+from . import unread
+
+NOTIFICATION_MODE = getattr(settings, 'NOTIFICATION_MODE', 'sync')
+
+
+class NotificationQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create() that keeps the cached unread counters in step"""
+        objs = super().bulk_create(objs, *args, **kwargs)
+        recipients = Counter(
+            notification.recipient_id for notification in objs
+            if not notification.is_read)
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # Which rows were inserted is unknown; recount on the next read
+            unread.forget(recipients)
+        else:
+            unread.adjust(recipients)
+        return objs
 
 
 class Notification(models.Model):
@@ -59,21 +85,134 @@ class Notification(models.Model):
 
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: deferred writes keep the time of the event
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = NotificationQuerySet.as_manager()
 
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['recipient', 'is_read']),
+            # Inbox pages: all, or unread only, newest first
+            models.Index(fields=['recipient', 'created_at']),
+            models.Index(fields=['recipient', 'is_read', 'created_at']),
             models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
         return f"{self.notification_type} for {self.recipient.email}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding and not self.is_read:
+            unread.adjust({self.recipient_id: 1})
+
     def mark_as_read(self):
-        from django.utils import timezone
+        """Mark read with a conditional UPDATE of the two read fields"""
+        if self.is_read:
+            return
         self.is_read = True
         self.read_at = timezone.now()
-        self.save()
+        updated = Notification.objects.filter(pk=self.pk, is_read=False).update(
+            is_read=True, read_at=self.read_at)
+        unread.adjust({self.recipient_id: -updated})
+
+    @classmethod
+    def mark_all_read(cls, user, ids=None):
+        """Mark the user's unread notifications (or those in ids) read with one UPDATE"""
+        user_id = getattr(user, 'pk', user)
+        queryset = cls.objects.filter(recipient_id=user_id, is_read=False)
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        updated = queryset.update(is_read=True, read_at=timezone.now())
+        unread.adjust({user_id: -updated})
+        return updated
+
+    @classmethod
+    def unread_count(cls, user):
+        """The user's unread count, from the cache when it has it"""
+        user_id = getattr(user, 'pk', user)
+        count = unread.get(user_id)
+        if count is None:
+            count = cls.objects.filter(recipient_id=user_id, is_read=False).count()
+            unread.store(user_id, count)
+        return count
+
+    @classmethod
+    def notify(cls, recipient, sender, notification_type, title, message, link='', task=None, project=None, workspace=None):
+        """
+        Notify a user and push it to their stream socket. Related objects
+        may be instances or ids. With NOTIFICATION_MODE = 'outbox' both
+        happen later in the outbox worker.
+        """
+        notification = cls(
+            recipient_id=getattr(recipient, 'pk', recipient),
+            sender_id=getattr(sender, 'pk', sender),
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            link=link,
+            task_id=getattr(task, 'pk', task),
+            project_id=getattr(project, 'pk', project),
+            workspace_id=getattr(workspace, 'pk', workspace)
+        )
+        cls.notify_many([notification])
+        return notification
+
+    @classmethod
+    def notify_many(cls, notifications):
+        """Save unsaved notifications in one statement and push them on commit"""
+        pushes = [notification.push_payload() for notification in notifications]
+        if NOTIFICATION_MODE == 'outbox':
+            OutboxEvent.enqueue_many(
+                'notification',
+                [notification.to_payload() for notification in notifications])
+            OutboxEvent.enqueue_many('ws', pushes)
+        else:
+            cls.objects.bulk_create(notifications)
+            transaction.on_commit(lambda: send_to_groups(pushes), robust=True)
+        return notifications
+
+    def to_payload(self):
+        return {
+            'id': str(self.id),
+            'recipient_id': self.recipient_id,
+            'sender_id': self.sender_id,
+            'notification_type': self.notification_type,
+            'title': self.title,
+            'message': self.message,
+            'link': self.link,
+            'task_id': str(self.task_id) if self.task_id else None,
+            'project_id': str(self.project_id) if self.project_id else None,
+            'workspace_id': str(self.workspace_id) if self.workspace_id else None,
+            'created_at': self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(**{**payload, 'created_at': parse_datetime(payload['created_at'])})
+
+    def push_payload(self):
+        """Channel-layer message for the recipient's notifications topic"""
+        from apps.chat.consumers import notification_group_name
+        from apps.chat.encoding import encode_frame
+        return {
+            'group': notification_group_name(self.recipient_id),
+            'message': {
+                'type': 'notification',
+                'topic': 'notifications',
+                'frame': encode_frame({
+                    'type': 'notification',
+                    'notification': {
+                        'id': str(self.id),
+                        'notification_type': self.notification_type,
+                        'title': self.title,
+                        'message': self.message,
+                        'link': self.link,
+                        'created_at': self.created_at.isoformat(),
+                    }
+                })
+            }
+        }
@@ -0,0 +1,8 @@
+from apps.core.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    """Newest first, a range scan of the (recipient, [is_read,] created_at) index"""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
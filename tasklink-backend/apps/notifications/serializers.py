@@ -0,0 +1,24 @@
+from rest_framework import serializers
+
+from apps.authentication.serializers import user_summary
+from .models import Notification
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    sender = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'notification_type', 'title', 'message', 'link', 'sender',
+            'task', 'project', 'workspace', 'is_read', 'read_at', 'created_at'
+        ]
+
+    def get_sender(self, obj):
+        return user_summary(obj.sender)
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    # Without ids every unread notification is marked read
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, max_length=500)
@@ -1,3 +1,119 @@
+"""
+Tests for Notifications app
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Notification
+
+User = get_user_model()
+
+
+class NotificationInboxTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # The local-memory cache in tests stands in for a shared one
+        patcher = mock.patch('apps.notifications.unread.is_shared', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com', username='testuser', password='TestPass123!')
+        self.sender = User.objects.create_user(
+            email='sender@example.com', username='sender', password='TestPass123!')
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def notify(self, count, recipient=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.notify_many([
+                Notification(
+                    recipient=recipient or self.user,
+                    sender=self.sender,
+                    notification_type='task_assigned',
+                    title='Task Assigned to You',
+                    message=f'You have been assigned to task {index}',
+                    created_at=self.start + timedelta(minutes=index))
+                for index in range(count)
+            ])
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread_count']
+
+    def test_inbox_pages_newest_first(self):
+        notifications = self.notify(25)
+        self.notify(3, recipient=self.sender)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/notifications/')
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(n.id) for n in notifications[:-21:-1]])
+        self.assertEqual(response.data['results'][0]['sender']['username'], 'sender')
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(n.id) for n in notifications[4::-1]])
+        self.assertIsNone(response.data['next'])
+
+    def test_unread_count_is_served_from_cache(self):
+        self.notify(3)
+        self.assertEqual(self.unread_count(), 3)
+
+        # Creating adjusts the cached counter instead of dropping it
+        self.notify(2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 5)
+
+    def test_unread_count_without_a_shared_cache_counts_rows(self):
+        self.notify(3)
+        self.unread_count()
+
+        with mock.patch('apps.notifications.unread.is_shared', return_value=False):
+            # Other processes' adjustments would never reach a local counter
+            with self.assertNumQueries(1):
+                self.assertEqual(self.unread_count(), 3)
+            Notification.objects.filter(recipient=self.user).update(is_read=True)
+            self.assertEqual(self.unread_count(), 0)
+
+    def test_mark_read_uses_one_update(self):
+        notifications = self.notify(5)
+        self.assertEqual(self.unread_count(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            response = self.client.post('/api/notifications/mark_read/', {
+                'ids': [str(notifications[0].id), str(notifications[1].id)]
+            }, format='json')
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(self.unread_count(), 3)
+
+        response = self.client.get('/api/notifications/', {'unread': 'true'})
+        self.assertEqual(len(response.data['results']), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/notifications/mark_read/', format='json')
+        self.assertEqual(response.data, {'updated': 3})
+        self.assertEqual(self.unread_count(), 0)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 0)
+
+    def test_read_one(self):
+        notification = self.notify(2)[0]
+        self.assertEqual(self.unread_count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/notifications/{notification.id}/read/')
+            # Reading it again does not count twice
+            self.client.post(f'/api/notifications/{notification.id}/read/')
+        self.assertTrue(response.data['is_read'])
+        self.assertEqual(self.unread_count(), 1)
 
-# Create your tests here.
+        other = self.notify(1, recipient=self.sender)[0]
+        response = self.client.post(f'/api/notifications/{other.id}/read/')
+        self.assertEqual(response.status_code, 404)
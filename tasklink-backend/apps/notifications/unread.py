@@ -0,0 +1,65 @@
+"""
+Cached unread notification counts.
+
+The badge poll reads a per-user counter from the shared cache instead of
+running COUNT(*). Creating and reading notifications adjust the counter
+once their transaction commits; a counter that is missing is recounted on
+the next read. Counters expire after ``NOTIFICATION_UNREAD_TTL`` seconds,
+which bounds drift from rows removed without going through the model
+(e.g. deleted along with their task).
+
+Adjustments made in one process (a web worker, the outbox worker) must
+reach every other, so counters are only kept in a shared cache; with the
+per-process local-memory cache every read counts from the database.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.cache import is_shared
+
+UNREAD_TTL = getattr(settings, 'NOTIFICATION_UNREAD_TTL', 300)
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def get(user_id):
+    if not is_shared():
+        return None
+    return cache.get(_key(user_id))
+
+
+def store(user_id, count):
+    if not is_shared():
+        return
+    # add() leaves a counter another process already stored (and adjusted)
+    cache.add(_key(user_id), count, timeout=UNREAD_TTL)
+
+
+def _apply(deltas):
+    for user_id, delta in deltas.items():
+        key = _key(user_id)
+        try:
+            count = cache.incr(key, delta)
+        except ValueError:
+            # Not cached; the next read counts
+            continue
+        if count < 0:
+            cache.delete(key)
+
+
+def adjust(deltas):
+    """Add {user_id: delta} to the cached counters after commit"""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if deltas and is_shared():
+        transaction.on_commit(lambda: _apply(deltas), robust=True)
+
+
+def forget(user_ids):
+    """Drop the cached counters after commit so they are recounted"""
+    keys = [_key(user_id) for user_id in user_ids]
+    if keys and is_shared():
+        transaction.on_commit(lambda: cache.delete_many(keys), robust=True)
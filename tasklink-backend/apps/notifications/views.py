@@ -1,3 +1,46 @@
-from django.shortcuts import render
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from .models import Notification
+from .pagination import NotificationPagination
+from .serializers import NotificationMarkReadSerializer, NotificationSerializer
+
+
+class NotificationViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    The requesting user's inbox, newest first; ?unread=true lists unread
+    notifications only. The unread badge is served from a cached counter.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = NotificationSerializer
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(
+            recipient=self.request.user
+        ).select_related('sender')
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': Notification.unread_count(request.user)})
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """Mark the given ids, or every unread notification, read"""
+        serializer = NotificationMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        updated = Notification.mark_all_read(
+            request.user, serializer.validated_data.get('ids'))
+        return Response({'updated': updated})
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        notification = self.get_object()
+        notification.mark_as_read()
+        return Response(self.get_serializer(notification).data)
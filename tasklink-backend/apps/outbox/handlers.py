@@ -0,0 +1,43 @@
+"""
+Outbox handlers.
+
+A handler takes the payloads of a batch of events with the same topic and
+carries them out, normally with one ``bulk_create``. Events are delivered
+at least once, so handlers must be idempotent (payloads carry the primary
+key of the row to create and inserts ignore conflicts).
+
+Topics map to handlers through ``OUTBOX_HANDLERS`` (topic -> dotted path),
+merged over the defaults below, so projects can add or replace handlers.
+"""
+
+from functools import lru_cache
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_HANDLERS = {
+    'activity': 'apps.activity.handlers.write_activity',
+    'notification': 'apps.notifications.handlers.write_notifications',
+    'ws': 'apps.outbox.handlers.send_to_groups',
+}
+
+
+@lru_cache(maxsize=None)
+def get_handler(topic):
+    handlers = {**DEFAULT_HANDLERS, **getattr(settings, 'OUTBOX_HANDLERS', {})}
+    try:
+        return import_string(handlers[topic])
+    except KeyError:
+        raise LookupError(f'No outbox handler for topic {topic!r}')
+
+
+def send_to_groups(payloads):
+    """Channel-layer fan-out: each payload is {'group': ..., 'message': {...}}"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    send = async_to_sync(channel_layer.group_send)
+    for payload in payloads:
+        send(payload['group'], payload['message'])
@@ -0,0 +1,50 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.outbox.worker import process_batch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Carry out side effects recorded in the outbox (activity log, '
+        'notifications, WebSocket fan-out) in batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Events taken per transaction')
+        parser.add_argument(
+            '--interval', type=float, default=1.0, metavar='SECONDS',
+            help='Sleep between polls when the outbox is drained')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    processed = process_batch(batch_size)
+                except Exception:
+                    # e.g. the database went away; poll again after a pause
+                    logger.exception('Outbox batch failed')
+                    processed = 0
+                total += processed
+                if options['verbosity'] > 1 and processed:
+                    self.stdout.write(f'Processed {processed} events')
+                if processed < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Processed {total} outbox events')
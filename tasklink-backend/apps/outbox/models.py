@@ -0,0 +1,32 @@
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """
+    A side effect recorded in the same transaction as the change that
+    caused it, and carried out later by ``manage.py run_outbox_worker``.
+    """
+
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
+
+    @classmethod
+    def enqueue(cls, topic, payload):
+        """Record an event; it is only visible to the worker once committed"""
+        return cls.objects.create(topic=topic, payload=payload)
+
+    @classmethod
+    def enqueue_many(cls, topic, payloads):
+        """Record several events of one topic with a single insert"""
+        return cls.objects.bulk_create(
+            [cls(topic=topic, payload=payload) for payload in payloads])
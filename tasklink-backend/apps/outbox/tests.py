@@ -0,0 +1,172 @@
+"""
+Tests for Outbox app
+"""
+
+import uuid
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.activity.models import ActivityLog
+from apps.chat.consumers import notification_group_name
+from apps.core import metrics
+from apps.notifications.models import Notification
+from apps.workspaces.models import Workspace
+from .models import OutboxEvent
+from .worker import MAX_ATTEMPTS, process_batch
+
+User = get_user_model()
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(
+            email='owner@example.com', username='owner', password='TestPass123!')
+        self.other = User.objects.create_user(
+            email='other@example.com', username='other', password='TestPass123!')
+        self.workspace = Workspace.objects.create(name='Outbox', owner=self.user)
+
+    def log(self, index):
+        return ActivityLog.log_activity(
+            user=self.user,
+            action='create',
+            entity_type='task',
+            entity_id=index,
+            description=f'Created task {index}',
+            workspace=self.workspace.id
+        )
+
+    def notify(self):
+        return Notification.notify(
+            recipient=self.other.id,
+            sender=self.user,
+            notification_type='task_assigned',
+            title='Task Assigned to You',
+            message='You have been assigned to task: Outbox',
+            workspace=self.workspace
+        )
+
+    def receive(self, group):
+        channel_layer = get_channel_layer()
+        channel = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)(group, channel)
+        return lambda: async_to_sync(channel_layer.receive)(channel)
+
+    @mock.patch('apps.notifications.models.NOTIFICATION_MODE', 'outbox')
+    @mock.patch('apps.activity.models.ACTIVITY_LOG_MODE', 'outbox')
+    def test_outbox_mode_defers_writes_to_the_worker(self):
+        activities = [self.log(index) for index in range(3)]
+        self.notify()
+
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(
+            sorted(OutboxEvent.objects.values_list('topic', flat=True)),
+            ['activity'] * 3 + ['notification', 'ws'])
+
+        receive = self.receive(notification_group_name(self.other.id))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(process_batch(), 5)
+        # One insert per topic, not per event
+        self.assertEqual(
+            len([q for q in queries if q['sql'].startswith('INSERT')]), 2)
+
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(
+            set(ActivityLog.objects.values_list('id', flat=True)),
+            {activity.id for activity in activities})
+        # The action's time is kept, not the time the worker ran
+        self.assertEqual(
+            ActivityLog.objects.get(id=activities[0].id).created_at,
+            activities[0].created_at)
+        self.assertEqual(Notification.objects.get().recipient, self.other)
+        self.assertEqual(receive()['type'], 'notification')
+        self.assertEqual(metrics.snapshot()['counters']['outbox.processed.activity'], 3)
+
+    @mock.patch('apps.activity.models.ACTIVITY_LOG_MODE', 'outbox')
+    def test_redelivered_events_are_written_once(self):
+        activity = self.log(1)
+        payload = OutboxEvent.objects.get().payload
+        process_batch()
+
+        OutboxEvent.enqueue('activity', payload)
+        process_batch()
+
+        self.assertEqual(ActivityLog.objects.get().id, activity.id)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failing_handler_keeps_its_events(self):
+        OutboxEvent.enqueue('activity', {'broken': True})
+        OutboxEvent.enqueue('unknown', {})
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.assertEqual(process_batch(), 2)
+            self.assertEqual(
+                list(OutboxEvent.objects.values_list('attempts', flat=True)),
+                [attempt, attempt])
+
+        # Given up on; left for inspection
+        self.assertEqual(process_batch(), 0)
+        self.assertIn('unknown', OutboxEvent.objects.get(topic='unknown').last_error)
+        self.assertEqual(metrics.snapshot()['counters']['outbox.failed'], 2 * MAX_ATTEMPTS)
+
+    def test_bad_event_does_not_strand_its_topic(self):
+        """Test only the event violating a deferred foreign key is charged"""
+        good = self.notify().to_payload()
+        bad = {**good, 'id': str(uuid.uuid4()), 'task_id': str(uuid.uuid4())}
+        OutboxEvent.enqueue('notification', good)
+        OutboxEvent.enqueue('notification', bad)
+
+        self.assertEqual(process_batch(), 2)
+
+        self.assertEqual(Notification.objects.get().id, uuid.UUID(good['id']))
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.payload['id'], bad['id'])
+        self.assertEqual(event.attempts, 1)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['outbox.failed'], 1)
+        self.assertEqual(counters['outbox.processed.notification'], 1)
+
+    @mock.patch('apps.outbox.management.commands.run_outbox_worker.process_batch',
+                side_effect=[Exception('connection lost'), 3, KeyboardInterrupt])
+    def test_command_survives_a_failed_batch(self, process):
+        out = StringIO()
+        with mock.patch('time.sleep'):
+            call_command('run_outbox_worker', stdout=out)
+
+        self.assertEqual(process.call_count, 3)
+        self.assertIn('Processed 3 outbox events', out.getvalue())
+
+    def test_sync_mode_pushes_notification_on_commit(self):
+        receive = self.receive(notification_group_name(self.other.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = self.notify()
+
+        self.assertTrue(Notification.objects.filter(id=notification.id).exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertIn(str(notification.id), receive()['frame'])
+
+    @mock.patch('apps.activity.models.ACTIVITY_LOG_MODE', 'outbox')
+    def test_command_drains_once(self):
+        for index in range(5):
+            self.log(index)
+        out = StringIO()
+
+        call_command('run_outbox_worker', '--once', '--batch-size', '2', stdout=out)
+
+        self.assertIn('Processed 5 outbox events', out.getvalue())
+        self.assertEqual(ActivityLog.objects.count(), 5)
@@ -0,0 +1,78 @@
+import logging
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from apps.core import metrics
+from .handlers import get_handler
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Events failing this often are left in the table for inspection
+MAX_ATTEMPTS = 5
+
+
+def run_handler(topic, payloads):
+    """
+    Run a topic's handler in a savepoint. Foreign keys are deferred to
+    commit, so they are checked before the savepoint is released: a row
+    pointing at a deleted task fails here instead of at the outer commit.
+    """
+    with transaction.atomic():
+        get_handler(topic)(payloads)
+        connection.check_constraints()
+
+
+def process_batch(batch_size=500):
+    """
+    Run the handlers for up to batch_size pending events, one call per
+    topic, and delete the events that succeeded. When a topic's call fails
+    its events are retried one by one, so only the failing events are
+    charged an attempt. Returns the number of events taken. Workers running
+    side by side skip each other's rows.
+    """
+    started = time.monotonic()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+                attempts__lt=MAX_ATTEMPTS
+            ).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        by_topic = defaultdict(list)
+        for event in events:
+            by_topic[event.topic].append(event)
+
+        done = []
+        for topic, batch in by_topic.items():
+            try:
+                # A failing handler rolls back its own writes only
+                run_handler(topic, [event.payload for event in batch])
+            except Exception:
+                logger.exception('Outbox handler for %r failed, retrying events', topic)
+            else:
+                done.extend(event.id for event in batch)
+                metrics.incr(f'outbox.processed.{topic}', len(batch))
+                continue
+
+            for event in batch:
+                try:
+                    run_handler(topic, [event.payload])
+                except Exception as exc:
+                    logger.exception('Outbox event %s failed', event.id)
+                    metrics.incr('outbox.failed')
+                    OutboxEvent.objects.filter(id=event.id).update(
+                        attempts=F('attempts') + 1, last_error=str(exc)[:2000])
+                else:
+                    done.append(event.id)
+                    metrics.incr(f'outbox.processed.{topic}')
+
+        OutboxEvent.objects.filter(id__in=done).delete()
+
+    metrics.gauge('outbox.batch_ms', (time.monotonic() - started) * 1000)
+    return len(events)
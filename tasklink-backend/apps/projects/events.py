@@ -0,0 +1,76 @@
+"""
+Real-time board events.
+
+Task and column mutations publish compact diffs to the project's
+``board_<project_id>`` channel group once their transaction commits, so
+stream sockets subscribed to ``board:<project_id>`` see changes without
+polling. With a shared cache (``REDIS_CACHE_URL``) every event carries a
+per-project sequence number, and a client that sees a gap reloads the
+board. A process-local cache would number events per worker, so without
+one ``seq`` is left out and clients cannot detect gaps.
+
+Frames look like::
+
+    {"type": "board", "event": "task.moved", "project_id": "...",
+     "seq": 42, "data": {...}}
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.chat.consumers import board_group_name
+from apps.chat.encoding import encode_frame
+from apps.core.cache import is_shared
+
+
+def task_data(task):
+    """The fields a board card needs"""
+    return {
+        'id': str(task.id),
+        'column_id': str(task.column_id),
+        'title': task.title,
+        'status': task.status,
+        'priority': task.priority,
+        'assignee_id': task.assignee_id,
+        'rank': task.rank,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+    }
+
+
+def next_sequence(project_id):
+    """Atomically increment the project's event counter"""
+    key = f'board:seq:{project_id}'
+    # add() is a no-op when another process created the counter first
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); clients see a gap and reload
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def _send(project_id, event, data):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    payload = {
+        'type': 'board',
+        'event': event,
+        'project_id': str(project_id),
+    }
+    if is_shared():
+        payload['seq'] = next_sequence(project_id)
+    payload['data'] = data
+    frame = encode_frame(payload)
+    async_to_sync(channel_layer.group_send)(
+        board_group_name(project_id),
+        {'type': 'board_event', 'topic': f'board:{project_id}', 'frame': frame}
+    )
+
+
+def publish_board_event(project_id, event, data):
+    """Send a board event when the current transaction commits"""
+    transaction.on_commit(lambda: _send(project_id, event, data), robust=True)
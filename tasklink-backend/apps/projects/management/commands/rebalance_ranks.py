@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Length
+
+from apps.core.ranking import rebalance
+from apps.projects.models import Column
+from apps.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Spread out task and column ranks that have grown long'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-length', type=int, default=8,
+            help='Rebalance lists containing a rank longer than this')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebalance every list regardless of rank length')
+
+    def handle(self, *args, **options):
+        max_length = 0 if options['all'] else options['max_length']
+
+        column_ids = Task.objects.annotate(
+            rank_length=Length('rank')
+        ).filter(rank_length__gt=max_length).order_by().values_list(
+            'column_id', flat=True).distinct()
+        for column_id in column_ids:
+            with transaction.atomic():
+                rebalance(Task.column_siblings(column_id).select_for_update())
+        self.stdout.write(f'Rebalanced tasks in {len(column_ids)} columns')
+
+        project_ids = Column.objects.annotate(
+            rank_length=Length('rank')
+        ).filter(rank_length__gt=max_length).order_by().values_list(
+            'project_id', flat=True).distinct()
+        for project_id in project_ids:
+            with transaction.atomic():
+                rebalance(Column.project_siblings(project_id).select_for_update())
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebalanced columns in {len(project_ids)} projects'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from apps.projects.models import Project, ProjectStats, ColumnStats
+from apps.workspaces.models import Workspace, WorkspaceStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized project, column and workspace counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of projects/workspaces recounted per batch')
+        parser.add_argument(
+            '--workspace', dest='workspace_ids', action='append',
+            help='Only rebuild this workspace (can be repeated)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        workspaces = Workspace.objects.order_by('id')
+        projects = Project.objects.order_by('id')
+        if options['workspace_ids']:
+            workspaces = workspaces.filter(id__in=options['workspace_ids'])
+            projects = projects.filter(
+                workspace_id__in=options['workspace_ids'])
+
+        total = 0
+        for batch in self.batches(projects, batch_size):
+            total += ProjectStats.rebuild(batch)
+            ColumnStats.rebuild(project_ids=batch)
+        self.stdout.write(f'Rebuilt stats for {total} projects')
+
+        total = 0
+        for batch in self.batches(workspaces, batch_size):
+            total += WorkspaceStats.rebuild(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {total} workspaces'))
+
+    def batches(self, queryset, size):
+        ids = list(queryset.values_list('id', flat=True))
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_alter_column_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColumnStats',
+            fields=[
+                ('column', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='projects.column')),
+                ('tasks_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'column_stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='projects.project')),
+                ('tasks_count', models.IntegerField(default=0)),
+                ('todo_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('done_count', models.IntegerField(default=0)),
+                ('low_priority_count', models.IntegerField(default=0)),
+                ('medium_priority_count', models.IntegerField(default=0)),
+                ('high_priority_count', models.IntegerField(default=0)),
+                ('members_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'project_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+STATUS_FIELDS = {
+    'todo': 'todo_count',
+    'in-progress': 'in_progress_count',
+    'review': 'review_count',
+    'done': 'done_count',
+}
+
+PRIORITY_FIELDS = {
+    'low': 'low_priority_count',
+    'medium': 'medium_priority_count',
+    'high': 'high_priority_count',
+}
+
+
+def populate_stats(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Column = apps.get_model('projects', 'Column')
+    ProjectMember = apps.get_model('projects', 'ProjectMember')
+    ProjectStats = apps.get_model('projects', 'ProjectStats')
+    ColumnStats = apps.get_model('projects', 'ColumnStats')
+    Task = apps.get_model('tasks', 'Task')
+
+    rows = {pk: ProjectStats(project_id=pk)
+            for pk in Project.objects.values_list('id', flat=True)}
+
+    aggregates = {'tasks_count': Count('id')}
+    for status, field in STATUS_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(status=status))
+    for priority, field in PRIORITY_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(priority=priority))
+
+    for counts in Task.objects.order_by().values('project_id').annotate(**aggregates):
+        row = rows.get(counts.pop('project_id'))
+        if row is not None:
+            for field, value in counts.items():
+                setattr(row, field, value)
+
+    for counts in ProjectMember.objects.order_by().values('project_id').annotate(total=Count('id')):
+        row = rows.get(counts['project_id'])
+        if row is not None:
+            row.members_count = counts['total']
+
+    ProjectStats.objects.bulk_create(rows.values(), batch_size=500)
+
+    ColumnStats.objects.bulk_create(
+        [
+            ColumnStats(column_id=column['id'], tasks_count=column['total'])
+            for column in Column.objects.order_by().values('id').annotate(total=Count('tasks'))
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_columnstats_projectstats'),
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
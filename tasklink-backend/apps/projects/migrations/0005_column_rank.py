@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+from apps.core.ranking import rank_sequence
+
+
+def assign_ranks(apps, schema_editor):
+    """Rank existing columns in the order they were displayed by position"""
+    Column = apps.get_model('projects', 'Column')
+
+    def flush(ids):
+        rows = [Column(id=pk, rank=rank)
+                for pk, rank in zip(ids, rank_sequence(len(ids)))]
+        Column.objects.bulk_update(rows, ['rank'], batch_size=500)
+
+    current, ids = None, []
+    columns = Column.objects.order_by(
+        'project_id', 'position', 'id').values_list('id', 'project_id')
+    for pk, project_id in columns.iterator(chunk_size=2000):
+        if project_id != current and ids:
+            flush(ids)
+            ids = []
+        current = project_id
+        ids.append(pk)
+    if ids:
+        flush(ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_populate_stats'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='column',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AddField(
+            model_name='column',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.RunPython(assign_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='column',
+            index=models.Index(fields=['project', 'rank'], name='columns_project_rank_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
+from apps.core.ranking import (
+    REBALANCE_LENGTH, rank_between, rank_between_rows, rebalance)
+
 
 class Project(models.Model):
     """Project model within a workspace"""
@@ -38,6 +42,13 @@ class Project(models.Model):
     def __str__(self):
         return f"{self.name} ({self.workspace.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted values so counters can be adjusted by diff
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Column(models.Model):
     """Kanban column for tasks"""
@@ -49,21 +60,50 @@ class Column(models.Model):
     )
     name = models.CharField(max_length=100)
     position = models.IntegerField(default=0)
+    # Lexicographic sort key within the project, see apps.core.ranking
+    rank = models.CharField(max_length=128, default='', blank=True)
     color = models.CharField(max_length=7, default='#3B82F6')  # Hex color
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'columns'
-        ordering = ['position']
+        ordering = ['rank', 'id']
         # unique_together = ['project', 'name']
         indexes = [
             models.Index(fields=['project', 'position']),
+            models.Index(fields=['project', 'rank'],
+                         name='columns_project_rank_idx'),
         ]
 
     def __str__(self):
         return f"{self.project.name} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        if not self.rank and self.project_id:
+            # New columns go to the end of the board
+            last = Column.project_siblings(self.project_id, self.pk).values_list(
+                'rank', flat=True).last()
+            self.rank = rank_between(last or None, None)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def project_siblings(cls, project_id, exclude=None):
+        siblings = cls.objects.filter(project_id=project_id)
+        if exclude is not None:
+            siblings = siblings.exclude(pk=exclude)
+        return siblings.order_by('rank', 'id')
+
+    @classmethod
+    def rank_between_columns(cls, project_id, before_id=None, after_id=None, exclude=None):
+        """Rank placing a column between two neighbours on the board"""
+        siblings = cls.project_siblings(project_id, exclude)
+        rank = rank_between_rows(siblings, before_id, after_id)
+        if rank is None or len(rank) > REBALANCE_LENGTH:
+            rebalance(siblings)
+            rank = rank_between_rows(siblings, before_id, after_id)
+        return rank
+
 
 class ProjectMember(models.Model):
     """Members assigned to a project"""
@@ -95,3 +135,170 @@ class ProjectMember(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.project.name}"
+
+
+class ProjectStats(models.Model):
+    """Materialized task and member counters for a project"""
+
+    STATUS_FIELDS = {
+        'todo': 'todo_count',
+        'in-progress': 'in_progress_count',
+        'review': 'review_count',
+        'done': 'done_count',
+    }
+
+    PRIORITY_FIELDS = {
+        'low': 'low_priority_count',
+        'medium': 'medium_priority_count',
+        'high': 'high_priority_count',
+    }
+
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    tasks_count = models.IntegerField(default=0)
+    todo_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    done_count = models.IntegerField(default=0)
+    low_priority_count = models.IntegerField(default=0)
+    medium_priority_count = models.IntegerField(default=0)
+    high_priority_count = models.IntegerField(default=0)
+    members_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'project_stats'
+
+    def __str__(self):
+        return f"Stats for {self.project_id}"
+
+    @classmethod
+    def counter_fields(cls):
+        return ['tasks_count', *cls.STATUS_FIELDS.values(),
+                *cls.PRIORITY_FIELDS.values(), 'members_count']
+
+    @classmethod
+    def task_deltas(cls, status, priority, delta):
+        """Counter changes caused by adding (+1) or removing (-1) one task"""
+        deltas = {'tasks_count': delta}
+        if status in cls.STATUS_FIELDS:
+            deltas[cls.STATUS_FIELDS[status]] = delta
+        if priority in cls.PRIORITY_FIELDS:
+            deltas[cls.PRIORITY_FIELDS[priority]] = delta
+        return deltas
+
+    @classmethod
+    def increment(cls, project_id, **deltas):
+        """Apply counter deltas with a single UPDATE, rebuilding a missing row"""
+        changes = {field: models.F(field) + delta
+                   for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+        updated = cls.objects.filter(project_id=project_id).update(
+            updated_at=timezone.now(), **changes)
+        if not updated:
+            # After commit, so a cascade deleting the project cannot re-insert it
+            transaction.on_commit(lambda: cls.rebuild([project_id]))
+
+    @classmethod
+    def rebuild(cls, project_ids=None):
+        """Recompute counters from scratch with grouped aggregate queries"""
+        from apps.tasks.models import Task
+
+        projects = Project.objects.all()
+        if project_ids is not None:
+            projects = projects.filter(id__in=project_ids)
+
+        rows = {pk: cls(project_id=pk)
+                for pk in projects.values_list('id', flat=True)}
+        if not rows:
+            return 0
+
+        aggregates = {'tasks_count': models.Count('id')}
+        for status, field in cls.STATUS_FIELDS.items():
+            aggregates[field] = models.Count(
+                'id', filter=models.Q(status=status))
+        for priority, field in cls.PRIORITY_FIELDS.items():
+            aggregates[field] = models.Count(
+                'id', filter=models.Q(priority=priority))
+
+        task_counts = Task.objects.filter(
+            project_id__in=rows.keys()
+        ).order_by().values('project_id').annotate(**aggregates)
+        for counts in task_counts:
+            row = rows[counts.pop('project_id')]
+            for field, value in counts.items():
+                setattr(row, field, value)
+
+        member_counts = ProjectMember.objects.filter(
+            project_id__in=rows.keys()
+        ).order_by().values('project_id').annotate(total=models.Count('id'))
+        for counts in member_counts:
+            rows[counts['project_id']].members_count = counts['total']
+
+        cls.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=[*cls.counter_fields(), 'updated_at']
+        )
+        return len(rows)
+
+
+class ColumnStats(models.Model):
+    """Materialized task counter for a Kanban column"""
+
+    column = models.OneToOneField(
+        Column,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    tasks_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'column_stats'
+
+    def __str__(self):
+        return f"Stats for column {self.column_id}"
+
+    @classmethod
+    def increment(cls, column_id, delta):
+        if not delta:
+            return
+        updated = cls.objects.filter(column_id=column_id).update(
+            tasks_count=models.F('tasks_count') + delta,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            transaction.on_commit(lambda: cls.rebuild(column_ids=[column_id]))
+
+    @classmethod
+    def rebuild(cls, project_ids=None, column_ids=None):
+        """Recompute column counters for the given projects or columns"""
+        columns = Column.objects.all()
+        if project_ids is not None:
+            columns = columns.filter(project_id__in=project_ids)
+        if column_ids is not None:
+            columns = columns.filter(id__in=column_ids)
+
+        rows = [
+            cls(column_id=column['id'], tasks_count=column['total'])
+            for column in columns.order_by().values('id').annotate(
+                total=models.Count('tasks'))
+        ]
+        if not rows:
+            return 0
+
+        cls.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['column'],
+            update_fields=['tasks_count', 'updated_at']
+        )
+        return len(rows)
@@ -1,6 +1,24 @@
 from rest_framework import serializers
 from .models import Project, Column, ProjectMember
 from apps.authentication.serializers import UserSerializer
+from apps.core.ranking import rank_at
+
+
+def project_tasks_count(project):
+    """Task count from the stats row, counted when the row is missing"""
+    stats = getattr(project, 'stats', None)
+    if stats is not None:
+        return stats.tasks_count
+    # Same predicate as ProjectStats.tasks_count: every task of the project
+    return project.tasks.count()
+
+
+def project_members_count(project):
+    """Member count from the stats row, counted when the row is missing"""
+    stats = getattr(project, 'stats', None)
+    if stats is not None:
+        return stats.members_count
+    return project.project_members.count()
 
 
 class ColumnSerializer(serializers.ModelSerializer):
@@ -8,11 +26,14 @@ class ColumnSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Column
-        fields = ['id', 'name', 'position', 'color', 'project',
+        fields = ['id', 'name', 'position', 'rank', 'color', 'project',
                   'tasks_count', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'rank', 'created_at', 'updated_at']
 
     def get_tasks_count(self, obj):
+        stats = getattr(obj, 'stats', None)
+        if stats is not None:
+            return stats.tasks_count
         return obj.tasks.count()
 
 
@@ -44,10 +65,10 @@ class ProjectSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
 
     def get_tasks_count(self, obj):
-        return obj.tasks.filter(column__isnull=False).count()
+        return project_tasks_count(obj)
 
     def get_members_count(self, obj):
-        return obj.project_members.count()
+        return project_members_count(obj)
 
 
 class ProjectCreateSerializer(serializers.ModelSerializer):
@@ -105,6 +126,13 @@ class ColumnCreateSerializer(serializers.ModelSerializer):
         model = Column
         fields = ['project', 'name', 'color', 'position']
 
+    def create(self, validated_data):
+        if 'position' in validated_data:
+            siblings = Column.project_siblings(validated_data['project'].id)
+            validated_data['rank'] = rank_at(
+                siblings, validated_data['position'])
+        return super().create(validated_data)
+
 
 class ColumnUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating columns"""
@@ -113,17 +141,13 @@ class ColumnUpdateSerializer(serializers.ModelSerializer):
         model = Column
         fields = ['name', 'color', 'position']
 
+    def update(self, instance, validated_data):
+        if 'position' in validated_data:
+            siblings = Column.project_siblings(instance.project_id, instance.pk)
+            instance.rank = rank_at(siblings, validated_data['position'])
+        return super().update(instance, validated_data)
+
 
 class ProjectMemberAddSerializer(serializers.Serializer):
+    # Existence is checked by the view together with the membership lookups
     user_id = serializers.IntegerField()
-
-    def validate_user_id(self, value):
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-
-        try:
-            User.objects.get(id=value)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("User not found.")
-
-        return value
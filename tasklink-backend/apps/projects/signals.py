@@ -0,0 +1,119 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Project, Column, ProjectMember, ProjectStats, ColumnStats
+from apps.tasks.models import Task
+from apps.core.cache import invalidate
+
+
+@receiver(post_save, sender=Project)
+def create_project_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ProjectStats.objects.get_or_create(project=instance)
+
+
+@receiver(post_save, sender=Column)
+def create_column_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ColumnStats.objects.get_or_create(column=instance)
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, raw=False, **kwargs):
+    """Adjust project and column counters by the difference this save made"""
+    if raw:
+        return
+
+    current = {
+        'project_id': instance.project_id,
+        'column_id': instance.column_id,
+        'status': instance.status,
+        'priority': instance.priority,
+    }
+    previous = getattr(instance, '_loaded_values', None)
+    instance._loaded_values = {**(previous or {}), **current}
+
+    if created:
+        ProjectStats.increment(
+            instance.project_id,
+            **ProjectStats.task_deltas(instance.status, instance.priority, 1)
+        )
+        ColumnStats.increment(instance.column_id, 1)
+        return
+
+    if previous is None:
+        # Instance was not loaded from the database, so there is nothing
+        # to diff against; recount the affected rows instead.
+        ProjectStats.rebuild([instance.project_id])
+        ColumnStats.rebuild(project_ids=[instance.project_id])
+        return
+
+    if previous.get('project_id') != instance.project_id:
+        ProjectStats.increment(
+            previous.get('project_id'),
+            **ProjectStats.task_deltas(
+                previous.get('status'), previous.get('priority'), -1)
+        )
+        ProjectStats.increment(
+            instance.project_id,
+            **ProjectStats.task_deltas(instance.status, instance.priority, 1)
+        )
+    elif (previous.get('status'), previous.get('priority')) != (
+            instance.status, instance.priority):
+        deltas = ProjectStats.task_deltas(
+            previous.get('status'), previous.get('priority'), -1)
+        for field, delta in ProjectStats.task_deltas(
+                instance.status, instance.priority, 1).items():
+            deltas[field] = deltas.get(field, 0) + delta
+        ProjectStats.increment(instance.project_id, **deltas)
+
+    if previous.get('column_id') != instance.column_id:
+        ColumnStats.increment(previous.get('column_id'), -1)
+        ColumnStats.increment(instance.column_id, 1)
+
+
+@receiver(post_delete, sender=Task)
+def count_deleted_task(sender, instance, **kwargs):
+    ProjectStats.increment(
+        instance.project_id,
+        **ProjectStats.task_deltas(instance.status, instance.priority, -1)
+    )
+    ColumnStats.increment(instance.column_id, -1)
+
+
+@receiver(post_save, sender=ProjectMember)
+def count_added_member(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ProjectStats.increment(instance.project_id, members_count=1)
+
+
+@receiver(post_delete, sender=ProjectMember)
+def count_removed_member(sender, instance, **kwargs):
+    ProjectStats.increment(instance.project_id, members_count=-1)
+
+
+def _workspace_id(instance):
+    """Workspace of a project-owned row, without loading the project if cached"""
+    project = instance._state.fields_cache.get('project')
+    if project is not None:
+        return project.workspace_id
+    return Project.objects.filter(pk=instance.project_id).values_list(
+        'workspace_id', flat=True).first()
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=Column)
+@receiver(post_delete, sender=Column)
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_project_reads(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(workspace_ids=[_workspace_id(instance)])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_workspace_reads(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(workspace_ids=[instance.workspace_id])
@@ -1,3 +1,682 @@
-from django.test import TestCase
+"""
+Tests for Projects app
+"""
 
-# Create your tests here.
+import asyncio
+import json
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+
+from django.db import connection
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from apps.core import metrics
+from apps.workspaces.models import Workspace, Membership, WorkspaceStats
+from apps.tasks.models import Task, Comment
+from .models import Project, Column, ProjectMember, ProjectStats, ColumnStats
+
+User = get_user_model()
+
+
+class DashboardTestMixin:
+    """One workspace owner with helpers to add projects and tasks"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def create_project(self, name, tasks=3):
+        project = Project.objects.create(
+            workspace=self.workspace,
+            name=name,
+            created_by=self.user
+        )
+        column = Column.objects.create(project=project, name='To Do')
+        ProjectMember.objects.create(
+            project=project, user=self.user, added_by=self.user)
+        statuses = ['todo', 'in-progress', 'review', 'done']
+        for index in range(tasks):
+            Task.objects.create(
+                project=project,
+                column=column,
+                title=f'{name} task {index}',
+                status=statuses[index % len(statuses)],
+                created_by=self.user
+            )
+        return project
+
+
+class DashboardQueryTests(DashboardTestMixin, TestCase):
+    """Dashboard endpoints must run a constant number of queries"""
+
+    def test_dashboard_stats_values(self):
+        """Test the aggregated counters match the stored tasks"""
+        self.create_project('Alpha', tasks=4)
+        self.create_project('Beta', tasks=4)
+
+        response = self.client.get('/api/projects/dashboard/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['stats']
+        self.assertEqual(stats['projects'], 2)
+        self.assertEqual(stats['team_members'], 1)
+        self.assertEqual(stats['active_tasks'], 6)
+        self.assertEqual(stats['completed_tasks'], 2)
+        self.assertEqual(stats['tasks_in_progress'], 2)
+        self.assertEqual(stats['tasks_todo'], 2)
+
+        recent = {p['name']: p for p in response.data['active_projects']}
+        self.assertEqual(recent['Alpha']['tasks_count'], 4)
+        self.assertEqual(recent['Alpha']['members_count'], 1)
+
+    def test_dashboard_counts_projects_without_stats(self):
+        """Test a project missing its stats row (bulk_create, fixtures) is counted"""
+        project = self.create_project('Alpha', tasks=3)
+        ProjectStats.objects.filter(project=project).delete()
+
+        response = self.client.get('/api/projects/dashboard/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recent = response.data['active_projects'][0]
+        self.assertEqual(recent['tasks_count'], 3)
+        self.assertEqual(recent['members_count'], 1)
+        # The totals include it as well
+        self.assertEqual(response.data['stats']['active_tasks'], 3)
+
+        response = self.client.get(f'/api/projects/{project.id}/')
+        self.assertEqual(response.data['tasks_count'], 3)
+
+    def test_dashboard_query_count_is_constant(self):
+        """Test adding projects and tasks does not add queries"""
+        self.create_project('Alpha', tasks=1)
+        # Memberships plus five aggregate/list queries
+        with self.assertNumQueries(6):
+            self.client.get('/api/projects/dashboard/')
+
+        for index in range(5):
+            self.create_project(f'Project {index}', tasks=10)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/projects/dashboard/')
+
+        self.assertEqual(len(response.data['active_projects']), 5)
+
+    def test_active_projects_query_count_is_constant(self):
+        """Test active projects do not run per-row counts"""
+        self.create_project('Alpha', tasks=1)
+        with self.assertNumQueries(6):
+            self.client.get('/api/projects/dashboard/active-projects/')
+
+        for index in range(5):
+            self.create_project(f'Project {index}', tasks=10)
+        with self.assertNumQueries(6):
+            response = self.client.get(
+                '/api/projects/dashboard/active-projects/')
+
+        self.assertEqual(response.data[0]['tasks_count'], 10)
+        self.assertEqual(response.data[0]['columns'][0]['tasks_count'], 10)
+
+
+class ReadCacheTests(DashboardTestMixin, TestCase):
+    """Cached reads are served until a write in the workspace"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # The local-memory cache in tests stands in for a shared one
+        patcher = mock.patch('apps.core.cache.is_shared', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_reads_hit_the_cache(self):
+        """Test a second read only loads the membership map"""
+        self.create_project('Alpha', tasks=2)
+        metrics.reset()
+
+        self.client.get('/api/projects/dashboard/stats/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/projects/dashboard/stats/')
+
+        self.assertEqual(response.data['active_tasks'], 2)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['cache.miss.dashboard-stats'], 1)
+        self.assertEqual(counters['cache.hit.dashboard-stats'], 1)
+
+    def test_writes_invalidate_cached_reads(self):
+        """Test task, column and membership writes are visible at once"""
+        project = self.create_project('Alpha', tasks=1)
+        column = project.columns.get()
+        self.client.get('/api/projects/dashboard/stats/')
+        self.client.get(f'/api/columns/?project={project.id}')
+        self.client.get('/api/workspaces/')
+
+        Task.objects.create(project=project, column=column, title='New')
+        response = self.client.get('/api/projects/dashboard/stats/')
+        self.assertEqual(response.data['active_tasks'], 2)
+
+        Column.objects.create(project=project, name='Done')
+        response = self.client.get(f'/api/columns/?project={project.id}')
+        self.assertEqual(len(response.data), 2)
+
+        Membership.objects.create(
+            workspace=Workspace.objects.create(name='Second', owner=self.user),
+            user=self.user
+        )
+        response = self.client.get('/api/workspaces/')
+        self.assertEqual(len(response.data), 2)
+
+    def test_bulk_writes_invalidate_cached_reads(self):
+        """Test bulk endpoints that skip signals still invalidate"""
+        project = self.create_project('Alpha', tasks=2)
+        self.client.get('/api/projects/dashboard/stats/')
+
+        self.client.post('/api/tasks/bulk_update/', {
+            'task_ids': [str(pk) for pk in Task.objects.values_list(
+                'id', flat=True)],
+            'status': 'done',
+        }, format='json')
+
+        response = self.client.get('/api/projects/dashboard/stats/')
+        self.assertEqual(response.data['completed_tasks'], 2)
+        self.assertEqual(response.data['active_tasks'], 0)
+
+
+class UnsharedReadCacheTests(DashboardTestMixin, TestCase):
+    """A per-process cache cannot see other workers' invalidations"""
+
+    def test_reads_bypass_a_local_cache(self):
+        """Test every read is computed when the cache is not shared"""
+        self.create_project('Alpha', tasks=2)
+        metrics.reset()
+
+        self.client.get('/api/projects/dashboard/stats/')
+        # Memberships plus the three aggregates, as on a miss
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/projects/dashboard/stats/')
+
+        self.assertEqual(response.data['active_tasks'], 2)
+        counters = metrics.snapshot()['counters']
+        self.assertNotIn('cache.hit', counters)
+        self.assertNotIn('cache.miss', counters)
+
+
+class StatsTests(TestCase):
+    """Materialized counters follow task, member and project writes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.project = Project.objects.create(
+            workspace=self.workspace,
+            name='Project',
+            created_by=self.user
+        )
+        self.todo = Column.objects.create(project=self.project, name='To Do')
+        self.done = Column.objects.create(project=self.project, name='Done')
+
+    def stats(self):
+        return ProjectStats.objects.get(project=self.project)
+
+    def test_task_lifecycle_updates_counters(self):
+        """Test create, status change, move and delete keep counts exact"""
+        task = Task.objects.create(
+            project=self.project, column=self.todo, title='Task',
+            priority='high')
+        stats = self.stats()
+        self.assertEqual(stats.tasks_count, 1)
+        self.assertEqual(stats.todo_count, 1)
+        self.assertEqual(stats.high_priority_count, 1)
+        self.assertEqual(ColumnStats.objects.get(column=self.todo).tasks_count, 1)
+
+        task = Task.objects.get(pk=task.pk)
+        task.status = 'done'
+        task.priority = 'low'
+        task.column = self.done
+        task.save()
+        stats = self.stats()
+        self.assertEqual(stats.tasks_count, 1)
+        self.assertEqual(stats.todo_count, 0)
+        self.assertEqual(stats.done_count, 1)
+        self.assertEqual(stats.high_priority_count, 0)
+        self.assertEqual(stats.low_priority_count, 1)
+        self.assertEqual(ColumnStats.objects.get(column=self.todo).tasks_count, 0)
+        self.assertEqual(ColumnStats.objects.get(column=self.done).tasks_count, 1)
+
+        task.delete()
+        stats = self.stats()
+        self.assertEqual(stats.tasks_count, 0)
+        self.assertEqual(stats.done_count, 0)
+        self.assertEqual(ColumnStats.objects.get(column=self.done).tasks_count, 0)
+
+    def test_workspace_counters(self):
+        """Test membership and archive changes adjust workspace counters"""
+        other = User.objects.create_user(
+            email='other@example.com', username='other', password='TestPass123!')
+        membership = Membership.objects.create(
+            workspace=self.workspace, user=other)
+        stats = WorkspaceStats.objects.get(workspace=self.workspace)
+        self.assertEqual(stats.members_count, 2)
+        self.assertEqual(stats.projects_count, 1)
+
+        membership.is_active = False
+        membership.save()
+        self.project.is_archived = True
+        self.project.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.members_count, 1)
+        self.assertEqual(stats.projects_count, 0)
+
+    def test_deleting_project_leaves_no_stats(self):
+        """Test cascaded task deletes do not re-create the project's counters"""
+        Task.objects.create(
+            project=self.project, column=self.todo, title='Task')
+        project_id = self.project.id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.delete()
+
+        self.assertFalse(ProjectStats.objects.filter(project_id=project_id).exists())
+        self.assertFalse(ColumnStats.objects.filter(column_id=self.todo.id).exists())
+
+    def test_rebuild_stats_command(self):
+        """Test the rebuild command repairs drifted counters"""
+        Task.objects.create(
+            project=self.project, column=self.todo, title='Task')
+        ProjectMember.objects.create(project=self.project, user=self.user)
+        ProjectStats.objects.filter(project=self.project).update(
+            tasks_count=42, members_count=0)
+        ColumnStats.objects.all().delete()
+
+        call_command('rebuild_stats', stdout=StringIO())
+
+        stats = self.stats()
+        self.assertEqual(stats.tasks_count, 1)
+        self.assertEqual(stats.members_count, 1)
+        self.assertEqual(ColumnStats.objects.get(column=self.todo).tasks_count, 1)
+
+
+class BoardSnapshotTests(TestCase):
+    """Test the board snapshot endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.project = Project.objects.create(
+            workspace=self.workspace,
+            name='Board',
+            created_by=self.user
+        )
+        self.todo = Column.objects.create(
+            project=self.project, name='To Do', position=0)
+        self.done = Column.objects.create(
+            project=self.project, name='Done', position=1)
+        self.client.force_authenticate(user=self.user)
+
+    def add_tasks(self, count):
+        for index in range(count):
+            task = Task.objects.create(
+                project=self.project,
+                column=self.todo if index % 2 else self.done,
+                title=f'Task {index}',
+                assignee=self.user
+            )
+            Comment.objects.create(task=task, user=self.user, content='Hi')
+
+    def test_board_snapshot(self):
+        """Test columns carry slim cards and users are deduplicated"""
+        self.add_tasks(3)
+
+        response = self.client.get(f'/api/projects/{self.project.id}/board/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        columns = response.data['columns']
+        self.assertEqual([c['name'] for c in columns], ['To Do', 'Done'])
+        self.assertEqual(len(columns[0]['tasks']), 1)
+        self.assertEqual(len(columns[1]['tasks']), 2)
+        card = columns[1]['tasks'][0]
+        self.assertEqual(card['comments_count'], 1)
+        self.assertEqual(card['attachments_count'], 0)
+        self.assertEqual(card['assignee_id'], self.user.id)
+        self.assertEqual(list(response.data['users']), [self.user.id])
+        self.assertEqual(response.data['unassigned'], [])
+
+    def test_cards_outside_the_columns_are_unassigned(self):
+        """Test a task filed under another project's column is still listed"""
+        other = Project.objects.create(
+            workspace=self.workspace, name='Other', created_by=self.user)
+        stray = Task.objects.create(
+            project=self.project,
+            column=Column.objects.create(project=other, name='Elsewhere'),
+            title='Stray'
+        )
+
+        response = self.client.get(f'/api/projects/{self.project.id}/board/')
+
+        self.assertEqual(
+            [card['id'] for card in response.data['unassigned']], [stray.id])
+        self.assertEqual(
+            sum(len(column['tasks']) for column in response.data['columns']), 0)
+
+    def test_board_query_count_is_constant(self):
+        """Test the board costs four queries however many tasks it has"""
+        self.add_tasks(1)
+        url = f'/api/projects/{self.project.id}/board/'
+        # Memberships, project, columns, cards
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        self.add_tasks(20)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+
+class ColumnReorderTests(TestCase):
+    """Test column reordering by rank"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.project = Project.objects.create(
+            workspace=self.workspace,
+            name='Board',
+            created_by=self.user
+        )
+        self.columns = [
+            Column.objects.create(project=self.project, name=name)
+            for name in ('A', 'B', 'C')
+        ]
+        self.client.force_authenticate(user=self.user)
+
+    def names(self):
+        return list(Column.project_siblings(self.project.id).values_list(
+            'name', flat=True))
+
+    def test_new_columns_append(self):
+        """Test columns are created at the end of the board"""
+        self.assertEqual(self.names(), ['A', 'B', 'C'])
+
+    def test_position_past_the_end_appends(self):
+        """Test an out-of-range position places the column last"""
+        response = self.client.post('/api/columns/', {
+            'project': str(self.project.id), 'name': 'D', 'position': 99
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.names(), ['A', 'B', 'C', 'D'])
+        ranks = list(Column.project_siblings(self.project.id).values_list(
+            'rank', flat=True))
+        self.assertEqual(len(set(ranks)), 4)
+
+    def test_reorder_full_list(self):
+        """Test a full ordered id list is applied in one statement"""
+        a, b, c = self.columns
+        # Memberships, scoped id check, bulk update
+        with self.assertNumQueries(3):
+            response = self.client.post('/api/columns/reorder/', {
+                'column_ids': [c.id, a.id, b.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(), ['C', 'A', 'B'])
+
+    def test_reorder_single_column(self):
+        """Test one column can move between neighbours"""
+        a, b, c = self.columns
+        response = self.client.post('/api/columns/reorder/', {
+            'column_id': a.id, 'before_id': b.id, 'after_id': c.id
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(), ['B', 'A', 'C'])
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class BoardEventTests(TestCase):
+    """Test board mutations are pushed to the board group after commit"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.project = Project.objects.create(
+            workspace=self.workspace,
+            name='Board',
+            created_by=self.user
+        )
+        self.todo = Column.objects.create(project=self.project, name='To Do')
+        self.done = Column.objects.create(project=self.project, name='Done')
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+
+    def listen(self, action):
+        """Run the request with commit callbacks and collect board frames"""
+        layer = get_channel_layer()
+
+        async def scenario():
+            channel = await layer.new_channel()
+            await layer.group_add(f'board_{self.project.id}', channel)
+            await sync_to_async(self.commit)(action)
+            frames = []
+            while True:
+                try:
+                    event = await asyncio.wait_for(layer.receive(channel), 0.1)
+                except asyncio.TimeoutError:
+                    return frames
+                self.assertEqual(event['topic'], f'board:{self.project.id}')
+                frames.append(json.loads(event['frame']))
+
+        return async_to_sync(scenario)()
+
+    def commit(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.response = action()
+
+    @mock.patch('apps.projects.events.is_shared', return_value=True)
+    def test_task_lifecycle_events_are_numbered(self, shared):
+        """Test create, move and delete publish consecutive events"""
+        frames = self.listen(lambda: self.client.post('/api/tasks/', {
+            'project': self.project.id, 'column': self.todo.id,
+            'title': 'Card'}, format='json'))
+        self.assertEqual(self.response.status_code, status.HTTP_201_CREATED)
+        task = Task.objects.get()
+
+        frames += self.listen(lambda: self.client.post(
+            f'/api/tasks/{task.id}/move/',
+            {'column_id': str(self.done.id)}, format='json'))
+        task.refresh_from_db()
+        frames += self.listen(lambda: self.client.delete(f'/api/tasks/{task.id}/'))
+
+        self.assertEqual(
+            [(frame['event'], frame['seq']) for frame in frames],
+            [('task.created', 1), ('task.moved', 2), ('task.deleted', 3)])
+        self.assertEqual(frames[0]['data']['task']['title'], 'Card')
+        self.assertEqual(frames[1]['data'], {
+            'task_id': str(task.id),
+            'from_column_id': str(self.todo.id),
+            'column_id': str(self.done.id),
+            'rank': task.rank,
+        })
+
+    def test_column_reorder_event(self):
+        """Test reordering columns publishes the new ranks"""
+        frames = self.listen(lambda: self.client.post('/api/columns/reorder/', {
+            'column_ids': [self.done.id, self.todo.id]}, format='json'))
+
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0]['event'], 'column.reordered')
+        # Per-worker counters would skip and repeat numbers
+        self.assertNotIn('seq', frames[0])
+        self.assertEqual(
+            [column['id'] for column in frames[0]['data']['columns']],
+            [str(self.done.id), str(self.todo.id)])
+
+    def test_rejected_reorder_publishes_nothing(self):
+        """Test a refused change sends no event"""
+        frames = self.listen(lambda: self.client.post(
+            '/api/columns/reorder/', {
+                'column_id': self.todo.id, 'before_id': self.todo.id,
+                'after_id': 999999},
+            format='json'))
+
+        self.assertEqual(self.response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(frames, [])
+
+
+class TenancyScopingTests(TestCase):
+    """Test list endpoints scope by membership without join fan-out"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Mine', owner=self.other)
+        self.foreign = Workspace.objects.create(
+            name='Theirs', owner=self.other)
+        for workspace in (self.workspace, self.foreign):
+            Membership.objects.create(workspace=workspace, user=self.other)
+        Membership.objects.create(workspace=self.workspace, user=self.user)
+        for workspace in (self.workspace, self.foreign):
+            project = Project.objects.create(
+                workspace=workspace, name=workspace.name)
+            Column.objects.create(project=project, name='To Do')
+        self.client.force_authenticate(user=self.user)
+
+    def test_lists_only_member_workspaces(self):
+        """Test each object appears once and foreign ones are hidden"""
+        for url in ('/api/workspaces/', '/api/projects/', '/api/columns/'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data), 1, url)
+            for query in queries.captured_queries:
+                self.assertNotIn('DISTINCT', query['sql'])
+
+    def test_inactive_membership_hides_workspace(self):
+        """Test deactivated members lose access"""
+        Membership.objects.filter(user=self.user).update(is_active=False)
+
+        response = self.client.get('/api/projects/')
+
+        self.assertEqual(len(response.data), 0)
+
+    def test_workspace_list_loads_memberships_once(self):
+        """Test roles come from one membership query however many rows"""
+        for index in range(5):
+            workspace = Workspace.objects.create(
+                name=f'Extra {index}', owner=self.other)
+            Membership.objects.create(
+                workspace=workspace, user=self.user, role='admin')
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/workspaces/')
+
+        self.assertEqual(len(response.data), 6)
+        roles = {item['name']: item['user_role'] for item in response.data}
+        self.assertEqual(roles['Mine'], 'member')
+        self.assertEqual(roles['Extra 0'], 'admin')
+
+    def test_add_project_member_checks(self):
+        """Test adding a project member validates the user in one query"""
+        project = Project.objects.get(workspace=self.workspace)
+        url = f'/api/projects/{project.id}/add_member/'
+
+        response = self.client.post(url, {'user_id': 999999})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('user_id', response.data)
+
+        outsider = User.objects.create_user(
+            email='outsider@example.com',
+            username='outsider',
+            password='TestPass123!'
+        )
+        response = self.client.post(url, {'user_id': outsider.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(url, {'user_id': self.other.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {'user_id': self.other.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# Run tests with: python manage.py test apps.projects
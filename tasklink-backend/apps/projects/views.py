@@ -2,10 +2,15 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Exists, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from collections import defaultdict
 
-from .models import Project, Column, ProjectMember
+from .events import publish_board_event
+from .models import Project, Column, ProjectMember, ProjectStats
 from .serializers import (
     ProjectSerializer,
     ProjectCreateSerializer,
@@ -14,16 +19,22 @@ from .serializers import (
     ColumnCreateSerializer,
     ColumnUpdateSerializer,
     ProjectMemberSerializer,
-    ProjectMemberAddSerializer
+    ProjectMemberAddSerializer,
+    project_members_count,
+    project_tasks_count
 )
 from apps.workspaces.models import Membership
+from apps.workspaces.mixins import WorkspaceScopedMixin, cached_read
+from apps.core.cache import invalidate
+from apps.core.ranking import rank_sequence
 from apps.activity.models import ActivityLog
-from apps.tasks.models import Task
+from apps.tasks.models import Task, Comment
+from apps.files.models import FileAttachment
 
 User = get_user_model()
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(WorkspaceScopedMixin, viewsets.ModelViewSet):
     """ViewSet for project CRUD operations"""
     permission_classes = [IsAuthenticated]
 
@@ -38,10 +49,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             workspace_id = self.request.query_params.get('workspace')
         
         # Get projects where user is a workspace member
-        queryset = Project.objects.filter(
-            workspace__memberships__user=user,
-            workspace__memberships__is_active=True
-        )
+        queryset = self.scope_to_workspaces(Project.objects.all())
 
         if workspace_id:
             queryset = queryset.filter(workspace_id=workspace_id)
@@ -52,7 +60,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if not show_archived:
             queryset = queryset.filter(is_archived=False)
 
-        return queryset.distinct().select_related('workspace', 'created_by').prefetch_related('columns', 'project_members__user')
+        # The board snapshot loads its own columns and tasks
+        if self.action == 'board':
+            return queryset
+
+        columns = Column.objects.select_related('stats')
+        return queryset.select_related('workspace', 'created_by', 'stats').prefetch_related(Prefetch('columns', queryset=columns), 'project_members__user')
 
 
     def get_serializer_class(self):
@@ -90,7 +103,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='project',
             entity_id=project.id,
             description=f"Created project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
@@ -108,7 +121,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='project',
             entity_id=project.id,
             description=f"Updated project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
@@ -120,7 +133,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='project',
             entity_id=str(instance.id),
             description=f"Deleted project '{instance.name}'",
-            workspace=instance.workspace
+            workspace=instance.workspace_id
         )
 
         instance.delete()
@@ -138,7 +151,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='project',
             entity_id=project.id,
             description=f"Archived project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
@@ -156,7 +169,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='project',
             entity_id=project.id,
             description=f"Restored project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
@@ -167,9 +180,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
 
         if request.method == 'GET':
-            columns = project.columns.all().order_by('position')
-            serializer = ColumnSerializer(columns, many=True)
-            return Response(serializer.data)
+            columns = project.columns.select_related(
+                'stats').order_by('rank', 'id')
+            return Response(self.cached_data(
+                'project-columns',
+                lambda: ColumnSerializer(columns, many=True).data,
+                workspace_ids=[project.workspace_id]
+            ))
 
         serializer = ColumnCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -182,7 +199,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='column',
             entity_id=column.id,
             description=f"Added column '{column.name}' to project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
@@ -202,12 +219,73 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='column',
             entity_id=column.id,
             description=f"Added column '{column.name}' to project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
         return Response(ColumnSerializer(column).data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['get'])
+    def board(self, request, workspace_pk=None, pk=None):
+        """
+        Whole Kanban board in three queries (plus the cached memberships):
+        project, columns and task cards. Cards whose column is not one of
+        the project's are listed under ``unassigned`` instead of being lost.
+        """
+        project = self.get_object()
+
+        columns = list(
+            project.columns.order_by('rank', 'id').values(
+                'id', 'name', 'position', 'rank', 'color')
+        )
+
+        comments = Comment.objects.filter(
+            task=OuterRef('pk')
+        ).order_by().values('task').annotate(total=Count('id')).values('total')
+        attachments = FileAttachment.objects.filter(
+            task=OuterRef('pk')
+        ).order_by().values('task').annotate(total=Count('id')).values('total')
+
+        cards = Task.objects.filter(project=project).annotate(
+            comments_count=Coalesce(Subquery(comments), 0),
+            attachments_count=Coalesce(Subquery(attachments), 0)
+        ).values(
+            'id', 'column_id', 'title', 'priority', 'status', 'rank',
+            'assignee_id', 'due_date', 'comments_count', 'attachments_count',
+            'assignee__username', 'assignee__full_name', 'assignee__avatar'
+        )
+
+        avatar_storage = User._meta.get_field('avatar').storage
+        users = {}
+        tasks_by_column = {column['id']: [] for column in columns}
+        for card in cards:
+            username = card.pop('assignee__username')
+            full_name = card.pop('assignee__full_name')
+            avatar = card.pop('assignee__avatar')
+            if card['assignee_id'] is not None and card['assignee_id'] not in users:
+                users[card['assignee_id']] = {
+                    'id': card['assignee_id'],
+                    'username': username,
+                    'full_name': full_name or username,
+                    'avatar': avatar_storage.url(avatar) if avatar else None,
+                }
+            tasks_by_column.setdefault(card['column_id'], []).append(card)
+
+        for column in columns:
+            column['tasks'] = tasks_by_column.pop(column['id'])
+        unassigned = [card for cards in tasks_by_column.values() for card in cards]
+
+        return Response({
+            'project': {
+                'id': project.id,
+                'name': project.name,
+                'workspace': project.workspace_id,
+            },
+            'columns': columns,
+            'unassigned': unassigned,
+            'users': users,
+        })
+
     @action(detail=True, methods=['get'])
     def members(self, request, pk=None):
         project = self.get_object()
@@ -222,20 +300,31 @@ class ProjectViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         user_id = serializer.validated_data['user_id']
-        user = User.objects.get(id=user_id)
+
+        # Load the user with both membership checks in a single query
+        user = User.objects.filter(id=user_id).annotate(
+            is_workspace_member=Exists(Membership.objects.filter(
+                workspace_id=project.workspace_id,
+                user=OuterRef('pk'),
+                is_active=True
+            )),
+            is_project_member=Exists(ProjectMember.objects.filter(
+                project=project, user=OuterRef('pk')
+            ))
+        ).first()
+        if user is None:
+            return Response({
+                'user_id': ['User not found.']
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         # Check if user is a workspace member
-        if not Membership.objects.filter(
-            workspace=project.workspace,
-            user=user,
-            is_active=True
-        ).exists():
+        if not user.is_workspace_member:
             return Response({
                 'error': 'User is not a member of the workspace'
             }, status=status.HTTP_400_BAD_REQUEST)
 
         # Check if already a project member
-        if ProjectMember.objects.filter(project=project, user=user).exists():
+        if user.is_project_member:
             return Response({
                 'error': 'User is already a project member'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -253,7 +342,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             entity_type='project',
             entity_id=project.id,
             description=f"Added {user.email} to project '{project.name}'",
-            workspace=project.workspace,
+            workspace=project.workspace_id,
             project=project
         )
 
@@ -279,7 +368,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 entity_type='project',
                 entity_id=project.id,
                 description=f"Removed {user_email} from project '{project.name}'",
-                workspace=project.workspace,
+                workspace=project.workspace_id,
                 project=project
             )
 
@@ -289,74 +378,89 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 'error': 'Project member not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
+    def _dashboard_projects(self, user):
+        """Non-archived projects in the user's workspaces, without a join fan-out"""
+        return Project.objects.filter(
+            workspace_id__in=self.member_workspace_ids(),
+            is_archived=False
+        )
+
+    def _dashboard_stats(self, user, projects):
+        """Dashboard counters computed with a fixed number of aggregate queries"""
+        member_workspaces = self.member_workspace_ids()
+
+        # Sum the materialized per-project counters instead of scanning tasks
+        task_stats = Project.objects.filter(
+            workspace_id__in=member_workspaces
+        ).aggregate(
+            tasks_todo=Coalesce(Sum('stats__todo_count'), 0),
+            tasks_in_progress=Coalesce(Sum('stats__in_progress_count'), 0),
+            tasks_review=Coalesce(Sum('stats__review_count'), 0),
+            completed_tasks=Coalesce(Sum('stats__done_count'), 0),
+            missing_stats=Count('id', filter=Q(stats__isnull=True)),
+        )
+        if task_stats.pop('missing_stats'):
+            # Projects without a stats row yet (legacy data, or a row being
+            # rebuilt after commit) are counted from their tasks
+            live = Task.objects.filter(
+                project__workspace_id__in=member_workspaces,
+                project__stats__isnull=True
+            ).aggregate(
+                tasks_todo=Count('id', filter=Q(status='todo')),
+                tasks_in_progress=Count('id', filter=Q(status='in-progress')),
+                tasks_review=Count('id', filter=Q(status='review')),
+                completed_tasks=Count('id', filter=Q(status='done')),
+            )
+            for field, count in live.items():
+                task_stats[field] += count
+
+        # Team members: active members of workspaces that have visible projects
+        team_members = Membership.objects.filter(
+            is_active=True,
+            workspace_id__in=projects.values('workspace_id')
+        ).aggregate(total=Count('user', distinct=True))['total']
+
+        return {
+            'active_tasks': (task_stats['tasks_todo'] +
+                             task_stats['tasks_in_progress'] +
+                             task_stats['tasks_review']),
+            'team_members': team_members,
+            'projects': projects.count(),
+            'completed_tasks': task_stats['completed_tasks'],
+            'tasks_in_progress': task_stats['tasks_in_progress'],
+            'tasks_todo': task_stats['tasks_todo'],
+        }
+
     @action(detail=False, methods=['get'])
+    @cached_read('dashboard')
     def dashboard(self, request):
         """Get dashboard stats for the current user"""
         user = request.user
 
         # Get projects the user is part of
-        projects = Project.objects.filter(
-            workspace__memberships__user=user,
-            workspace__memberships__is_active=True,
-            is_archived=False
-        ).distinct()
-
-        # Get all tasks from user's projects
-        total_tasks = Task.objects.filter(
-            project__workspace__memberships__user=user,
-            project__workspace__memberships__is_active=True
-        )
-
-        # Calculate task statistics
-        active_tasks = total_tasks.filter(
-            status__in=['todo', 'in-progress', 'review']
-        ).count()
-        
-        completed_tasks = total_tasks.filter(status='done').count()
-        
-        # NEW: Get tasks by status for dashboard stats
-        tasks_in_progress = total_tasks.filter(status='in-progress').count()
-        tasks_todo = total_tasks.filter(status='todo').count()
-
-        # Get team members count (users in same workspaces)
-        team_members = User.objects.filter(
-            memberships__workspace__projects__in=projects,
-            memberships__is_active=True
-        ).distinct().count()
+        projects = self._dashboard_projects(user)
+        stats = self._dashboard_stats(user, projects)
 
-        # Get recent projects (last 5)
-        recent_projects = projects.order_by('-created_at')[:5]
+        # Get recent projects (last 5) with their counters in the same query
+        recent_projects = projects.select_related(
+            'stats').order_by('-created_at')[:5]
 
         # Get recent activity
-        from apps.activity.models import ActivityLog
         recent_activities = ActivityLog.objects.filter(
             user=user
-        ).select_related('user', 'workspace', 'project').order_by('-created_at')[:5]
+        ).select_related('user').order_by('-created_at')[:5]
 
         # Format response to match frontend dashboard
         dashboard_data = {
-            'stats': {
-                'active_tasks': active_tasks,  # All non-completed tasks
-                'team_members': team_members,
-                'projects': projects.count(),
-                'completed_tasks': completed_tasks,
-                # Add these for percentage changes (you can calculate real changes later)
-                # 'active_tasks_change': '+12%',
-                # 'team_members_change': '+2',
-                # 'projects_change': '+3',
-                # 'completed_change': '+18%',
-                # Additional stats for more detailed dashboard
-                'tasks_in_progress': tasks_in_progress,
-                'tasks_todo': tasks_todo,
-            },
+            'stats': stats,
             'active_projects': [
                 {
                     'id': str(project.id),
                     'name': project.name,
                     'description': project.description,
                     'workspace': str(project.workspace_id),
-                    'members_count': project.project_members.count(),
-                    'tasks_count': project.tasks.count(),
+                    'members_count': project_members_count(project),
+                    'tasks_count': project_tasks_count(project),
                     'created_at': project.created_at,
                     'updated_at': project.updated_at,
                 }
@@ -375,84 +479,58 @@ class ProjectViewSet(viewsets.ModelViewSet):
         }
 
         return Response(dashboard_data)
-    
+
     @action(detail=False, methods=['get'], url_path='dashboard/stats')
+    @cached_read('dashboard-stats')
     def dashboard_stats(self, request):
         """Get only dashboard statistics"""
         user = request.user
-
-        # Get projects the user is part of
-        projects = Project.objects.filter(
-            workspace__memberships__user=user,
-            workspace__memberships__is_active=True,
-            is_archived=False
-        ).distinct()
-
-        # Get all tasks from user's projects
-        total_tasks = Task.objects.filter(
-            project__workspace__memberships__user=user,
-            project__workspace__memberships__is_active=True
-        )
-
-        # Calculate statistics
-        active_tasks = total_tasks.filter(
-            status__in=['todo', 'in-progress', 'review']
-        ).count()
-        
-        completed_tasks = total_tasks.filter(status='done').count()
-        
-        # Get team members count
-        team_members = User.objects.filter(
-            memberships__workspace__projects__in=projects,
-            memberships__is_active=True
-        ).distinct().count()
+        projects = self._dashboard_projects(user)
+        stats = self._dashboard_stats(user, projects)
 
         return Response({
-            'active_tasks': active_tasks,
-            'team_members': team_members,
-            'projects': projects.count(),
-            'completed_tasks': completed_tasks,
-            # 'active_tasks_change': '+12%',
-            # 'team_members_change': '+2',
-            # 'projects_change': '+3',
-            # 'completed_change': '+18%',
+            'active_tasks': stats['active_tasks'],
+            'team_members': stats['team_members'],
+            'projects': stats['projects'],
+            'completed_tasks': stats['completed_tasks'],
         })
 
     @action(detail=False, methods=['get'], url_path='dashboard/active-projects')
+    @cached_read('dashboard-active-projects')
     def dashboard_active_projects(self, request):
         """Get active projects for dashboard"""
         user = request.user
-        
-        projects = Project.objects.filter(
-            workspace__memberships__user=user,
-            workspace__memberships__is_active=True,
-            is_archived=False
-        ).annotate(
-            members_count=Count('project_members'),
-            tasks_count=Count('tasks')
+
+        columns = Column.objects.select_related('stats')
+        projects = self._dashboard_projects(user).select_related(
+            'created_by', 'stats'
+        ).prefetch_related(
+            Prefetch('columns', queryset=columns),
+            'project_members__user',
+            'project_members__added_by'
         ).order_by('-created_at')[:5]  # Last 5 projects
-        
-        from .serializers import ProjectSerializer
+
         serializer = ProjectSerializer(projects, many=True)
         return Response(serializer.data)
 
 
-class ColumnViewSet(viewsets.ModelViewSet):
+class ColumnViewSet(WorkspaceScopedMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    workspace_field = 'project__workspace'
 
     def get_queryset(self):
-        user = self.request.user
         project_id = self.request.query_params.get('project')
 
-        queryset = Column.objects.filter(
-            project__workspace__memberships__user=user,
-            project__workspace__memberships__is_active=True
-        )
+        queryset = self.scope_to_workspaces(Column.objects.all())
 
         if project_id:
             queryset = queryset.filter(project_id=project_id)
 
-        return queryset.distinct().order_by('position')
+        return queryset.order_by('rank', 'id')
+
+    @cached_read('columns')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -469,8 +547,8 @@ class ColumnViewSet(viewsets.ModelViewSet):
             entity_type='column',
             entity_id=column.id,
             description=f"Created column '{column.name}'",
-            workspace=column.project.workspace,
-            project=column.project
+            workspace=column.project.workspace_id,
+            project=column.project_id
         )
 
     def perform_update(self, serializer):
@@ -482,8 +560,8 @@ class ColumnViewSet(viewsets.ModelViewSet):
             entity_type='column',
             entity_id=column.id,
             description=f"Updated column '{column.name}'",
-            workspace=column.project.workspace,
-            project=column.project
+            workspace=column.project.workspace_id,
+            project=column.project_id
         )
 
     def perform_destroy(self, instance):
@@ -493,17 +571,68 @@ class ColumnViewSet(viewsets.ModelViewSet):
             entity_type='column',
             entity_id=instance.id,
             description=f"Deleted column '{instance.name}'",
-            workspace=instance.project.workspace,
-            project=instance.project
+            workspace=instance.project.workspace_id,
+            project=instance.project_id
         )
 
         instance.delete()
 
     @action(detail=False, methods=['post'])
     def reorder(self, request):
-        column_ids = request.data.get('column_ids', [])
+        """
+        Reorder columns either by moving one column between its new
+        neighbours (column_id + before_id/after_id, one UPDATE) or by
+        passing the full ordered column_ids list (one bulk UPDATE).
+        """
+        column_id = request.data.get('column_id')
+        if column_id is not None:
+            column = get_object_or_404(
+                self.get_queryset().select_related('project'), id=column_id)
+            try:
+                rank = Column.rank_between_columns(
+                    column.project_id,
+                    request.data.get('before_id'),
+                    request.data.get('after_id'),
+                    exclude=column.pk
+                )
+            except LookupError:
+                return Response({
+                    'error': 'Neighbour column not found in the project'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            Column.objects.filter(pk=column.pk).update(
+                rank=rank, updated_at=timezone.now())
+            invalidate(workspace_ids=[column.project.workspace_id])
+            publish_board_event(column.project_id, 'column.reordered', {
+                'columns': [{'id': str(column.pk), 'rank': rank}]
+            })
+            return Response({'message': 'Columns reordered successfully'})
+
+        column_ids = [str(pk) for pk in request.data.get('column_ids', [])]
+        columns = {
+            str(column.pk): column
+            for column in self.get_queryset().select_related(
+                'project').filter(id__in=column_ids)
+        }
 
-        for index, column_id in enumerate(column_ids):
-            Column.objects.filter(id=column_id).update(position=index)
+        reordered = []
+        for index, (pk, rank) in enumerate(zip(column_ids, rank_sequence(len(column_ids)))):
+            column = columns.get(pk)
+            if column is not None:
+                column.position = index
+                column.rank = rank
+                reordered.append(column)
+        Column.objects.bulk_update(reordered, ['position', 'rank'])
+        # bulk_update() sends no post_save, so invalidate cached reads here
+        invalidate(workspace_ids={
+            column.project.workspace_id for column in reordered})
+        by_project = defaultdict(list)
+        for column in reordered:
+            by_project[column.project_id].append({
+                'id': str(column.pk),
+                'rank': column.rank,
+                'position': column.position,
+            })
+        for project_id, moved in by_project.items():
+            publish_board_event(project_id, 'column.reordered', {'columns': moved})
 
         return Response({'message': 'Columns reordered successfully'})
\ No newline at end of file
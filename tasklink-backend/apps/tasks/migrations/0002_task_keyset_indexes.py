@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_populate_stats'),
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['position', '-created_at', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['column', 'position', '-created_at', 'id'], name='tasks_column_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'position', '-created_at', 'id'], name='tasks_project_order_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.core.ranking import rank_sequence
+
+
+def assign_ranks(apps, schema_editor):
+    """Rank existing tasks in the order they were displayed by position"""
+    Task = apps.get_model('tasks', 'Task')
+
+    def flush(ids):
+        rows = [Task(id=pk, rank=rank)
+                for pk, rank in zip(ids, rank_sequence(len(ids)))]
+        Task.objects.bulk_update(rows, ['rank'], batch_size=500)
+
+    current, ids = None, []
+    tasks = Task.objects.order_by(
+        'column_id', 'position', '-created_at', 'id'
+    ).values_list('id', 'column_id')
+    for pk, column_id in tasks.iterator(chunk_size=2000):
+        if column_id != current and ids:
+            flush(ids)
+            ids = []
+        current = column_id
+        ids.append(pk)
+    if ids:
+        flush(ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_column_rank'),
+        ('tasks', '0002_task_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['rank', '-created_at', 'id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_column_order_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_project_order_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.RunPython(assign_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['column', 'rank', '-created_at', 'id'], name='tasks_column_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'rank', '-created_at', 'id'], name='tasks_project_rank_idx'),
+        ),
+    ]
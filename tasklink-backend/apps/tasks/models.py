@@ -2,6 +2,9 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+from apps.core.ranking import (
+    REBALANCE_LENGTH, rank_at, rank_between_rows, rebalance)
+
 
 class Task(models.Model):
     """Task model for Kanban board"""
@@ -50,6 +53,8 @@ class Task(models.Model):
     status = models.CharField(
         max_length=20, choices=STATUS_CHOICES, default='todo')
     position = models.IntegerField(default=0)
+    # Lexicographic sort key within the column, see apps.core.ranking
+    rank = models.CharField(max_length=128, default='', blank=True)
     due_date = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -57,7 +62,7 @@ class Task(models.Model):
 
     class Meta:
         db_table = 'tasks'
-        ordering = ['position', '-created_at']
+        ordering = ['rank', '-created_at', 'id']
         indexes = [
             models.Index(fields=['project']),
             models.Index(fields=['column']),
@@ -65,11 +70,56 @@ class Task(models.Model):
             models.Index(fields=['priority']),
             models.Index(fields=['status']),
             models.Index(fields=['due_date']),
+            # Keyset pagination keys for board and project task lists
+            models.Index(fields=['column', 'rank', '-created_at', 'id'],
+                         name='tasks_column_rank_idx'),
+            models.Index(fields=['project', 'rank', '-created_at', 'id'],
+                         name='tasks_project_rank_idx'),
         ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self.rank and self.column_id:
+            # New tasks go to the top of their column
+            self.rank = Task.rank_in_column(self.column_id, 0, exclude=self.pk)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def column_siblings(cls, column_id, exclude=None):
+        siblings = cls.objects.filter(column_id=column_id)
+        if exclude is not None:
+            siblings = siblings.exclude(pk=exclude)
+        return siblings.order_by('rank', '-created_at', 'id')
+
+    @classmethod
+    def rank_in_column(cls, column_id, position, exclude=None):
+        """Rank placing a task at index `position` of a column"""
+        siblings = cls.column_siblings(column_id, exclude)
+        rank = rank_at(siblings, position)
+        if len(rank) > REBALANCE_LENGTH:
+            rebalance(siblings)
+            rank = rank_at(siblings, position)
+        return rank
+
+    @classmethod
+    def rank_between_tasks(cls, column_id, before_id=None, after_id=None, exclude=None):
+        """Rank placing a task between two neighbours of a column"""
+        siblings = cls.column_siblings(column_id, exclude)
+        rank = rank_between_rows(siblings, before_id, after_id)
+        if rank is None or len(rank) > REBALANCE_LENGTH:
+            rebalance(siblings)
+            rank = rank_between_rows(siblings, before_id, after_id)
+        return rank
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted values so counters can be adjusted by diff
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Comment(models.Model):
     """Comments on tasks"""
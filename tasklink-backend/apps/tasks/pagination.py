@@ -0,0 +1,8 @@
+from apps.core.pagination import KeysetPagination
+
+
+class TaskCursorPagination(KeysetPagination):
+    """Opt-in keyset pagination matching the Task default ordering"""
+    ordering = ('rank', '-created_at', 'id')
+    page_size = 100
+    opt_in = True
@@ -40,11 +40,11 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = [
             'id', 'project', 'column', 'title', 'description', 'assignee',
-            'created_by', 'priority', 'status', 'position', 'due_date',
+            'created_by', 'priority', 'status', 'position', 'rank', 'due_date',
             'completed_at', 'comments', 'labels', 'comments_count',
             'attachments_count', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_by', 'rank', 'created_at', 'updated_at']
 
     def get_comments_count(self, obj):
         return obj.comments.count()
@@ -78,6 +78,9 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         created_by = request.user if request else None
         created_at = validated_data.get('created_at')
+        if validated_data.get('position') and validated_data.get('column'):
+            validated_data['rank'] = Task.rank_in_column(
+                validated_data['column'].id, validated_data['position'])
         task = Task.objects.create(
             assignee_id=assignee_id,
             **validated_data
@@ -112,6 +115,15 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
         if assignee_id is not None:
             instance.assignee_id = assignee_id
 
+        column = validated_data.get('column')
+        if 'position' in validated_data or (
+                column is not None and column.id != instance.column_id):
+            instance.rank = Task.rank_in_column(
+                column.id if column is not None else instance.column_id,
+                validated_data.get('position', 0),
+                exclude=instance.pk
+            )
+
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
@@ -121,7 +133,10 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
 
 class TaskMoveSerializer(serializers.Serializer):
     column_id = serializers.IntegerField()
-    position = serializers.IntegerField(required=False)
+    position = serializers.IntegerField(required=False, min_value=0)
+    # Neighbours in the target column: the task directly above and below
+    before_id = serializers.UUIDField(required=False)
+    after_id = serializers.UUIDField(required=False)
 
     def validate_column_id(self, value):
         from apps.projects.models import Column
@@ -147,6 +162,20 @@ class TaskBulkUpdateSerializer(serializers.Serializer):
         required=False
     )
 
+    def validate_assignee_id(self, value):
+        if value:
+            from django.contrib.auth import get_user_model
+            User = get_user_model()
+            if not User.objects.filter(id=value).exists():
+                raise serializers.ValidationError("User not found.")
+        return value
+
+    def validate(self, attrs):
+        if not {'assignee_id', 'priority', 'status'} & attrs.keys():
+            raise serializers.ValidationError(
+                "Provide at least one of assignee_id, priority or status.")
+        return attrs
+
 
 class TaskExportSerializer(serializers.Serializer):
     project_id = serializers.UUIDField(required=False)
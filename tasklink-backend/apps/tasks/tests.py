@@ -1,3 +1,323 @@
+"""
+Tests for Tasks app
+"""
+
+import csv
+import json
+from io import StringIO
+
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from apps.workspaces.models import Workspace, Membership
+from apps.core.ranking import rank_between, rank_sequence
+from apps.projects.models import Project, Column
+from apps.projects.models import ProjectStats
+from apps.activity.models import ActivityLog
+from apps.notifications.models import Notification
+from .models import Task
+
+User = get_user_model()
+
+
+class TaskTestMixin:
+    """Common fixtures: one member, one project with two columns"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='TestPass123!'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Test Workspace',
+            owner=self.user
+        )
+        Membership.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            role='owner'
+        )
+        self.project = Project.objects.create(
+            workspace=self.workspace,
+            name='Project',
+            created_by=self.user
+        )
+        self.todo = Column.objects.create(
+            project=self.project, name='To Do', position=0)
+        self.done = Column.objects.create(
+            project=self.project, name='Done', position=1)
+        self.client.force_authenticate(user=self.user)
+
+    def create_tasks(self, count, column=None, prefix='Task', **fields):
+        return [
+            Task.objects.create(
+                project=self.project,
+                column=column or self.todo,
+                title=f'{prefix} {index}',
+                created_by=self.user,
+                **fields
+            )
+            for index in range(count)
+        ]
+
+
+class TaskPaginationTests(TaskTestMixin, TestCase):
+    """Test opt-in keyset pagination of task lists"""
+
+    def test_list_is_unpaginated_by_default(self):
+        """Test plain list requests keep returning every task"""
+        self.create_tasks(3)
+
+        response = self.client.get('/api/tasks/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_cursor_walk_returns_each_task_once(self):
+        """Test following next links visits every task in order"""
+        self.create_tasks(7)
+        expected = [str(pk) for pk in Task.objects.values_list('id', flat=True)]
+
+        seen = []
+        url = '/api/tasks/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_nested_route_is_paginated(self):
+        """Test the nested column route supports the cursor"""
+        self.create_tasks(3, column=self.todo)
+        self.create_tasks(2, column=self.done)
+
+        response = self.client.get(
+            f'/api/workspaces/{self.workspace.id}/projects/{self.project.id}'
+            f'/columns/{self.done.id}/tasks/?page_size=1'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get('/api/tasks/?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RankingTests(TestCase):
+    """Test lexicographic rank generation"""
+
+    def test_rank_between_orders_strictly(self):
+        """Test repeated inserts into the same gap stay ordered"""
+        low, high = rank_between(), None
+        ranks = [low]
+        for _ in range(200):
+            high = rank_between(low, high)
+            ranks.append(high)
+        for _ in range(200):
+            ranks.append(rank_between(None, min(ranks)))
+        self.assertEqual(len(set(ranks)), len(ranks))
+        for rank in ranks:
+            self.assertFalse(rank.endswith('0'))
+
+        self.assertTrue('a' < rank_between('a', 'a1') < 'a1')
+        self.assertTrue('' < rank_between(None, '1') < '1')
+
+    def test_rank_sequence_is_sorted_and_unique(self):
+        """Test evenly spaced ranks sort in insertion order"""
+        for count in (1, 2, 35, 36, 1000):
+            ranks = rank_sequence(count)
+            self.assertEqual(len(ranks), count)
+            self.assertEqual(sorted(ranks), ranks)
+            self.assertEqual(len(set(ranks)), count)
+
+
+class TaskMoveTests(TaskTestMixin, TestCase):
+    """Test moving tasks only rewrites the moved row"""
+
+    def column_titles(self, column):
+        return list(Task.column_siblings(column.id).values_list(
+            'title', flat=True))
+
+    def test_move_between_neighbours(self):
+        """Test a move with neighbour ids lands between them"""
+        tasks = self.create_tasks(3, column=self.done)
+        moving = self.create_tasks(1, prefix='Moving')[0]
+        top, middle, bottom = [Task.objects.get(pk=t.pk) for t in reversed(tasks)]
+        ranks = dict(Task.objects.values_list('id', 'rank'))
+
+        response = self.client.post(f'/api/tasks/{moving.id}/move/', {
+            'column_id': self.done.id,
+            'before_id': str(top.id),
+            'after_id': str(middle.id),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.column_titles(self.done), [
+            top.title, moving.title, middle.title, bottom.title])
+        # Siblings keep their ranks
+        for task in (top, middle, bottom):
+            self.assertEqual(
+                Task.objects.get(pk=task.pk).rank, ranks[task.id])
+
+    def test_move_by_position(self):
+        """Test the legacy position field places the task at that index"""
+        self.create_tasks(3, column=self.done)
+        moving = self.create_tasks(1, prefix='Moving')[0]
+
+        response = self.client.post(f'/api/tasks/{moving.id}/move/', {
+            'column_id': self.done.id,
+            'position': 2,
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.column_titles(self.done)[2], moving.title)
+
+    def test_move_with_unknown_neighbour(self):
+        """Test neighbours must be in the target column"""
+        moving, other = self.create_tasks(2)
+
+        response = self.client.post(f'/api/tasks/{moving.id}/move/', {
+            'column_id': self.done.id,
+            'before_id': str(other.id),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TaskBulkUpdateTests(TaskTestMixin, TestCase):
+    """Test bulk updates run a fixed number of queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='TestPass123!'
+        )
+        Membership.objects.create(workspace=self.workspace, user=self.other)
+
+    def test_bulk_update_applies_changes(self):
+        """Test tasks, counters, activity and notifications follow the update"""
+        tasks = self.create_tasks(3)
+
+        response = self.client.post('/api/tasks/bulk_update/', {
+            'task_ids': [str(task.id) for task in tasks],
+            'status': 'done',
+            'assignee_id': self.other.id,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(
+            Task.objects.filter(status='done', assignee=self.other).count(), 3)
+        stats = ProjectStats.objects.get(project=self.project)
+        self.assertEqual(stats.tasks_count, 3)
+        self.assertEqual(stats.todo_count, 0)
+        self.assertEqual(stats.done_count, 3)
+        self.assertEqual(ActivityLog.objects.filter(
+            entity_type='task', action='update').count(), 3)
+        self.assertEqual(Notification.objects.filter(
+            recipient=self.other, notification_type='task_assigned').count(), 3)
+
+    def test_bulk_update_query_count_is_constant(self):
+        """Test the number of tasks does not change the number of queries"""
+        small = self.create_tasks(2)
+        large = self.create_tasks(20, prefix='Large')
+
+        with self.assertNumQueries(9):
+            self.client.post('/api/tasks/bulk_update/', {
+                'task_ids': [str(task.id) for task in small],
+                'priority': 'high',
+                'assignee_id': self.other.id,
+            }, format='json')
+        with self.assertNumQueries(9):
+            self.client.post('/api/tasks/bulk_update/', {
+                'task_ids': [str(task.id) for task in large],
+                'priority': 'high',
+                'assignee_id': self.other.id,
+            }, format='json')
+
+    def test_bulk_update_rejects_inaccessible_tasks(self):
+        """Test nothing changes when any task is outside the user's workspaces"""
+        task = self.create_tasks(1)[0]
+        outsider = User.objects.create_user(
+            email='outsider@example.com',
+            username='outsider',
+            password='TestPass123!'
+        )
+        self.client.force_authenticate(user=outsider)
+
+        response = self.client.post('/api/tasks/bulk_update/', {
+            'task_ids': [str(task.id)],
+            'status': 'done',
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Task.objects.get(pk=task.pk).status, 'todo')
+
+
+class TaskExportTests(TaskTestMixin, TestCase):
+    """Test the streaming task export"""
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        """Test CSV export writes a header and one row per task"""
+        self.create_tasks(2, priority='high')
+        self.create_tasks(1, prefix='Low', priority='low')
+
+        response = self.client.get('/api/tasks/export/?format=csv&priority=high')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row['priority'] for row in rows}, {'high'})
+        self.assertEqual(rows[0]['column'], 'To Do')
+        self.assertEqual(rows[0]['created_by'], self.user.email)
+
+    def test_ndjson_export(self):
+        """Test JSON export writes one object per line"""
+        self.create_tasks(3)
+
+        response = self.client.get(
+            f'/api/tasks/export/?format=json&project_id={self.project.id}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(
+            {line['id'] for line in lines},
+            {str(pk) for pk in Task.objects.values_list('id', flat=True)})
+
+    def test_export_queries_run_while_streaming(self):
+        """Test the response is returned before the task query executes"""
+        self.create_tasks(3)
+
+        # Only the membership map is loaded before the response is returned
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tasks/export/?format=csv')
+        with self.assertNumQueries(1):
+            body = self.read(response)
+
+        self.assertEqual(len(body.splitlines()), 4)
+
 
-# Create your tests here.
+# Run tests with: python manage.py test apps.tasks
@@ -2,11 +2,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from django.db import transaction
 from django.db.models import Q
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.contrib.auth import get_user_model
-import csv
-import json
+from django.utils import timezone
+from collections import Counter, defaultdict
 
 from .models import Task, Comment, TaskLabel, TaskLabelAssignment
 from .serializers import (
@@ -20,27 +22,34 @@ from .serializers import (
     TaskLabelSerializer,
     TaskExportSerializer
 )
+from .pagination import TaskCursorPagination
+from .export import (
+    CONTENT_TYPES, FILE_EXTENSIONS, STREAM_WRITERS, CSVExportRenderer,
+    export_rows
+)
 from apps.activity.models import ActivityLog
+from apps.core.cache import invalidate
+from apps.projects.events import publish_board_event, task_data
+from apps.projects.models import ProjectStats
 from apps.notifications.models import Notification
+from apps.workspaces.mixins import WorkspaceScopedMixin
 
 User = get_user_model()
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(WorkspaceScopedMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    workspace_field = 'column__project__workspace'
+    # Paginates only when ?cursor= or ?page_size= is passed
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-
         # Support nested routes
         workspace_pk = self.kwargs.get('workspace_pk')
         project_pk = self.kwargs.get('project_pk')
         column_pk = self.kwargs.get('column_pk')
 
-        queryset = Task.objects.filter(
-            column__project__workspace__memberships__user=user,
-            column__project__workspace__memberships__is_active=True
-        )
+        queryset = self.scope_to_workspaces(Task.objects.all())
 
         # Filter by nested route parameters
         if workspace_pk:
@@ -79,9 +88,9 @@ class TaskViewSet(viewsets.ModelViewSet):
                 Q(description__icontains=search)
             )
 
-        return queryset.distinct().select_related(
+        return queryset.select_related(
             'column__project', 'created_by', 'assignee'
-        ).prefetch_related('comments', 'attachments', 'label_assignments__label').order_by('position', '-created_at')
+        ).prefetch_related('comments', 'attachments', 'label_assignments__label').order_by('rank', '-created_at', 'id')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -92,6 +101,7 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         task = serializer.save(created_by=self.request.user)
+        publish_board_event(task.project_id, 'task.created', {'task': task_data(task)})
 
         ActivityLog.log_activity(
         user=self.request.user,
@@ -99,27 +109,30 @@ class TaskViewSet(viewsets.ModelViewSet):
         entity_type='task',
         entity_id=task.id,
         description=f"Created task '{task.title}'",
-        workspace=task.column.project.workspace,
-        project=task.column.project
+        workspace=task.project.workspace_id,
+        project=task.project_id
     )
 
-        if task.assignee and task.assignee != self.request.user:
-            Notification.objects.create(
-                recipient=task.assignee,
+        if task.assignee_id and task.assignee_id != self.request.user.id:
+            Notification.notify(
+                recipient=task.assignee_id,
                 sender=self.request.user,
                 notification_type='task_assigned',
                 title='New Task Assigned',
                 message=f'You have been assigned to task: {task.title}',
-                link=f'/workspaces/{task.column.project.workspace.id}/projects/{task.column.project.id}',
+                link=f'/workspaces/{task.project.workspace_id}/projects/{task.project_id}',
                 task=task,
-                project=task.column.project
+                project=task.project_id,
+                workspace=task.project.workspace_id
             )
 
     def perform_update(self, serializer):
-        old_task = self.get_object()
-        old_assignee = old_task.assignee
+        # Read before save(): the serializer may swap in an unloaded column
+        old_assignee_id = serializer.instance.assignee_id
+        workspace_id = serializer.instance.column.project.workspace_id
 
         task = serializer.save()
+        publish_board_event(task.project_id, 'task.updated', {'task': task_data(task)})
 
         # Log activity
         ActivityLog.log_activity(
@@ -128,22 +141,23 @@ class TaskViewSet(viewsets.ModelViewSet):
             entity_type='task',
             entity_id=task.id,
             description=f"Updated task '{task.title}'",
-            workspace=task.column.project.workspace,
-            project=task.column.project
+            workspace=workspace_id,
+            project=task.project_id
         )
 
         # Notify new assignee if changed
-        new_assignee = task.assignee
-        if new_assignee and new_assignee != old_assignee and new_assignee != self.request.user:
-            Notification.objects.create(
-                recipient=new_assignee,
+        new_assignee_id = task.assignee_id
+        if new_assignee_id and new_assignee_id != old_assignee_id and new_assignee_id != self.request.user.id:
+            Notification.notify(
+                recipient=new_assignee_id,
                 sender=self.request.user,
                 notification_type='task_assigned',
                 title='Task Assigned to You',
                 message=f'You have been assigned to task: {task.title}',
-                link=f'/workspaces/{task.column.project.workspace.id}/projects/{task.column.project.id}',
+                link=f'/workspaces/{workspace_id}/projects/{task.project_id}',
                 task=task,
-                project=task.column.project
+                project=task.project_id,
+                workspace=workspace_id
             )
 
     def perform_destroy(self, instance):
@@ -153,10 +167,14 @@ class TaskViewSet(viewsets.ModelViewSet):
             entity_type='task',
             entity_id=str(instance.id),
             description=f"Deleted task '{instance.title}'",
-            workspace=instance.column.project.workspace,
-            project=instance.column.project
+            workspace=instance.column.project.workspace_id,
+            project=instance.project_id
         )
 
+        publish_board_event(instance.project_id, 'task.deleted', {
+            'task_id': str(instance.id),
+            'column_id': str(instance.column_id),
+        })
         instance.delete()
 
     @action(detail=True, methods=['post'])
@@ -165,10 +183,39 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = TaskMoveSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        task.column_id = serializer.validated_data['column_id']
-        if 'position' in serializer.validated_data:
-            task.position = serializer.validated_data['position']
-        task.save()
+        data = serializer.validated_data
+        column_id = data['column_id']
+        update_fields = ['column', 'rank', 'updated_at']
+
+        # Only this task's rank changes; siblings keep their rows untouched
+        try:
+            if 'before_id' in data or 'after_id' in data:
+                task.rank = Task.rank_between_tasks(
+                    column_id, data.get('before_id'), data.get('after_id'),
+                    exclude=task.pk)
+            elif 'position' in data:
+                task.rank = Task.rank_in_column(
+                    column_id, data['position'], exclude=task.pk)
+            elif column_id != task.column_id:
+                task.rank = Task.rank_in_column(column_id, 0, exclude=task.pk)
+        except LookupError:
+            return Response({
+                'error': 'Neighbour task not found in the target column'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        from_column_id = task.column_id
+        workspace_id = task.column.project.workspace_id
+        task.column_id = column_id
+        if 'position' in data:
+            task.position = data['position']
+            update_fields.append('position')
+        task.save(update_fields=update_fields)
+        publish_board_event(task.project_id, 'task.moved', {
+            'task_id': str(task.id),
+            'from_column_id': str(from_column_id),
+            'column_id': str(task.column_id),
+            'rank': task.rank,
+        })
 
         ActivityLog.log_activity(
             user=request.user,
@@ -176,12 +223,133 @@ class TaskViewSet(viewsets.ModelViewSet):
             entity_type='task',
             entity_id=task.id,
             description=f"Moved task '{task.title}' to {task.column.name}",
-            workspace=task.column.project.workspace,
-            project=task.column.project
+            workspace=workspace_id,
+            project=task.project_id
         )
 
         return Response(TaskSerializer(task).data)
 
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request, workspace_pk=None, project_pk=None, column_pk=None):
+        """Apply the same assignee/priority/status change to many tasks at once"""
+        serializer = TaskBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        changes = {field: data[field]
+                   for field in ('assignee_id', 'priority', 'status')
+                   if field in data}
+        task_ids = set(data['task_ids'])
+
+        with transaction.atomic():
+            # Access check and the data needed for side effects in one query
+            tasks = list(
+                self.get_queryset().prefetch_related(None).filter(
+                    id__in=task_ids
+                ).values(
+                    'id', 'title', 'assignee_id', 'status', 'priority',
+                    'project_id', 'project__workspace_id'
+                )
+            )
+            if len(tasks) != len(task_ids):
+                found = {task['id'] for task in tasks}
+                return Response({
+                    'error': 'Some tasks were not found',
+                    'missing': [str(pk) for pk in task_ids - found]
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            now = timezone.now()
+            Task.objects.filter(id__in=task_ids).update(
+                updated_at=now, **changes)
+
+            # QuerySet.update() skips the post_save counters, so apply the
+            # per-project differences here.
+            stats_deltas = defaultdict(Counter)
+            activities = []
+            notifications = []
+            for task in tasks:
+                new_status = changes.get('status', task['status'])
+                new_priority = changes.get('priority', task['priority'])
+                deltas = stats_deltas[task['project_id']]
+                deltas.update(ProjectStats.task_deltas(
+                    task['status'], task['priority'], -1))
+                deltas.update(ProjectStats.task_deltas(
+                    new_status, new_priority, 1))
+
+                activities.append(ActivityLog(
+                    user=request.user,
+                    action='update',
+                    entity_type='task',
+                    entity_id=str(task['id']),
+                    description=f"Updated task '{task['title']}'",
+                    workspace_id=task['project__workspace_id'],
+                    project_id=task['project_id'],
+                    metadata={'bulk': True, 'changes': changes}
+                ))
+
+                new_assignee = changes.get('assignee_id', task['assignee_id'])
+                if new_assignee and new_assignee != task['assignee_id'] \
+                        and new_assignee != request.user.id:
+                    notifications.append(Notification(
+                        recipient_id=new_assignee,
+                        sender=request.user,
+                        notification_type='task_assigned',
+                        title='Task Assigned to You',
+                        message=f"You have been assigned to task: {task['title']}",
+                        link=f"/workspaces/{task['project__workspace_id']}/projects/{task['project_id']}",
+                        task_id=task['id'],
+                        project_id=task['project_id'],
+                        workspace_id=task['project__workspace_id']
+                    ))
+
+            for project_id, deltas in stats_deltas.items():
+                ProjectStats.increment(project_id, **deltas)
+                publish_board_event(project_id, 'tasks.updated', {
+                    'task_ids': [str(task['id']) for task in tasks
+                                 if task['project_id'] == project_id],
+                    'changes': changes,
+                })
+            ActivityLog.log_many(activities)
+            Notification.notify_many(notifications)
+            invalidate(
+                user_ids=[request.user.id],
+                workspace_ids={task['project__workspace_id'] for task in tasks}
+            )
+
+        return Response({
+            'message': f'Updated {len(tasks)} tasks',
+            'updated': len(tasks),
+            'task_ids': [str(task['id']) for task in tasks],
+        })
+
+    @action(detail=False, methods=['get'],
+            renderer_classes=[JSONRenderer, CSVExportRenderer])
+    def export(self, request, workspace_pk=None, project_pk=None, column_pk=None):
+        """Stream the filtered tasks as CSV or newline-delimited JSON"""
+        serializer = TaskExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        queryset = self.get_queryset().prefetch_related(None)
+        if 'project_id' in data:
+            queryset = queryset.filter(column__project_id=data['project_id'])
+        if 'column_id' in data:
+            queryset = queryset.filter(column_id=data['column_id'])
+        if 'status' in data:
+            queryset = queryset.filter(status=data['status'])
+        if 'priority' in data:
+            queryset = queryset.filter(priority=data['priority'])
+
+        # Nothing is queried until the server starts sending the body
+        export_format = data['format']
+        response = StreamingHttpResponse(
+            STREAM_WRITERS[export_format](export_rows(queryset)),
+            content_type=CONTENT_TYPES[export_format]
+        )
+        filename = f"tasks-{timezone.now():%Y%m%d}.{FILE_EXTENSIONS[export_format]}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=True, methods=['get'])
     def comments(self, request, workspace_pk=None, project_pk=None, column_pk=None, pk=None):
         task = self.get_object()
@@ -207,21 +375,22 @@ class TaskViewSet(viewsets.ModelViewSet):
             entity_type='task',
             entity_id=task.id,
             description=f"Commented on task '{task.title}'",
-            workspace=task.column.project.workspace,
-            project=task.column.project
+            workspace=task.column.project.workspace_id,
+            project=task.project_id
         )
 
         # Notify assignee
-        if task.assignee and task.assignee != request.user:
-            Notification.objects.create(
-                recipient=task.assignee,
+        if task.assignee_id and task.assignee_id != request.user.id:
+            Notification.notify(
+                recipient=task.assignee_id,
                 sender=request.user,
                 notification_type='task_comment',
                 title='New Comment on Task',
                 message=f'{request.user.full_name or request.user.email} commented on: {task.title}',
-                link=f'/workspaces/{task.column.project.workspace.id}/projects/{task.column.project.id}',
+                link=f'/workspaces/{task.column.project.workspace_id}/projects/{task.project_id}',
                 task=task,
-                project=task.column.project
+                project=task.project_id,
+                workspace=task.column.project.workspace_id
             )
 
         return Response(CommentSerializer(comment).data, status=status.HTTP_201_CREATED)
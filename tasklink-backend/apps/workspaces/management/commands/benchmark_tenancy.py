@@ -0,0 +1,145 @@
+import re
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.http import HttpRequest
+
+from apps.projects.models import Project
+from apps.workspaces.mixins import WorkspaceScopedMixin
+from apps.workspaces.models import Workspace, Membership
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare join+DISTINCT tenancy filters with WorkspaceScopedMixin '
+        'scoping (membership query, then an id list) on growing synthetic '
+        'data. Everything runs in a transaction that is rolled back, so no '
+        'rows are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100,1000,5000',
+            help='Comma separated workspace totals to measure at')
+        parser.add_argument(
+            '--members', type=int, default=20,
+            help='Members in every synthetic workspace')
+        parser.add_argument(
+            '--projects', type=int, default=3,
+            help='Projects in every synthetic workspace')
+        parser.add_argument(
+            '--user-workspaces', type=int, default=5,
+            help='Workspaces the measured user belongs to')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per query; the fastest is reported')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        with transaction.atomic():
+            self.seed_users(options['members'])
+            created = 0
+            for size in sizes:
+                self.seed_workspaces(created, size, options)
+                created = size
+                self.report(size, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed_users(self, members):
+        self.user = User.objects.create(
+            email='tenancy-bench@example.com', username='tenancy-bench',
+            password='!')
+        self.pool = User.objects.bulk_create([
+            User(email=f'tenancy-bench-{index}@example.com',
+                 username=f'tenancy-bench-{index}', password='!')
+            for index in range(members)
+        ])
+
+    def seed_workspaces(self, start, stop, options):
+        workspaces = Workspace.objects.bulk_create([
+            Workspace(name=f'Bench {index}', owner=self.pool[0],
+                      invite_code=f'B{index:09d}')
+            for index in range(start, stop)
+        ])
+        memberships = [
+            Membership(workspace=workspace, user=user)
+            for workspace in workspaces for user in self.pool
+        ]
+        user_slots = max(options['user_workspaces'] - start, 0)
+        memberships += [
+            Membership(workspace=workspace, user=self.user)
+            for workspace in workspaces[:user_slots]
+        ]
+        Membership.objects.bulk_create(memberships, batch_size=2000)
+        Project.objects.bulk_create([
+            Project(workspace=workspace, name=f'{workspace.name} / {index}')
+            for workspace in workspaces for index in range(options['projects'])
+        ], batch_size=2000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE workspaces, memberships, projects')
+
+    def scoper(self):
+        """The scoping viewsets use, for a fresh request by the user"""
+        request = HttpRequest()
+        request.user = self.user
+        scoper = WorkspaceScopedMixin()
+        scoper.request = request
+        return scoper
+
+    def queries(self):
+        """Per query, functions building the joined and the scoped queryset"""
+        user = self.user
+        return {
+            'projects': (
+                lambda: Project.objects.filter(
+                    workspace__memberships__user=user,
+                    workspace__memberships__is_active=True
+                ).distinct(),
+                lambda: self.scoper().scope_to_workspaces(Project.objects.all()),
+            ),
+            'workspaces': (
+                lambda: Workspace.objects.filter(
+                    Q(memberships__user=user, memberships__is_active=True) |
+                    Q(owner=user)
+                ).distinct(),
+                # As WorkspaceViewSet.get_queryset
+                lambda: Workspace.objects.filter(
+                    Q(id__in=self.scoper().member_workspace_ids()) |
+                    Q(owner=user)),
+            ),
+        }
+
+    def report(self, size, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{size} workspaces, {Membership.objects.count()} memberships'))
+        for name, (joined, scoped) in self.queries().items():
+            for label, build in (('join+distinct', joined),
+                                 ('scoped', scoped)):
+                # Timings include the membership query scoping runs first
+                elapsed = self.best_time(build, repeat)
+                queryset = build()
+                plan = queryset.explain()
+                # Full table scans: PostgreSQL "Seq Scan on x", SQLite "SCAN x"
+                seq_scans = sorted(set(re.findall(
+                    r'(?:Seq Scan on|\bSCAN) (\w+)', plan)))
+                self.stdout.write(
+                    f'  {name:<11} {label:<14} {elapsed * 1000:8.2f} ms  '
+                    f'rows={queryset.count():<5} '
+                    f'seq scans: {", ".join(seq_scans) or "none"}')
+                if self.verbosity > 1:
+                    self.stdout.write(plan)
+
+    def best_time(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(build())
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,63 @@
+import uuid
+
+from .models import Membership
+
+ADMIN_ROLES = ('owner', 'admin')
+
+
+class MembershipMap:
+    """
+    A user's active workspace roles, loaded with one query on first use.
+
+    One map is shared by everything handling a request (see
+    ``membership_map``) or held by a WebSocket consumer for the lifetime of
+    its connection. Call ``invalidate()`` after changing the user's
+    memberships so the next lookup reloads them.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._roles = None
+
+    @property
+    def roles(self):
+        if self._roles is None:
+            if self.user is None or not self.user.is_authenticated:
+                self._roles = {}
+            else:
+                self._roles = dict(Membership.objects.filter(
+                    user=self.user, is_active=True
+                ).order_by().values_list('workspace_id', 'role'))
+        return self._roles
+
+    def workspace_ids(self):
+        return list(self.roles)
+
+    def role(self, workspace_id):
+        if not isinstance(workspace_id, uuid.UUID):
+            try:
+                workspace_id = uuid.UUID(str(workspace_id))
+            except ValueError:
+                return None
+        return self.roles.get(workspace_id)
+
+    def is_member(self, workspace_id):
+        return self.role(workspace_id) is not None
+
+    def is_admin(self, workspace_id):
+        return self.role(workspace_id) in ADMIN_ROLES
+
+    def invalidate(self):
+        self._roles = None
+
+
+def membership_map(request):
+    """The MembershipMap for the request's user, created once per request"""
+    # DRF wraps the HttpRequest; cache on the inner one so views,
+    # permissions and serializers all see the same map.
+    http_request = getattr(request, '_request', request)
+    memberships = getattr(http_request, '_membership_map', None)
+    if memberships is None or memberships.user != request.user:
+        memberships = MembershipMap(request.user)
+        http_request._membership_map = memberships
+    return memberships
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspaces', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkspaceStats',
+            fields=[
+                ('workspace', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='workspaces.workspace')),
+                ('members_count', models.IntegerField(default=0)),
+                ('projects_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'workspace_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Workspace = apps.get_model('workspaces', 'Workspace')
+    Membership = apps.get_model('workspaces', 'Membership')
+    WorkspaceStats = apps.get_model('workspaces', 'WorkspaceStats')
+    Project = apps.get_model('projects', 'Project')
+
+    rows = {pk: WorkspaceStats(workspace_id=pk)
+            for pk in Workspace.objects.values_list('id', flat=True)}
+
+    members = Membership.objects.filter(is_active=True).order_by(
+    ).values('workspace_id').annotate(total=Count('id'))
+    for counts in members:
+        rows[counts['workspace_id']].members_count = counts['total']
+
+    projects = Project.objects.filter(is_archived=False).order_by(
+    ).values('workspace_id').annotate(total=Count('id'))
+    for counts in projects:
+        rows[counts['workspace_id']].projects_count = counts['total']
+
+    WorkspaceStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspaces', '0002_workspacestats'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
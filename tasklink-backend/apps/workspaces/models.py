@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
 
@@ -96,3 +97,77 @@ class Membership(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.workspace.name} ({self.role})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted values so counters can be adjusted by diff
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class WorkspaceStats(models.Model):
+    """Materialized member and project counters for a workspace"""
+
+    workspace = models.OneToOneField(
+        Workspace,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    members_count = models.IntegerField(default=0)
+    projects_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'workspace_stats'
+
+    def __str__(self):
+        return f"Stats for {self.workspace_id}"
+
+    @classmethod
+    def increment(cls, workspace_id, **deltas):
+        """Apply counter deltas with a single UPDATE, rebuilding a missing row"""
+        changes = {field: models.F(field) + delta
+                   for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+        updated = cls.objects.filter(workspace_id=workspace_id).update(
+            updated_at=timezone.now(), **changes)
+        if not updated:
+            # After commit, so a cascade deleting the workspace cannot re-insert it
+            transaction.on_commit(lambda: cls.rebuild([workspace_id]))
+
+    @classmethod
+    def rebuild(cls, workspace_ids=None):
+        """Recompute counters from scratch with grouped aggregate queries"""
+        from apps.projects.models import Project
+
+        workspaces = Workspace.objects.all()
+        if workspace_ids is not None:
+            workspaces = workspaces.filter(id__in=workspace_ids)
+
+        rows = {pk: cls(workspace_id=pk)
+                for pk in workspaces.values_list('id', flat=True)}
+        if not rows:
+            return 0
+
+        member_counts = Membership.objects.filter(
+            workspace_id__in=rows.keys(), is_active=True
+        ).order_by().values('workspace_id').annotate(total=models.Count('id'))
+        for counts in member_counts:
+            rows[counts['workspace_id']].members_count = counts['total']
+
+        project_counts = Project.objects.filter(
+            workspace_id__in=rows.keys(), is_archived=False
+        ).order_by().values('workspace_id').annotate(total=models.Count('id'))
+        for counts in project_counts:
+            rows[counts['workspace_id']].projects_count = counts['total']
+
+        cls.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=['workspace'],
+            update_fields=['members_count', 'projects_count', 'updated_at']
+        )
+        return len(rows)
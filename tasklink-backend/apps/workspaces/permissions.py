@@ -1,28 +1,18 @@
 from rest_framework import permissions
-from .models import Membership
+from .memberships import membership_map
 
 
 class IsWorkspaceMember(permissions.BasePermission):
     """Permission to check if user is a workspace member"""
 
     def has_object_permission(self, request, view, obj):
-        return Membership.objects.filter(
-            workspace=obj,
-            user=request.user,
-            is_active=True
-        ).exists()
+        return membership_map(request).is_member(obj.id)
 
 
 class IsWorkspaceAdmin(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
-        membership = Membership.objects.filter(
-            workspace=obj,
-            user=request.user,
-            is_active=True
-        ).first()
-
-        return membership and membership.role in ['owner', 'admin']
+        return membership_map(request).is_admin(obj.id)
 
 
 class IsWorkspaceOwner(permissions.BasePermission):
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Workspace, Membership
+from .memberships import membership_map
 from apps.authentication.serializers import UserSerializer
 
 
@@ -31,17 +32,21 @@ class WorkspaceSerializer(serializers.ModelSerializer):
                             'invite_code', 'created_at', 'updated_at']
 
     def get_members_count(self, obj):
+        stats = getattr(obj, 'stats', None)
+        if stats is not None:
+            return stats.members_count
         return obj.memberships.filter(is_active=True).count()
 
     def get_projects_count(self, obj):
+        stats = getattr(obj, 'stats', None)
+        if stats is not None:
+            return stats.projects_count
         return obj.projects.filter(is_archived=False).count()
 
     def get_user_role(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            membership = obj.memberships.filter(
-                user=request.user, is_active=True).first()
-            return membership.role if membership else None
+            return membership_map(request).role(obj.id)
         return None
 
 
@@ -85,6 +90,7 @@ class WorkspaceInviteSerializer(serializers.Serializer):
             workspace=workspace,
             role='member'
         )
+        membership_map(request).invalidate()
 
         return workspace
 
@@ -0,0 +1,81 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Workspace, Membership, WorkspaceStats
+from apps.projects.models import Project
+from apps.core.cache import invalidate
+
+
+@receiver(post_save, sender=Workspace)
+def create_workspace_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        WorkspaceStats.objects.get_or_create(workspace=instance)
+
+
+@receiver(post_save, sender=Membership)
+def count_saved_membership(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_loaded_values', None)
+    instance._loaded_values = {
+        **(previous or {}), 'is_active': instance.is_active}
+
+    if created:
+        if instance.is_active:
+            WorkspaceStats.increment(instance.workspace_id, members_count=1)
+    elif previous is None:
+        WorkspaceStats.rebuild([instance.workspace_id])
+    elif previous.get('is_active') != instance.is_active:
+        WorkspaceStats.increment(
+            instance.workspace_id,
+            members_count=1 if instance.is_active else -1
+        )
+
+
+@receiver(post_delete, sender=Membership)
+def count_deleted_membership(sender, instance, **kwargs):
+    if instance.is_active:
+        WorkspaceStats.increment(instance.workspace_id, members_count=-1)
+
+
+@receiver(post_save, sender=Project)
+def count_saved_project(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_loaded_values', None)
+    instance._loaded_values = {
+        **(previous or {}), 'is_archived': instance.is_archived}
+
+    if created:
+        if not instance.is_archived:
+            WorkspaceStats.increment(instance.workspace_id, projects_count=1)
+    elif previous is None:
+        WorkspaceStats.rebuild([instance.workspace_id])
+    elif previous.get('is_archived') != instance.is_archived:
+        WorkspaceStats.increment(
+            instance.workspace_id,
+            projects_count=-1 if instance.is_archived else 1
+        )
+
+
+@receiver(post_delete, sender=Project)
+def count_deleted_project(sender, instance, **kwargs):
+    if not instance.is_archived:
+        WorkspaceStats.increment(instance.workspace_id, projects_count=-1)
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_membership_reads(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(user_ids=[instance.user_id],
+                   workspace_ids=[instance.workspace_id])
+
+
+@receiver(post_save, sender=Workspace)
+@receiver(post_delete, sender=Workspace)
+def invalidate_workspace_reads(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(user_ids=[instance.owner_id], workspace_ids=[instance.id])
@@ -13,18 +13,24 @@ from .serializers import (
     MembershipUpdateSerializer
 )
 from .permissions import IsWorkspaceMember, IsWorkspaceAdmin
+from .mixins import WorkspaceScopedMixin, cached_read
+from .memberships import membership_map
 
 
-class WorkspaceViewSet(viewsets.ModelViewSet):
+class WorkspaceViewSet(WorkspaceScopedMixin, viewsets.ModelViewSet):
     """ViewSet for workspace CRUD operations"""
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
         return Workspace.objects.filter(
-            Q(memberships__user=user, memberships__is_active=True) |
+            Q(id__in=self.member_workspace_ids()) |
             Q(owner=user)
-        ).distinct()
+        ).select_related('owner', 'stats')
+
+    @cached_read('workspaces')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -47,6 +53,7 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
             role='owner',
             is_active=True
         )
+        membership_map(self.request).invalidate()
 
     @action(detail=False, methods=['post'])
     def join(self, request):
@@ -131,6 +138,7 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        membership_map(request).invalidate()
 
         return Response(
             MembershipSerializer(membership).data
@@ -155,6 +163,7 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             membership.delete()
+            membership_map(request).invalidate()
 
             return Response({
                 'message': 'Member removed successfully'
@@ -194,6 +203,7 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             membership.delete()
+            membership_map(request).invalidate()
 
             return Response({
                 'message': 'Successfully left workspace'
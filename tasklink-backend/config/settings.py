@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'apps.files',
     'apps.notifications',
     'apps.activity',
+    'apps.outbox',
 
 ]
 AUTH_USER_MODEL = "authentication.User"
@@ -109,6 +110,75 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache for versioned read caching (apps.core.cache). Set
+# REDIS_CACHE_URL to share entries between processes; otherwise each
+# process keeps its own local-memory cache. Cached reads and board event
+# numbers (``seq``) are only used with a shared cache.
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'KEY_PREFIX': 'tasklink',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tasklink',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Seconds a cached read may live; writes invalidate earlier
+READ_CACHE_TIMEOUT = config('READ_CACHE_TIMEOUT', default=300, cast=int)
+
+# WebSocket presence (apps.chat.presence). Without a Redis URL presence is
+# tracked per process, which is only correct with a single worker.
+PRESENCE_REDIS_URL = config('PRESENCE_REDIS_URL', default='')
+PRESENCE_TTL = config('PRESENCE_TTL', default=60, cast=int)
+# Seconds between writes of last_seen from the in-process presence backend
+PRESENCE_FLUSH_INTERVAL = config('PRESENCE_FLUSH_INTERVAL', default=30, cast=int)
+
+# Chat write-behind (apps.chat.writebehind): broadcast first, persist in
+# batches of up to BATCH messages or after DELAY_MS, whichever comes first
+CHAT_WRITE_BEHIND = config('CHAT_WRITE_BEHIND', default=False, cast=bool)
+CHAT_WRITE_BEHIND_BATCH = config('CHAT_WRITE_BEHIND_BATCH', default=100, cast=int)
+CHAT_WRITE_BEHIND_DELAY_MS = config('CHAT_WRITE_BEHIND_DELAY_MS', default=50, cast=int)
+
+# Chat resume (apps.chat.replay): the last REPLAY_SIZE frames per project
+# are kept for reconnecting sockets; older gaps are read from the database
+# up to REPLAY_LIMIT messages
+CHAT_REPLAY_REDIS_URL = config('CHAT_REPLAY_REDIS_URL', default=PRESENCE_REDIS_URL)
+CHAT_REPLAY_SIZE = config('CHAT_REPLAY_SIZE', default=200, cast=int)
+CHAT_REPLAY_LIMIT = config('CHAT_REPLAY_LIMIT', default=500, cast=int)
+
+# Per-socket inbound limits (apps.chat.throttling): frames per second and
+# burst, and how typing frames are coalesced before broadcasting
+CHAT_FRAME_RATE = config('CHAT_FRAME_RATE', default=10, cast=int)
+CHAT_FRAME_BURST = config('CHAT_FRAME_BURST', default=20, cast=int)
+CHAT_TYPING_TTL = config('CHAT_TYPING_TTL', default=6, cast=int)
+CHAT_TYPING_MIN_INTERVAL = config('CHAT_TYPING_MIN_INTERVAL', default=3, cast=int)
+
+# Side effects of requests (apps.outbox): 'sync' writes activity rows and
+# notifications inline, 'outbox' records them in the request's transaction
+# for `manage.py run_outbox_worker` to write in batches. OUTBOX_HANDLERS
+# maps extra or replacement topics to dotted handler paths.
+# ACTIVITY_LOG_MODE may also be 'buffered' (apps.activity.writebehind):
+# rows are queued in the process and written in batches of up to BATCH rows
+# after at most DELAY_MS, and at the end of each request; a queue of
+# MAX_PENDING rows is written by the caller
+ACTIVITY_LOG_MODE = config('ACTIVITY_LOG_MODE', default='sync')
+ACTIVITY_LOG_BATCH = config('ACTIVITY_LOG_BATCH', default=200, cast=int)
+ACTIVITY_LOG_DELAY_MS = config('ACTIVITY_LOG_DELAY_MS', default=500, cast=int)
+ACTIVITY_LOG_MAX_PENDING = config('ACTIVITY_LOG_MAX_PENDING', default=5000, cast=int)
+NOTIFICATION_MODE = config('NOTIFICATION_MODE', default='sync')
+# Seconds a cached unread notification count may live (apps.notifications.unread)
+NOTIFICATION_UNREAD_TTL = config('NOTIFICATION_UNREAD_TTL', default=300, cast=int)
+OUTBOX_HANDLERS = {}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
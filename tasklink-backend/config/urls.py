@@ -36,6 +36,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
+from apps.core.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -49,7 +50,10 @@ urlpatterns = [
     
     path('api/tasks/', include('apps.tasks.urls')),
     path('api/chat/', include('apps.chat.urls')),
+    path('api/activity/', include('apps.activity.urls')),
+    path('api/notifications/', include('apps.notifications.urls')),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/metrics/', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development